@@ -14,6 +14,7 @@ from components.map_layers import MapLayerManager
 from components.statistics import StatisticsPanel
 from utils.zip_coords import NYC_ZIP_COORDS, NYC_CENTER
 from config.database import init_db
+from models.housing_data import BuildingYearHistogram
 
 st.set_page_config(
     page_title="NYC Housing Data Explorer",
@@ -26,6 +27,9 @@ st.set_page_config(
 @st.cache_resource
 def initialize_database():
     init_db()
+    # Databases synced before zip_summary existed get it built once.
+    if DataService().get_zip_summary().empty:
+        DataSyncService().rebuild_zip_summary()
 
 
 @st.cache_resource
@@ -33,6 +37,12 @@ def get_auto_sync_manager():
     return AutoSyncManager()
 
 
+@st.cache_resource(max_entries=1)
+def get_year_histogram(version):
+    # Reloaded only when building_year_histogram's dataset version moves.
+    return DataService().get_year_histogram()
+
+
 initialize_database()
 
 
@@ -76,10 +86,8 @@ def main():
         if action == "sync_all":
             with st.spinner("Syncing all data from APIs..."):
                 try:
-                    sync_service = DataSyncService()
-                    census_records = sync_service.sync_all_data()
-                    pluto_records = sync_service.sync_pluto_data()
-                    st.success(f"Synced Census: {census_records} records, PLUTO: {pluto_records} records")
+                    results = DataSyncService().refresh()
+                    st.success(f"Synced Census: {results['census']} records, PLUTO: {results['pluto']} records")
                     st.rerun()
                 except Exception as e:
                     st.error(f"Sync failed: {str(e)}")
@@ -94,10 +102,16 @@ def main():
                     st.error(f"Census sync failed: {str(e)}")
 
         elif action == "sync_pluto":
+            shard_table = st.empty()
             with st.spinner("Syncing PLUTO data from API... This may take several minutes..."):
                 try:
                     sync_service = DataSyncService()
-                    records = sync_service.sync_pluto_data()
+                    records = sync_service.sync_pluto_data(
+                        sharded=True,
+                        on_progress=lambda shards: shard_table.dataframe(
+                            pd.DataFrame.from_dict(shards, orient="index"), use_container_width=True
+                        )
+                    )
                     st.success(f"Synced {records} PLUTO records successfully")
                     st.rerun()
                 except Exception as e:
@@ -123,16 +137,20 @@ def main():
                 except Exception as e:
                     st.error(f"Auto-sync failed: {str(e)}")
 
-    df = data_service.get_all_metrics()
-    building_stats_df = data_service.get_all_building_stats()
+    summary_df = data_service.get_zip_summary()
+    df = summary_df[summary_df["has_housing"]].reset_index(drop=True)
+    building_stats_df = summary_df[summary_df["has_buildings"]].reset_index(drop=True)
 
     if df.empty:
         st.warning("No data available. Please sync data from the sidebar.")
         return
 
-    df["zip"] = df["zip"].astype(str).str.zfill(5)
-    if not building_stats_df.empty:
-        building_stats_df["zip"] = building_stats_df["zip"].astype(str).str.zfill(5)
+    if filter_config["year_min"] is not None and not building_stats_df.empty:
+        version = data_service.dataset_versions().get(BuildingYearHistogram.__tablename__, 0)
+        year_histogram = get_year_histogram(version)
+        building_stats_df = year_histogram.stats(
+            filter_config["year_min"], filter_config["year_max"], building_stats_df["zip"]
+        )
 
     filtered_df = apply_filters(df, filter_config)
     
@@ -278,14 +296,31 @@ def main():
                     if not building_stats_df.empty:
                         selected_building_stats = building_stats_df[building_stats_df["zip"] == selected_zip]
                         if not selected_building_stats.empty:
-                            stats_panel.render_building_stats_detailed(selected_building_stats.iloc[0])
+                            stats_panel.render_building_stats_detailed(
+                                selected_building_stats.iloc[0],
+                                (filter_config["year_min"], filter_config["year_max"])
+                                if filter_config["year_min"] is not None else None
+                            )
                         else:
                             st.info("No building statistics available for this ZIP Code")
                     else:
                         st.info("No building statistics available")
 
                 with col2:
-                    stats_panel.render_zip_rank_analysis(filtered_df, selected_zip)
+                    stats_panel.render_zip_rank_analysis(
+                        filtered_df, selected_zip, citywide=len(filtered_df) == len(df)
+                    )
+
+                st.divider()
+
+                selected_buildings = building_stats_df[building_stats_df["zip"] == selected_zip]
+                stats_panel.render_building_browser(
+                    data_service,
+                    selected_zip,
+                    selected_buildings.iloc[0]["total_buildings"] if not selected_buildings.empty else None,
+                    (filter_config["year_min"], filter_config["year_max"])
+                    if filter_config["year_min"] is not None else None
+                )
 
                 st.divider()
 
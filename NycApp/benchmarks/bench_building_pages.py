@@ -0,0 +1,72 @@
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import select, func
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Building browser pages: OFFSET versus keyset cursors, by page depth")
+    parser.add_argument("--rows", type=int, default=850000, help="Synthetic PLUTO rows")
+    parser.add_argument("--zips", type=int, default=5, help="ZIPs to spread them over; fewer means deeper pages")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000, 3000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db
+    from models.housing_data import BuildingInfo
+    from services.data_service import DataService, BUILDING_PAGE_SCHEMA, rows_frame
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows, n_zips=args.zips)))
+    sync_service.db.commit()
+    service = DataService()
+    b = BuildingInfo.__table__.c
+    zip_code, count = service.db.execute(
+        select(b.zipcode, func.count()).group_by(b.zipcode).order_by(func.count().desc())
+    ).first()
+    depths = [d for d in args.depths if (d - 1) * args.page_size < count]
+    print(f"ZIP {zip_code}: {count:,} buildings, {args.page_size} per page")
+
+    def timed(call):
+        call()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        return np.median(timings) * 1000
+
+    for sort_by in ["numfloors", "address"]:
+        # Walk once to collect the cursor that opens each page.
+        cursors, cursor, page = {1: None}, None, 1
+        while page < max(depths):
+            cursor = service.get_buildings_page(zip_code, sort_by, cursor=cursor, page_size=args.page_size)["next_cursor"]
+            if cursor is None:
+                break
+            page += 1
+            cursors[page] = cursor
+
+        col = b[sort_by]
+        print(f"sort by {sort_by}")
+        for depth in depths:
+            # Index order (NULLs first on SQLite), so OFFSET pays only for the skipped rows.
+            offset = select(*[b[c] for c in BUILDING_PAGE_SCHEMA]).where(
+                b.zipcode == zip_code
+            ).order_by(col, b.id).limit(args.page_size).offset((depth - 1) * args.page_size)
+            offset_ms = timed(lambda: rows_frame(service.db.execute(offset).fetchall(), BUILDING_PAGE_SCHEMA))
+            keyset_ms = timed(lambda: service.get_buildings_page(
+                zip_code, sort_by, cursor=cursors[depth], page_size=args.page_size
+            ))
+            print(f"  page {depth:5d}  OFFSET {offset_ms:8.2f}ms  keyset {keyset_ms:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import pandas as pd
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def per_zip_loop(df):
+    # The pre-aggregation implementation: one boolean scan of the frame per ZIP.
+    rows = []
+    for zip_code in df["zipcode"].unique():
+        zip_df = df[df["zipcode"] == zip_code]
+        years = zip_df["yearbuilt"]
+        rows.append({
+            "zip": zip_code,
+            "total_buildings": len(zip_df),
+            "avg_floors": zip_df["numfloors"].mean(),
+            "avg_year_built": years.mean(),
+            "total_residential_units": zip_df["unitsres"].sum(),
+            "buildings_pre_1950": len(zip_df[years.notna() & (years < 1950)]),
+            "buildings_1950_2000": len(zip_df[years.notna() & (years >= 1950) & (years <= 2000)]),
+            "buildings_post_2000": len(zip_df[years.notna() & (years > 2000)]),
+        })
+    return pd.DataFrame(rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building_stats aggregation strategies")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db, engine
+    from models.housing_data import BuildingInfo
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+    from services.building_stats import building_stats_query, aggregate_building_stats
+
+    init_db()
+
+    for n in args.rows:
+        service = DataSyncService()
+        service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(n)))
+        service.db.commit()
+
+        def read_all():
+            return pd.read_sql("SELECT zipcode, yearbuilt, numfloors, unitsres FROM building_info "
+                               "WHERE zipcode IS NOT NULL", engine)
+
+        _, loop_time = timed(lambda: per_zip_loop(read_all()))
+        _, groupby_time = timed(lambda: aggregate_building_stats(read_all()))
+        with engine.connect() as conn:
+            _, sql_time = timed(lambda: conn.execute(building_stats_query()).fetchall())
+        _, full_time = timed(service.calculate_building_stats)
+
+        print(f"{n:>9,} buildings  per-ZIP loop {loop_time:6.2f}s  pandas groupby {groupby_time:6.2f}s  "
+              f"SQL GROUP BY {sql_time:6.2f}s  calculate_building_stats {full_time:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
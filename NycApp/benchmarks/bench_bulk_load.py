@@ -0,0 +1,30 @@
+import argparse
+import time
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PLUTO CSV ingestion into SQLite")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 850000])
+    args = parser.parse_args()
+
+    scratch = use_scratch_database()
+
+    from config.database import init_db
+    import services.data_sync as data_sync
+
+    init_db()
+    data_sync.DATA_DIR = scratch
+
+    for n in args.rows:
+        synthetic_pluto(n).to_csv(scratch / "pluto_residential.csv", index=False)
+        service = data_sync.DataSyncService()
+        start = time.perf_counter()
+        loaded = service.load_pluto_from_csv()
+        elapsed = time.perf_counter() - start
+        print(f"{loaded:>9,} rows  {elapsed:7.1f}s  {loaded / elapsed:>10,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import time
+from functools import reduce
+
+import pandas as pd
+import requests
+
+from common import APP_DIR, use_scratch_database
+from socrata_standin import start_standin, ACS_PATH
+
+
+def legacy_fetch(base_url, nyc_zips, tables):
+    frames = []
+    transferred = 0
+    for rename_map in tables.values():
+        params = {"get": "NAME," + ",".join(rename_map), "for": "zip code tabulation area:*"}
+        r = requests.get(base_url, params=params, timeout=90)
+        r.raise_for_status()
+        transferred += len(r.content)
+        data = r.json()
+        df = pd.DataFrame(data[1:], columns=data[0])
+        df["zip"] = df["zip code tabulation area"].astype(str).str.zfill(5)
+        frames.append(df.rename(columns=rename_map).drop(columns=["zip code tabulation area"]))
+    merged = reduce(lambda left, right: left.merge(right, on=["zip", "NAME"], how="outer"), frames)
+    return merged[merged["zip"].isin(nyc_zips)], transferred
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-table national Census pulls with the batched NYC-scoped client")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    use_scratch_database()
+    process, url = start_standin(port=8769, latency=args.latency)
+    base_url = url.rsplit("/resource/", 1)[0] + ACS_PATH
+
+    from services.census_client import CensusClient, ACS_TABLES
+
+    nyc_zips = set(pd.read_csv(APP_DIR / "data" / "nyc_zip_list.csv", dtype=str)["zip"])
+    columns = ["zip", "NAME"] + [c for t in ACS_TABLES.values() for c in t.values()]
+
+    transferred = {"client": 0}
+
+    class CountingSession(requests.Session):
+        def get(self, *a, **kw):
+            r = super().get(*a, **kw)
+            transferred["client"] += len(r.content)
+            return r
+
+    try:
+        legacy_fetch(base_url, nyc_zips, ACS_TABLES)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            legacy, legacy_bytes = legacy_fetch(base_url, nyc_zips, ACS_TABLES)
+        legacy_time = (time.perf_counter() - start) / args.repeat
+
+        client = CensusClient(base_url=base_url, session=CountingSession())
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            transferred["client"] = 0
+            batched = client.fetch(zips=nyc_zips)
+        client_time = (time.perf_counter() - start) / args.repeat
+    finally:
+        process.terminate()
+
+    legacy = legacy[columns].sort_values("zip").reset_index(drop=True)
+    batched = batched[columns].sort_values("zip").reset_index(drop=True)
+    print(f"5 national requests     {legacy_time:6.2f}s  {legacy_bytes / 1e6:7.2f} MB  {len(legacy)} ZIPs")
+    print(f"batched NYC-scoped      {client_time:6.2f}s  {transferred['client'] / 1e6:7.2f} MB  {len(batched)} ZIPs  "
+          f"match={legacy.equals(batched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+# SQLite's own defaults, i.e. the engine before the tuned profile.
+PROFILES = {
+    "default": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_MB": "0",
+                "SQLITE_CACHE_MB": "2"},
+    "tuned": {},
+}
+
+
+def run_profile(args, port):
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db, engine
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService
+
+    init_db()
+    service = DataSyncService()
+
+    def sync(rows, port):
+        process, url = start_standin(rows, port=port, latency=args.latency)
+        pluto_fetcher.PLUTO_API = url
+        try:
+            return service.sync_pluto_data()
+        finally:
+            process.terminate()
+
+    sync(args.rows, port)
+    with engine.connect() as conn:
+        zips = [z for z, in conn.exec_driver_sql("SELECT DISTINCT zipcode FROM building_info LIMIT 50")]
+
+    done = threading.Event()
+    latencies = []
+    errors = []
+
+    def read(seed):
+        # One dashboard session: popup lookups for random ZIPs.
+        rng = np.random.default_rng(seed)
+        data_service = DataService()
+        while not done.is_set():
+            zip_code = zips[rng.integers(len(zips))]
+            start = time.perf_counter()
+            try:
+                data_service.get_building_stats_by_zip(zip_code)
+                data_service.get_buildings_by_zip_filtered(zip_code, 1950, 2000)
+                data_service.get_last_sync_info()
+            except Exception as e:
+                errors.append(type(e).__name__)
+                data_service.db.rollback()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(args.interval)
+
+    readers = [threading.Thread(target=read, args=(i,)) for i in range(args.readers)]
+    for reader in readers:
+        reader.start()
+    start = time.perf_counter()
+    try:
+        sync(args.resync_rows, port + 1)
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"{args.profile:8s} sync {elapsed:6.2f}s  {len(ms):6d} reads  p50 {np.percentile(ms, 50):7.1f}ms  "
+          f"p99 {np.percentile(ms, 99):7.1f}ms  max {ms.max():7.1f}ms  errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard read latency while a PLUTO sync writes, per SQLite profile")
+    parser.add_argument("--rows", type=int, default=300000, help="Rows served for the initial load")
+    parser.add_argument("--resync-rows", type=int, default=300000, help="Rows served for the sync under load")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent dashboard sessions")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between reads per session")
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args, 8840 + 2 * list(PROFILES).index(args.profile))
+        return
+
+    # The profile is read when config.database is imported, so each one runs
+    # in a fresh process.
+    for profile, overrides in PROFILES.items():
+        argv = [sys.executable, __file__, "--profile", profile]
+        for name in ["rows", "resync_rows", "readers", "latency", "interval"]:
+            argv += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+        subprocess.run(argv, env={**os.environ, **overrides}, check=True)
+
+
+if __name__ == "__main__":
+    main()
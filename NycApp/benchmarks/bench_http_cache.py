@@ -0,0 +1,52 @@
+import argparse
+import os
+import time
+
+from common import use_scratch_database
+from socrata_standin import start_standin, ACS_PATH, ZIP_LIST_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time repeat Census + PLUTO syncs with the on-disk HTTP cache")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    use_scratch_database()
+    process, url = start_standin(args.rows, port=8771, latency=args.latency)
+    host = url.rsplit("/resource/", 1)[0]
+    os.environ["PLUTO_API_URL"] = url
+    os.environ["ACS_API_URL"] = host + ACS_PATH
+    os.environ["NYC_ZIP_URL"] = host + ZIP_LIST_PATH + "?$select=modzcta&$limit=300"
+
+    import services.http_client as http_client
+    from config.database import init_db
+    from services.data_sync import DataSyncService
+
+    init_db()
+    service = DataSyncService()
+
+    def sync():
+        start = time.perf_counter()
+        census = service.sync_all_data()
+        buildings = service.sync_pluto_data(incremental=True)
+        return time.perf_counter() - start, census, buildings
+
+    try:
+        cold = sync()
+        warm = sync()
+        for source in http_client.SOURCE_TTLS:
+            http_client.SOURCE_TTLS[source] = 0
+        revalidated = sync()
+    finally:
+        process.terminate()
+
+    cache_mb = http_client.shared_cache().size / 1e6
+    print(f"cold (empty cache)        {cold[0]:6.2f}s  {cold[1]} ZIPs  {cold[2]} buildings")
+    print(f"warm (within TTL)         {warm[0]:6.2f}s  {warm[1]} ZIPs  {warm[2]} buildings")
+    print(f"revalidated (304s)        {revalidated[0]:6.2f}s  {revalidated[1]} ZIPs  {revalidated[2]} buildings")
+    print(f"cache size                {cache_mb:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+import requests
+
+from common import use_scratch_database
+from socrata_standin import start_standin, ACS_PATH, ZIP_LIST_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot + database refresh: two fetches versus one pipeline pass")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--format", default="parquet")
+    args = parser.parse_args()
+
+    scratch = use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+    process, url = start_standin(args.rows, port=8800, latency=args.latency)
+    host = url.rsplit("/resource/", 1)[0]
+    os.environ["PLUTO_API_URL"] = url
+    os.environ["ACS_API_URL"] = host + ACS_PATH
+    os.environ["NYC_ZIP_URL"] = host + ZIP_LIST_PATH + "?$select=modzcta&$limit=300"
+
+    from config.database import init_db, engine
+    from services.data_sync import DataSyncService
+    from services.pipeline import SyncPipeline, SnapshotSink
+    from services.snapshots import read_snapshot
+
+    init_db()
+    sent = {"requests": 0}
+    send = requests.Session.send
+
+    def counting_send(self, request, **kwargs):
+        sent["requests"] += 1
+        return send(self, request, **kwargs)
+
+    requests.Session.send = counting_send
+
+    def measure(run):
+        sent["requests"] = 0
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start, sent["requests"]
+
+    def snapshot(directory):
+        return read_snapshot(directory, "pluto_residential").sort_values("bbl", ignore_index=True)
+
+    def buildings():
+        return pd.read_sql("SELECT bbl, zipcode, yearbuilt FROM building_info ORDER BY bbl", engine)
+
+    two_dir = scratch / "two_pass"
+    one_dir = scratch / "one_pass"
+    two_dir.mkdir()
+    one_dir.mkdir()
+    try:
+        # What the nightly job used to do: build the snapshots, then sync the database.
+        two_pass = measure(lambda: (
+            SyncPipeline([SnapshotSink(two_dir, args.format)]).run(),
+            DataSyncService(snapshot_format="").refresh()
+        ))
+        expected = buildings()
+        one_pass = measure(lambda: DataSyncService(snapshot_format=args.format, snapshot_dir=one_dir).refresh())
+        match = buildings().equals(expected) and snapshot(one_dir).equals(snapshot(two_dir))
+    finally:
+        requests.Session.send = send
+        process.terminate()
+
+    print(f"snapshot fetch + DB sync   {two_pass[0]:6.2f}s  {two_pass[1]:5d} requests")
+    print(f"single pipeline pass       {one_pass[0]:6.2f}s  {one_pass[1]:5d} requests  match={match}")
+
+
+if __name__ == "__main__":
+    main()
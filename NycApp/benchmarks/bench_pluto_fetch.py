@@ -0,0 +1,70 @@
+import argparse
+import math
+import time
+
+import pandas as pd
+import requests
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+use_scratch_database()
+
+from services.pluto_fetcher import PlutoFetcher, clean_pluto_page, RESIDENTIAL_LANDUSE, PLUTO_FIELDS
+
+
+def fetch_serial_offset(url, rows, page_size=5000, sleep=0.15):
+    # The pre-keyset fetch loop: $offset paging ordered by yearbuilt, one page at a time.
+    frames = []
+    for i in range(math.ceil(rows / page_size)):
+        params = {
+            "$select": ",".join(PLUTO_FIELDS),
+            "$where": RESIDENTIAL_LANDUSE,
+            "$order": "yearbuilt DESC",
+            "$limit": page_size,
+            "$offset": i * page_size,
+        }
+        r = requests.get(url, params=params, timeout=60)
+        r.raise_for_status()
+        data = r.json()
+        if not data:
+            break
+        frames.append(clean_pluto_page(data))
+        if len(data) < page_size:
+            break
+        time.sleep(sleep)
+    return pd.concat(frames, ignore_index=True)
+
+
+def report(label, df, elapsed, expected):
+    unique = df["bbl"].nunique()
+    print(f"{label:<28} {len(df):>9,} rows  {unique:>9,} unique  {elapsed:7.1f}s  "
+          f"{len(df) / elapsed:>9,.0f} rows/s  {'OK' if unique == expected == len(df) else 'MISMATCH'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PLUTO fetching against a local Socrata stand-in")
+    parser.add_argument("--rows", type=int, default=850000)
+    parser.add_argument("--latency", type=float, default=0.25)
+    parser.add_argument("--offset-cost", type=float, default=2e-7)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    process, url = start_standin(args.rows, latency=args.latency, offset_cost=args.offset_cost)
+    try:
+        if not args.skip_baseline:
+            start = time.perf_counter()
+            df = fetch_serial_offset(url, args.rows)
+            report("serial $offset", df, time.perf_counter() - start, args.rows)
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            df = PlutoFetcher(api_url=url, max_workers=workers).fetch()
+            report(f"keyset, {workers} workers", df, time.perf_counter() - start, args.rows)
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
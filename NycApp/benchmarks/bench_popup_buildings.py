@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import event, select
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map popup buildings: one query per marker versus one windowed query")
+    parser.add_argument("--rows", type=int, default=850000, help="Synthetic PLUTO rows")
+    parser.add_argument("--limit", type=int, default=5, help="Buildings per popup")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db, read_engine
+    from models.housing_data import BuildingInfo
+    from services.data_service import DataService, BUILDING_SCHEMA, typed_frame
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    sync_service.calculate_building_stats()
+    service = DataService()
+    b = BuildingInfo.__table__.c
+    zips = [z for z, in service.db.execute(select(b.zipcode).distinct().order_by(b.zipcode))]
+
+    def per_marker(year_min, year_max):
+        # What _create_popup_html did for every marker.
+        if year_min is not None:
+            return [service.get_buildings_by_zip_filtered(z, year_min, year_max, limit=args.limit) for z in zips]
+        return [service.get_buildings_by_zip(z, limit=args.limit) for z in zips]
+
+    def expected(zip_code, year_min, year_max):
+        # The popup order: earliest year first, then id, buildings without a year left out.
+        stmt = select(*[b[c] for c in BUILDING_SCHEMA]).where(b.zipcode == zip_code, b.yearbuilt.isnot(None))
+        if year_min is not None:
+            stmt = stmt.where(b.yearbuilt >= year_min, b.yearbuilt <= year_max)
+        stmt = stmt.order_by(b.yearbuilt, b.id).limit(args.limit)
+        return typed_frame(service.db.execute(stmt), BUILDING_SCHEMA)
+
+    def batched(year_min, year_max):
+        return service.get_top_buildings_by_zips(zips, year_min, year_max, limit=args.limit)
+
+    statements = []
+    event.listen(read_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    print(f"{args.rows:,} buildings, {len(zips)} ZIPs, top {args.limit} per popup")
+    for year_min, year_max in [(None, None), (1950, 2000)]:
+        label = "all years" if year_min is None else f"{year_min}-{year_max}"
+        for name, call in [("per marker", per_marker), ("batched", batched)]:
+            statements.clear()
+            call(year_min, year_max)
+            queries = len(statements)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                call(year_min, year_max)
+                timings.append(time.perf_counter() - start)
+            print(f"{label:10s} {name:12s} {queries:4d} queries  {np.median(timings) * 1000:8.1f}ms")
+
+        want = [expected(z, year_min, year_max) for z in zips]
+        got = batched(year_min, year_max)
+        mismatches = sum(
+            not got[got["zip"] == z].drop(columns="zip").reset_index(drop=True).astype(str).equals(frame.astype(str))
+            for z, frame in zip(zips, want)
+        )
+        print(f"{label:10s} mismatched ZIPs: {mismatches}/{len(zips)}")
+
+
+if __name__ == "__main__":
+    main()
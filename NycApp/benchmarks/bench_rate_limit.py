@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+from collections import Counter
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLUTO fetch against a throttling, flaky Socrata stand-in")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--quota", type=float, default=8, help="Server-side anonymous requests/s")
+    parser.add_argument("--token-quota", type=float, default=30, help="Server-side requests/s with an app token")
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["RATE_LIMIT_ANONYMOUS"] = "5"
+    os.environ["RATE_LIMIT_APP_TOKEN"] = "40"
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+    process, url = start_standin(args.rows, port=8772, latency=args.latency, quota=args.quota,
+                                 token_quota=args.token_quota, error_rate=args.error_rate)
+
+    import services.http_client as http_client
+    from services.pluto_fetcher import PlutoFetcher
+
+    def run(label, app_token, max_retries):
+        http_client._limiters.clear()
+        statuses = Counter()
+        session = http_client.ApiSession(max_retries=max_retries)
+        session.hooks["response"].append(lambda r, *a, **kw: statuses.update([r.status_code]))
+        fetcher = PlutoFetcher(page_size=args.page_size, max_workers=args.workers, app_token=app_token,
+                               session=session, api_url=url)
+        start = time.perf_counter()
+        try:
+            df = fetcher.fetch()
+            outcome = f"{len(df):>8,} rows  {df['bbl'].nunique():>8,} unique"
+        except Exception as e:
+            outcome = f"FAILED: {type(e).__name__}"
+        elapsed = time.perf_counter() - start
+        print(f"{label:<30} {elapsed:6.1f}s  {outcome}  "
+              f"429s={statuses[429]} 5xx={sum(v for k, v in statuses.items() if k >= 500)} ok={statuses[200]}")
+
+    try:
+        run("anonymous, no retries", "", 0)
+        run("anonymous, adaptive + retry", "", http_client.MAX_RETRIES)
+        run("app token, adaptive + retry", "bench-token", http_client.MAX_RETRIES)
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
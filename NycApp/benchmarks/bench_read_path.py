@@ -0,0 +1,95 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from common import use_scratch_database, synthetic_pluto
+
+BUILDING_FIELDS = ["bbl", "address", "landuse", "yearbuilt", "numfloors", "unitsres", "borough"]
+METRIC_FIELDS = ["zip", "name", "median_rent", "median_income", "rent_burden", "rent_burden_rate", "housing_units",
+                 "total_units", "occupied_units", "vacant_units", "vacancy_rate"]
+STATS_FIELDS = ["zip", "total_buildings", "avg_floors", "avg_year_built", "total_residential_units",
+                "buildings_pre_1950", "buildings_1950_2000", "buildings_post_2000"]
+
+
+def orm_frame(objects, fields, numeric=()):
+    # The previous DataService read path: ORM instances -> dicts -> frame -> to_numeric.
+    df = pd.DataFrame([{f: getattr(o, f) for f in fields} for o in objects])
+    for col in numeric:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def measure(call, repeat):
+    call()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataService reads: ORM objects to dicts versus typed Core frames")
+    parser.add_argument("--rows", type=int, default=850000, help="Synthetic PLUTO rows")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db
+    from models.housing_data import BuildingInfo, BuildingStats, HousingMetrics
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.load_from_csv()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    sync_service.calculate_building_stats()
+
+    service = DataService()
+    db = service.db
+    zip_code, = db.query(BuildingInfo.zipcode).group_by(BuildingInfo.zipcode).order_by(
+        BuildingInfo.zipcode
+    ).first()
+    zip_rows = db.query(BuildingInfo).filter(BuildingInfo.zipcode == zip_code).count()
+
+    cases = [
+        ("get_all_metrics", lambda: orm_frame(db.query(HousingMetrics).all(), METRIC_FIELDS, METRIC_FIELDS[2:]),
+         service.get_all_metrics),
+        ("get_all_building_stats", lambda: orm_frame(db.query(BuildingStats).all(), STATS_FIELDS),
+         service.get_all_building_stats),
+        ("get_buildings_by_zip(100)", lambda: orm_frame(
+            db.query(BuildingInfo).filter(BuildingInfo.zipcode == zip_code).limit(100).all(), BUILDING_FIELDS
+        ), lambda: service.get_buildings_by_zip(zip_code, 100)),
+        (f"get_buildings_by_zip({zip_rows})", lambda: orm_frame(
+            db.query(BuildingInfo).filter(BuildingInfo.zipcode == zip_code).limit(zip_rows).all(), BUILDING_FIELDS
+        ), lambda: service.get_buildings_by_zip(zip_code, zip_rows)),
+        ("get_buildings_by_zip_filtered", lambda: orm_frame(
+            db.query(BuildingInfo).filter(
+                BuildingInfo.zipcode == zip_code, BuildingInfo.yearbuilt >= 1950, BuildingInfo.yearbuilt <= 2000
+            ).limit(zip_rows).all(), BUILDING_FIELDS
+        ), lambda: service.get_buildings_by_zip_filtered(zip_code, 1950, 2000, zip_rows)),
+    ]
+
+    print(f"{args.rows:,} buildings, {len(service.get_all_metrics())} ZIPs with housing metrics")
+    print(f"{'call':34s} {'ORM ms':>9s} {'Core ms':>9s} {'ORM KiB':>9s} {'Core KiB':>9s}")
+    for label, orm_call, core_call in cases:
+        orm_time, orm_peak = measure(orm_call, args.repeat)
+        db.expunge_all()
+        core_time, core_peak = measure(core_call, args.repeat)
+        print(f"{label:34s} {orm_time * 1000:9.2f} {core_time * 1000:9.2f} "
+              f"{orm_peak / 1024:9.0f} {core_peak / 1024:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard reruns with and without the DataService result cache")
+    parser.add_argument("--rows", type=int, default=300000, help="Synthetic PLUTO rows")
+    parser.add_argument("--reruns", type=int, default=50)
+    parser.add_argument("--size", type=int, default=128, help="Result cache entries")
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db, engine
+    from models.housing_data import BuildingInfo
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+    from services.result_cache import RESULT_CACHE, bump_versions
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.load_from_csv()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    sync_service.calculate_building_stats()
+
+    def rerun():
+        # The reads main() makes on every Streamlit rerun, on a fresh service.
+        service = DataService()
+        summary = service.get_zip_summary()
+        service.get_last_sync_info()
+        service.get_summary_stats()
+        service.get_top_buildings_by_zips(summary.loc[summary["has_buildings"], "zip"])
+        return service
+
+    for label, size in [("no cache", 0), ("result cache", args.size)]:
+        RESULT_CACHE.clear()
+        RESULT_CACHE.max_entries = size
+        rerun()
+        timings = []
+        for _ in range(args.reruns):
+            start = time.perf_counter()
+            rerun()
+            timings.append(time.perf_counter() - start)
+        stats = RESULT_CACHE.stats()
+        print(f"{label:14s} p50 {np.median(timings) * 1000:7.2f}ms  max {np.max(timings) * 1000:7.2f}ms  "
+              f"hits {stats['hits']} misses {stats['misses']}")
+
+    def entries():
+        return sorted(key[0] for key in RESULT_CACHE.entries)
+
+    print(f"cached: {', '.join(entries())}")
+    sync_service.log_sync("bench", "success")
+    print(f"after a sync_logs commit: {', '.join(entries())}")
+    rerun()
+    zip_code = DataService().get_all_building_stats()["zip"].iloc[0]
+    sync_service.calculate_building_stats(zip_codes=[zip_code])
+    print(f"after a building_stats rebuild for {zip_code}: {', '.join(entries())}")
+
+    rerun()
+    with engine.begin() as conn:
+        # A sync in another process: only dataset_versions tells this one.
+        bump_versions(conn, ["housing_metrics"])
+    DataService().dataset_versions()
+    print(f"after a housing_metrics bump from elsewhere: {', '.join(entries())}")
+    print(RESULT_CACHE.stats())
+
+
+if __name__ == "__main__":
+    main()
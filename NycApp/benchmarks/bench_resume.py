@@ -0,0 +1,81 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from common import use_scratch_database
+from socrata_standin import start_standin, ACS_PATH, ZIP_LIST_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interrupt a streaming PLUTO sync and resume it from its checkpoints")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-after", type=int, default=40, help="Pages served before the simulated outage")
+    parser.add_argument("--interrupt", choices=["stream", "sharded", "refresh"], default="stream",
+                        help="The sync that hits the outage: streaming, borough-sharded, or Sync All")
+    parser.add_argument("--resume-with", choices=["stream", "refresh"], default="stream",
+                        help="Resume with a PLUTO sync, or with Sync All (ZIP list and Census first)")
+    args = parser.parse_args()
+
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+    os.environ["HTTP_MAX_RETRIES"] = "1"
+    port = 8773
+
+    import services.census_client as census_client
+    import services.pipeline as pipeline
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db, engine
+    from services.data_sync import DataSyncService
+
+    init_db()
+    service = DataSyncService()
+
+    def sync(path="stream", **faults):
+        nonlocal port
+        process, url = start_standin(args.rows, port=port, latency=args.latency, **faults)
+        port += 1
+        pluto_fetcher.PLUTO_API = url
+        host = url.rsplit("/resource/", 1)[0]
+        census_client.ACS_BASE = host + ACS_PATH
+        pipeline.NYC_ZIP_URL = host + ZIP_LIST_PATH + "?$select=modzcta&$limit=300"
+        start = time.perf_counter()
+        try:
+            if path == "refresh":
+                records = service.refresh()["pluto"]
+            elif path == "sharded":
+                records = service.sync_pluto_data(sharded=True)
+            else:
+                records = service.sync_pluto_data()
+            outcome = f"{records:,} rows"
+        except Exception as e:
+            outcome = f"failed ({type(e).__name__})"
+        finally:
+            process.terminate()
+        checkpoints = pd.read_sql("SELECT pages_done, completed FROM sync_checkpoints", engine)
+        loaded = pd.read_sql("SELECT count(*) AS n FROM building_info", engine)["n"].iloc[0]
+        return time.perf_counter() - start, outcome, loaded, int(checkpoints["pages_done"].sum())
+
+    def bbls():
+        return pd.read_sql("SELECT bbl FROM building_info ORDER BY bbl", engine)["bbl"]
+
+    clean = sync()
+    expected = bbls()
+    interrupted = sync(args.interrupt, fail_after=args.fail_after)
+    resumed = sync(args.resume_with)
+    resumed_bbls = bbls()
+    sync(args.interrupt, fail_after=args.fail_after)
+    restarted = sync(version="1800000000")
+
+    print(f"uninterrupted sync      {clean[0]:6.2f}s  {clean[1]}")
+    print(f"outage after {args.fail_after} pages   {interrupted[0]:6.2f}s  {interrupted[1]}, "
+          f"{interrupted[2]:,} rows still live, {interrupted[3]} pages checkpointed")
+    print(f"resumed sync            {resumed[0]:6.2f}s  {resumed[1]}  "
+          f"match={resumed_bbls.equals(expected)}")
+    print(f"new dataset version     {restarted[0]:6.2f}s  {restarted[1]} (checkpoint discarded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query building_info while a PLUTO sync rebuilds it")
+    parser.add_argument("--rows", type=int, default=300000, help="Rows served for the initial load")
+    parser.add_argument("--resync-rows", type=int, default=250000, help="Rows served for the second sync")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between dashboard reads")
+    args = parser.parse_args()
+
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db, engine
+    from services.data_sync import DataSyncService
+
+    init_db()
+    service = DataSyncService()
+
+    def sync(rows, port):
+        process, url = start_standin(rows, port=port, latency=args.latency)
+        pluto_fetcher.PLUTO_API = url
+        try:
+            return service.sync_pluto_data()
+        finally:
+            process.terminate()
+
+    initial = sync(args.rows, 8790)
+
+    done = threading.Event()
+    latencies = []
+    counts = []
+    errors = []
+
+    def read():
+        # Stands in for the dashboard: a ZIP lookup plus the table size.
+        with engine.connect() as conn:
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    conn.execute(text("SELECT * FROM building_info WHERE zipcode = '10001' LIMIT 100")).fetchall()
+                    counts.append(conn.execute(text("SELECT count(*) FROM building_info")).scalar())
+                except Exception as e:
+                    errors.append(type(e).__name__)
+                latencies.append(time.perf_counter() - start)
+                time.sleep(args.interval)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    start = time.perf_counter()
+    try:
+        resynced = sync(args.resync_rows, 8791)
+    finally:
+        done.set()
+        reader.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    seen = sorted(set(counts))
+    print(f"initial load {initial:,} rows; resync {resynced:,} rows in {elapsed:.2f}s")
+    print(f"{len(latencies)} reads during the resync: p50 {np.percentile(ms, 50):.1f}ms  "
+          f"p99 {np.percentile(ms, 99):.1f}ms  max {ms.max():.1f}ms  errors {len(errors)}")
+    print(f"row counts seen: {', '.join(f'{c:,}' for c in seen)} "
+          f"(atomic={set(seen) <= {initial, resynced}})")
+
+
+if __name__ == "__main__":
+    main()
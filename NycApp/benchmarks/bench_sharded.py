@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare streaming and borough-sharded PLUTO ingestion")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--year-splits", type=int, default=2)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of 503s; page retries are disabled")
+    args = parser.parse_args()
+
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+    os.environ["HTTP_MAX_RETRIES"] = "0"
+    process, url = start_standin(args.rows, port=8780, latency=args.latency, error_rate=args.error_rate)
+
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db, engine
+    from services.data_sync import DataSyncService
+
+    init_db()
+    pluto_fetcher.PLUTO_API = url
+    service = DataSyncService()
+
+    def bbls():
+        return pd.read_sql("SELECT bbl FROM building_info ORDER BY bbl", engine)["bbl"]
+
+    try:
+        start = time.perf_counter()
+        try:
+            service.sync_pluto_data()
+            streamed = f"{len(bbls()):,} rows"
+        except Exception as e:
+            streamed = f"failed ({type(e).__name__})"
+        stream_time = time.perf_counter() - start
+        service.clear_checkpoints("pluto_stream")
+        service.db.commit()
+
+        progress = {}
+        start = time.perf_counter()
+        records = service.sync_pluto_data(sharded=True, year_splits=args.year_splits, on_progress=progress.update)
+        sharded_time = time.perf_counter() - start
+    finally:
+        process.terminate()
+
+    print(f"streaming sync           {stream_time:6.2f}s  {streamed}")
+    print(f"sharded sync ({len(progress)} shards) {sharded_time:6.2f}s  {records:,} rows  "
+          f"unique={bbls().is_unique}")
+    print(pd.DataFrame.from_dict(progress, orient="index").to_string())
+
+
+if __name__ == "__main__":
+    main()
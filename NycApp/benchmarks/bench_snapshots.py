@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import pandas as pd
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet PLUTO snapshots: size and cold load time")
+    parser.add_argument("--rows", type=int, default=850000)
+    args = parser.parse_args()
+
+    scratch = use_scratch_database()
+
+    from services.data_sync import normalize_pluto_frame
+    from services.pluto_fetcher import PLUTO_FIELDS
+    from services.snapshots import write_snapshot, read_snapshot, snapshot_path
+
+    df = synthetic_pluto(args.rows)
+    csv_dir, parquet_dir = scratch / "csv", scratch / "parquet"
+    csv_dir.mkdir()
+    parquet_dir.mkdir()
+
+    legacy_path = csv_dir / "legacy.csv"
+    df.to_csv(legacy_path, index=False)
+    write_snapshot(csv_dir, "pluto_residential", df, "csv")
+    write_snapshot(parquet_dir, "pluto_residential", df, "parquet")
+
+    def timed(load):
+        start = time.perf_counter()
+        raw = load()
+        read_time = time.perf_counter() - start
+        frame = normalize_pluto_frame(raw)
+        return read_time, time.perf_counter() - start, frame.reset_index(drop=True)
+
+    legacy = timed(lambda: pd.read_csv(legacy_path))
+    typed_csv = timed(lambda: read_snapshot(csv_dir, "pluto_residential", columns=PLUTO_FIELDS))
+    parquet = timed(lambda: read_snapshot(parquet_dir, "pluto_residential", columns=PLUTO_FIELDS))
+
+    def size(path):
+        return path.stat().st_size / 1e6
+
+    def same(left, right, skip=()):
+        try:
+            pd.testing.assert_frame_equal(left.drop(columns=list(skip)), right.drop(columns=list(skip)), check_dtype=False)
+            return True
+        except AssertionError:
+            return False
+
+    # Plain read_csv turns landuse "01" into 1 (and so changes content_hash);
+    # the typed snapshots keep the API's text values.
+    lossy = ["landuse", "content_hash"]
+    print(f"{'':24} {'read':>7} {'read+normalize':>15} {'size':>9}")
+    print(f"{'legacy read_csv':24} {legacy[0]:6.2f}s {legacy[1]:14.2f}s {size(legacy_path):7.1f}MB  "
+          f"landuse sample={legacy[2]['landuse'].iloc[0]!r}")
+    print(f"{'typed CSV snapshot':24} {typed_csv[0]:6.2f}s {typed_csv[1]:14.2f}s "
+          f"{size(snapshot_path(csv_dir, 'pluto_residential', 'csv')):7.1f}MB  "
+          f"match legacy (minus landuse)={same(typed_csv[2], legacy[2], lossy)}")
+    print(f"{'Parquet snapshot (zstd)':24} {parquet[0]:6.2f}s {parquet[1]:14.2f}s "
+          f"{size(snapshot_path(parquet_dir, 'pluto_residential', 'parquet')):7.1f}MB  "
+          f"match typed CSV={same(parquet[2], typed_csv[2])}  landuse sample={parquet[2]['landuse'].iloc[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
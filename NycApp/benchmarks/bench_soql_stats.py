@@ -0,0 +1,91 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from common import use_scratch_database
+from socrata_standin import start_standin, PLUTO_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full PLUTO ingestion with SoQL server-side building stats")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    use_scratch_database()
+    synthetic, url = start_standin(args.rows, port=8766, latency=args.latency)
+    fixture = Path(tempfile.mkdtemp()) / "soql_fixture.json"
+    recorder, record_url = start_recorder(8767, "http://127.0.0.1:8766", fixture)
+
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db, engine
+    from services.data_sync import DataSyncService
+
+    init_db()
+    columns = ["zip", "total_buildings", "avg_floors", "avg_year_built", "total_residential_units",
+               "buildings_pre_1950", "buildings_1950_2000", "buildings_post_2000"]
+
+    def stats():
+        return pd.read_sql(f"SELECT {', '.join(columns)} FROM building_stats ORDER BY zip", engine)
+
+    def histogram():
+        return pd.read_sql("SELECT * FROM building_year_histogram ORDER BY zip, year", engine).drop(columns="id")
+
+    try:
+        pluto_fetcher.PLUTO_API = url
+        service = DataSyncService()
+        start = time.perf_counter()
+        service.sync_pluto_data()
+        full_time = time.perf_counter() - start
+        full_stats, full_histogram = stats(), histogram()
+
+        pluto_fetcher.PLUTO_API = record_url
+        start = time.perf_counter()
+        service.sync_pluto_data(stats_only=True)
+        soql_time = time.perf_counter() - start
+        soql_stats, soql_histogram = stats(), histogram()
+    finally:
+        synthetic.terminate()
+        recorder.terminate()
+
+    replay, replay_url = start_standin(port=8768, replay=str(fixture))
+    try:
+        pluto_fetcher.PLUTO_API = replay_url
+        service.sync_pluto_data(stats_only=True)
+        replay_stats, replay_histogram = stats(), histogram()
+    finally:
+        replay.terminate()
+
+    print(f"full ingest + GROUP BY   {full_time:6.2f}s  {len(full_stats)} ZIPs")
+    print(f"SoQL aggregates          {soql_time:6.2f}s  {len(soql_stats)} ZIPs  "
+          f"match={same(soql_stats, full_stats)}  year histogram match={same(soql_histogram, full_histogram)}")
+    print(f"replayed SoQL fixture    {len(replay_stats)} ZIPs  match={same(replay_stats, full_stats)}  "
+          f"year histogram match={same(replay_histogram, full_histogram)}")
+
+
+def same(left, right):
+    try:
+        pd.testing.assert_frame_equal(left, right, check_exact=False, rtol=1e-9)
+        return True
+    except AssertionError:
+        return False
+
+
+def start_recorder(port, upstream, fixture):
+    import multiprocessing
+    from socrata_standin import serve
+
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=serve, args=(port, ready), kwargs=dict(record=str(fixture), upstream=upstream), daemon=True
+    )
+    process.start()
+    ready.wait()
+    return process, f"http://127.0.0.1:{port}{PLUTO_PATH}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from common import use_scratch_database, synthetic_pluto
+
+BUILDING_COLUMNS = ["yearbuilt", "numfloors", "unitsres"]
+
+
+def measure(call):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary statistics: pandas over loaded rows versus one aggregate query")
+    parser.add_argument("--rows", type=int, default=850000, help="Synthetic PLUTO rows")
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db
+    from models.housing_data import BuildingInfo, HousingMetrics
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.load_from_csv()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    sync_service.db.commit()
+    service = DataService()
+
+    def housing_before():
+        # The previous get_summary_stats: an emptiness check that loads every
+        # row, then get_all_metrics() loading them again.
+        if not service.db.query(HousingMetrics).all():
+            return {}
+        df = service.get_all_metrics()
+        return {c: df[c].dropna().describe(percentiles=[0.25, 0.5, 0.75]) for c in ["median_rent", "median_income"]}
+
+    def buildings_before():
+        df = pd.read_sql(f"SELECT {', '.join(BUILDING_COLUMNS)} FROM building_info", service.db.connection())
+        return {c: df[c].dropna().describe(percentiles=[0.25, 0.5, 0.75]) for c in BUILDING_COLUMNS}
+
+    cases = [
+        ("housing_metrics", housing_before, service.get_summary_stats),
+        (f"building_info ({args.rows:,} rows)", buildings_before, service.get_building_summary_stats),
+    ]
+    for label, before, after in cases:
+        before()
+        service.db.expunge_all()
+        _, before_time, before_peak = measure(before)
+        after()
+        _, after_time, after_peak = measure(after)
+        print(f"{label:30s} pandas {before_time * 1000:8.1f}ms {before_peak / 2**20:7.1f}MiB   "
+              f"aggregate query {after_time * 1000:8.1f}ms {after_peak / 2**20:7.2f}MiB")
+
+    medians = {c: stats["median"] for c, stats in service.get_building_summary_stats().items() if c != "rows"}
+    print(f"building medians: {medians}")
+
+
+if __name__ == "__main__":
+    main()
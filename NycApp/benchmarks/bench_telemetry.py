@@ -0,0 +1,44 @@
+import argparse
+import os
+
+import pandas as pd
+
+from common import use_scratch_database
+from socrata_standin import start_standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage breakdown of PLUTO syncs against a slow and a fast upstream")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--slow-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    use_scratch_database()
+    os.environ["HTTP_CACHE_MAX_MB"] = "0"
+
+    import services.pluto_fetcher as pluto_fetcher
+    from config.database import init_db
+    from services.data_sync import DataSyncService
+    from services.data_service import DataService
+
+    init_db()
+    service = DataSyncService()
+    for port, latency in [(8830, 0.0), (8831, args.slow_latency)]:
+        process, url = start_standin(args.rows, port=port, latency=latency)
+        pluto_fetcher.PLUTO_API = url
+        try:
+            service.sync_pluto_data(stream=False)
+        finally:
+            process.terminate()
+
+    columns = ["sync_type", "wall_seconds", "rows_per_sec", "peak_rss_mb", "http_requests", "http_seconds",
+               "parse_seconds", "transform_seconds", "db_write_seconds", "stats_seconds"]
+    runs = DataService().get_sync_runs()
+    runs = runs[runs["sync_type"] == "pluto_sync"][columns]
+    runs.insert(1, "latency", [0.0, args.slow_latency])
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(runs.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
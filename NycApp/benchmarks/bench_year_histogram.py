@@ -0,0 +1,64 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Year-filtered building stats: GROUP BY on building_info versus prefix sums")
+    parser.add_argument("--rows", type=int, default=850000)
+    parser.add_argument("--ranges", type=int, default=50, help="Random year ranges to answer")
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db
+    from models.housing_data import BuildingInfo
+    from services.building_stats import building_stats_query, finalize_stats_frame, STATS_COLUMNS
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    start = time.perf_counter()
+    sync_service.calculate_building_stats()
+    rebuild = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    ranges = [tuple(sorted(rng.integers(1850, 2025, 2))) for _ in range(args.ranges)]
+    b = BuildingInfo.__table__.c
+
+    def scan(year_min, year_max):
+        stmt = building_stats_query().where(b.yearbuilt.between(int(year_min), int(year_max)))
+        rows = sync_service.db.execute(stmt).fetchall()
+        return finalize_stats_frame(pd.DataFrame(rows, columns=STATS_COLUMNS))
+
+    start = time.perf_counter()
+    histogram = DataService().get_year_histogram()
+    load = time.perf_counter() - start
+
+    timings = {"scan": [], "histogram": []}
+    mismatches = 0
+    for year_min, year_max in ranges:
+        start = time.perf_counter()
+        expected = scan(year_min, year_max)
+        timings["scan"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        got = histogram.stats(year_min, year_max)
+        timings["histogram"].append(time.perf_counter() - start)
+        got = got[got["total_buildings"] > 0].reset_index(drop=True)
+        mismatches += not got.astype(str).equals(expected.sort_values("zip", ignore_index=True).astype(str))
+
+    print(f"stats + histogram rebuild {rebuild:.2f}s; histogram load {load * 1000:.1f}ms "
+          f"({histogram.prefix.shape[1]} ZIPs x {histogram.prefix.shape[2] - 1} years)")
+    for label, values in timings.items():
+        print(f"{label:10s} p50 {np.median(values) * 1000:8.2f}ms  max {np.max(values) * 1000:8.2f}ms")
+    print(f"mismatched ranges: {mismatches}/{len(ranges)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import event
+
+from common import use_scratch_database, synthetic_pluto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Main page data load: two tables merged in pandas versus zip_summary")
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic PLUTO rows behind building_stats")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_scratch_database()
+
+    from config.database import init_db, read_engine
+    from models.housing_data import BuildingInfo
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    sync_service.load_from_csv()
+    sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+    sync_service.calculate_building_stats()
+    service = DataService()
+
+    def separate():
+        # What app.py did on every rerun before zip_summary.
+        df = service.get_all_metrics()
+        building_stats_df = service.get_all_building_stats()
+        df["zip"] = df["zip"].astype(str).str.zfill(5)
+        building_stats_df["zip"] = building_stats_df["zip"].astype(str).str.zfill(5)
+        return df, building_stats_df
+
+    def summary():
+        summary_df = service.get_zip_summary()
+        return summary_df[summary_df["has_housing"]], summary_df[summary_df["has_buildings"]]
+
+    def per_zip_separate(zips):
+        return [(service.get_metrics_by_zip(z), service.get_building_stats_by_zip(z)) for z in zips]
+
+    def per_zip_summary(zips):
+        return [service.get_combined_metrics(z) for z in zips]
+
+    statements = []
+    event.listen(read_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    zips = separate()[0]["zip"].tolist()[:20]
+    for label, call in [("metrics + building_stats", separate), ("zip_summary", summary),
+                        ("20 ZIP lookups, 2 tables", lambda: per_zip_separate(zips)),
+                        ("20 ZIP lookups, zip_summary", lambda: per_zip_summary(zips))]:
+        statements.clear()
+        call()
+        queries = len(statements)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        print(f"{label:30s} {queries:3d} queries  {np.median(timings) * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import event
+
+from common import use_scratch_database, synthetic_pluto
+
+# DataService reads that return whole tables by design.
+FULL_READS = ["get_all_metrics", "get_all_building_stats", "get_summary_stats", "get_zip_summary", "dataset_versions"]
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (?!anon_)(\w+)$|^SCAN TABLE (\w+)$|USE TEMP B-TREE FOR ORDER BY")
+# Calls that sort only the few rows per ZIP their index lookups return.
+BOUNDED_SORTS = {"get_top_buildings_by_zips"}
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+# Calls whose plan must go through a specific index, not merely avoid a full
+# scan: a lookup on the zipcode prefix alone would also pass that test.
+REQUIRED_INDEXES = {
+    "get_buildings_by_zip_filtered": "ix_building_info_zipcode_yearbuilt",
+    "get_top_buildings_by_zips": "ix_building_info_zipcode_yearbuilt",
+}
+# Their columns: a same-named index left over from an older schema does not
+# count, e.g. (zipcode, yearbuilt) without the id that orders popup picks.
+INDEX_COLUMNS = {
+    "ix_building_info_zipcode_yearbuilt": ["zipcode", "yearbuilt", "id"],
+}
+# The indexes this check guards, and what the tables had before them.
+LEGACY_INDEXES = [
+    ("DROP INDEX ix_building_info_zipcode_yearbuilt", "CREATE INDEX ix_building_info_zipcode ON building_info (zipcode)"),
+    ("DROP INDEX ix_sync_logs_sync_time", None),
+]
+
+
+def hot_calls(zip_code):
+    from services.building_pages import encode_cursor
+
+    # A mid-listing cursor and one inside the trailing run of NULL values.
+    address_cursor = encode_cursor("address", False, "1 MAIN ST", 0)
+    null_cursor = encode_cursor("unitsres", False, None, 0)
+    return [
+        ("get_metrics_by_zip", (zip_code,)),
+        ("get_building_stats_by_zip", (zip_code,)),
+        ("get_combined_metrics", (zip_code,)),
+        ("get_buildings_by_zip", (zip_code, 100)),
+        ("get_buildings_by_zip_filtered", (zip_code, 1950, 2000, 100)),
+        ("get_buildings_by_zip_filtered", (zip_code, 1990, None, 100)),
+        ("get_buildings_by_zip_filtered", (zip_code, None, 1900, 100)),
+        ("get_top_buildings_by_zips", ([zip_code], None, None, 5)),
+        ("get_top_buildings_by_zips", ([zip_code], 1950, 2000, 5)),
+        ("get_buildings_page", (zip_code, "numfloors", True)),
+        ("get_buildings_page", (zip_code, "address", False, address_cursor)),
+        ("get_buildings_page", (zip_code, "unitsres", False, null_cursor)),
+        ("get_last_sync_info", ()),
+        ("get_sync_runs", ()),
+    ]
+
+
+def capture_statements(engine, call):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Small tables make sequential scans look cheap; only accept them
+            # when no index can serve the query at all.
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            plan = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+            scans = [line.strip() for line in plan if POSTGRES_FULL_SCAN.search(line)]
+        else:
+            plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            scans = [line for line in plan if SQLITE_FULL_SCAN.search(line)]
+    return plan, scans
+
+
+def uses_index(plan, index):
+    # SQLite: "SEARCH building_info USING INDEX ix_... (zipcode=? AND yearbuilt>?)";
+    # PostgreSQL: "Index Scan using ix_..." or "Bitmap Index Scan on ix_...".
+    pattern = re.compile(rf"^SEARCH .*USING (COVERING )?INDEX {index}\b|Index Scan (using|on) {index}\b")
+    return any(pattern.search(line.strip()) for line in plan)
+
+
+def check_index_columns(engine):
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    failures = 0
+    for name, columns in INDEX_COLUMNS.items():
+        found = [ix["column_names"] for table in inspector.get_table_names()
+                 for ix in inspector.get_indexes(table) if ix["name"] == name]
+        if found != [columns]:
+            failures += 1
+            status = f"columns {', '.join(found[0])}" if found else "missing"
+            print(f"  {name} should cover ({', '.join(columns)}): {status}")
+    return failures
+
+
+def check(engine, service, calls, repeat):
+    # Read once per service, before the calls under test.
+    service.dataset_versions()
+    failures = 0
+    for name, args in calls:
+        statements = capture_statements(engine, lambda: getattr(service, name)(*args))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            getattr(service, name)(*args)
+            timings.append(time.perf_counter() - start)
+        plan, scans = [], []
+        for statement, parameters in statements:
+            statement_plan, statement_scans = explain(engine, statement, parameters)
+            plan += statement_plan
+            scans += statement_scans
+        if name in BOUNDED_SORTS:
+            scans = [scan for scan in scans if "TEMP B-TREE" not in scan and "Sort" not in scan]
+        missing = name in REQUIRED_INDEXES and not uses_index(plan, REQUIRED_INDEXES[name])
+        failures += bool(scans) or missing
+        label = f"{name}{args}"
+        if scans:
+            status = "FULL SCAN: " + "; ".join(scans)
+        elif missing:
+            status = f"NOT USING {REQUIRED_INDEXES[name]}"
+        else:
+            status = "ok"
+        print(f"  {label:58s} {np.median(timings) * 1000:8.2f}ms  {status}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if a hot DataService query is planned as a full table scan (EXPLAIN QUERY PLAN / EXPLAIN)"
+    )
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic PLUTO rows to load")
+    parser.add_argument("--sync-logs", type=int, default=20000, help="Synthetic sync_logs rows to insert")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--compare", action="store_true", help="Also run against the pre-migration indexes")
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="Check the database configured by DB_TYPE/SQLITE_PATH instead of a scratch copy")
+    args = parser.parse_args()
+
+    if not args.use_configured_db:
+        use_scratch_database()
+
+    from config.database import init_db, engine, read_engine
+    from models.housing_data import BuildingInfo, SyncLog
+    from services.data_service import DataService
+    from services.data_sync import DataSyncService, normalize_pluto_frame
+
+    init_db()
+    sync_service = DataSyncService()
+    if not args.use_configured_db:
+        sync_service.load_from_csv()
+        sync_service.loader.replace(BuildingInfo, normalize_pluto_frame(synthetic_pluto(args.rows)))
+        sync_service.calculate_building_stats()
+        sync_service.loader.load(SyncLog, [
+            {"sync_type": "pluto_sync", "status": "success", "records_processed": i} for i in range(args.sync_logs)
+        ])
+        sync_service.db.commit()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    zip_code = sync_service.db.query(BuildingInfo.zipcode).filter(BuildingInfo.zipcode.isnot(None)).first()[0]
+    service = DataService()
+
+    print("current indexes")
+    failures = check_index_columns(read_engine) + check(read_engine, service, hot_calls(zip_code), args.repeat)
+    print(f"full-table reads (not checked): {', '.join(FULL_READS)}")
+
+    if args.compare and not args.use_configured_db:
+        with engine.begin() as conn:
+            for drop, create in LEGACY_INDEXES:
+                conn.exec_driver_sql(drop)
+                if create:
+                    conn.exec_driver_sql(create)
+        service.db.close()
+        # Pooled connections keep their prepared EXPLAIN statements, and with
+        # them the old plans; start from fresh connections.
+        read_engine.dispose()
+        print("pre-migration indexes")
+        check(read_engine, DataService(), hot_calls(zip_code), args.repeat)
+
+    if failures:
+        print(f"{failures} hot queries regressed to a full scan or lost their index")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
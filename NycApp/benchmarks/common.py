@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = Path(__file__).resolve().parent.parent
+BOROUGHS = ["MN", "BX", "BK", "QN", "SI"]
+MAX_BLOCK = np.array([2300, 6000, 9000, 16400, 8100])
+
+
+def use_scratch_database():
+    scratch = Path(tempfile.mkdtemp(prefix="nyc_bench_"))
+    os.environ["DB_TYPE"] = ""
+    os.environ["SQLITE_PATH"] = str(scratch / "bench.db")
+    os.environ["HTTP_CACHE_DIR"] = str(scratch / "http_cache")
+    # The stand-in is local, so only throttle when a benchmark asks for it.
+    os.environ.setdefault("RATE_LIMIT_ANONYMOUS", "10000")
+    # Benchmarks time the queries; bench_result_cache turns the cache on itself.
+    os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+    if str(APP_DIR) not in sys.path:
+        sys.path.append(str(APP_DIR))
+    return scratch
+
+
+def synthetic_pluto(n, n_zips=180, seed=0):
+    rng = np.random.default_rng(seed)
+    zips = rng.choice(np.arange(10001, 11700), n_zips, replace=False)
+    borough = rng.integers(1, 6, n)
+    block = (rng.random(n) * MAX_BLOCK[borough - 1]).astype("int64") + 1
+    lot = pd.Series(borough * 10**5 + block).groupby(borough * 10**5 + block).cumcount().to_numpy() + 1
+    df = pd.DataFrame({
+        "bbl": (borough * 10**9 + block * 10**4 + lot).astype(str),
+        "landuse": rng.choice(["01", "02", "03"], n),
+        "yearbuilt": rng.integers(1850, 2024, n).astype(float),
+        "numfloors": rng.integers(1, 40, n).astype(float),
+        "unitsres": rng.integers(0, 300, n).astype(float),
+        "address": [f"{i} MAIN ST" for i in range(n)],
+        "zipcode": rng.choice(zips, n).astype(float),
+        "borough": np.array(BOROUGHS)[borough - 1],
+    })
+    df.loc[rng.random(n) < 0.02, "yearbuilt"] = np.nan
+    return df
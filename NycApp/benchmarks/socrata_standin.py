@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import operator
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import pandas as pd
+import requests
+
+from common import APP_DIR, synthetic_pluto
+
+PLUTO_PATH = "/resource/64uk-42ks.json"
+ACS_PATH = "/data/2022/acs/acs5"
+ZIP_LIST_PATH = "/resource/pri4-ifjk.json"
+VIEWS_PATH = "/api/views/64uk-42ks.json"
+ZCTA_GEOGRAPHY = "zip code tabulation area"
+WHERE_TERM = re.compile(r"(bbl|yearbuilt)\s*(>=|<=|>|<)\s*(\d+)")
+COMPARE = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+AGGREGATE_TERM = re.compile(r"(count|avg|sum|min|max)\((\*|\w+)\)\s+as\s+(\w+)", re.IGNORECASE)
+
+
+class PlutoTable:
+    def __init__(self, rows, seed=0):
+        df = synthetic_pluto(rows, seed=seed)
+        df["bbl_key"] = df["bbl"].astype("int64")
+        self.df = df.sort_values("bbl_key").reset_index(drop=True)
+        self.by_year = self.df.sort_values("yearbuilt", ascending=False, kind="stable").reset_index(drop=True)
+
+    def query(self, params):
+        if "$group" in params:
+            return self.aggregate(params), 0
+        order = params.get("$order", "bbl")
+        source = self.by_year if order.startswith("yearbuilt") else self.df
+        mask = np.ones(len(source), dtype=bool)
+        for column, op, value in WHERE_TERM.findall(params.get("$where", "")):
+            values = source["bbl_key" if column == "bbl" else "yearbuilt"].to_numpy()
+            mask &= COMPARE[op](values, int(value))
+
+        offset = int(params.get("$offset", 0))
+        limit = int(params.get("$limit", 1000))
+        page = source[mask].iloc[offset:offset + limit]
+        return self._records(page), offset
+
+    def aggregate(self, params):
+        source = self.df
+        mask = np.ones(len(source), dtype=bool)
+        for column, op, value in WHERE_TERM.findall(params.get("$where", "")):
+            values = source["bbl_key" if column == "bbl" else "yearbuilt"].to_numpy()
+            mask &= COMPARE[op](values, int(value))
+        group = [c.strip() for c in params["$group"].split(",")]
+        grouped = source[mask].groupby(group)
+        out = {}
+        for func, column, alias in AGGREGATE_TERM.findall(params.get("$select", "")):
+            func = func.lower()
+            if func == "count":
+                out[alias] = grouped.size() if column == "*" else grouped[column].count()
+            else:
+                out[alias] = getattr(grouped[column], "mean" if func == "avg" else func)()
+        frame = pd.DataFrame(out).reset_index()
+        frame[group] = frame[group].astype("int64")
+        return self._records(frame.assign(bbl_key=0))
+
+    @staticmethod
+    def _records(page):
+        out = page.drop(columns=["bbl_key"]).astype(object)
+        out = out.where(out.notna(), None)
+        records = out.to_dict("records")
+        for record in records:
+            for key, val in list(record.items()):
+                if val is None:
+                    del record[key]
+                else:
+                    record[key] = str(val)
+        return records
+
+
+class AcsTable:
+    def __init__(self, zctas=33000, seed=0):
+        rng = np.random.default_rng(seed)
+        nyc = pd.read_csv(APP_DIR / "data" / "nyc_zip_list.csv", dtype=str)["zip"]
+        nyc = nyc[nyc != "99999"]
+        others = rng.choice(np.arange(501, 99951), zctas, replace=False)
+        codes = pd.Index(nyc).append(pd.Index([f"{z:05d}" for z in others])).unique()
+        self.codes = pd.Series(codes)
+        self.values = {}
+
+    def column(self, variable):
+        if variable not in self.values:
+            seed = int.from_bytes(variable.encode(), "little") % 2**32
+            self.values[variable] = np.random.default_rng(seed).integers(0, 5000, len(self.codes)).astype(str)
+        return self.values[variable]
+
+    def query(self, params):
+        fields = params["get"].split(",")
+        geography = params["for"].split(":", 1)[1]
+        if geography == "*":
+            mask = np.ones(len(self.codes), dtype=bool)
+        else:
+            mask = self.codes.isin(geography.split(",")).to_numpy()
+            if not mask.any():
+                return None
+        rows = [fields + [ZCTA_GEOGRAPHY]]
+        columns = [
+            ("ZCTA5 " + self.codes[mask]).tolist() if f == "NAME" else self.column(f)[mask].tolist()
+            for f in fields
+        ]
+        rows.extend([list(r) for r in zip(*columns, self.codes[mask].tolist())])
+        return rows
+
+
+class Quota:
+    def __init__(self, anonymous, app_token):
+        self.rates = {False: anonymous, True: app_token}
+        self.tokens = {False: 1.0, True: 1.0}
+        self.updated = {False: time.monotonic(), True: time.monotonic()}
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def admit(self, authenticated):
+        rate = self.rates[authenticated]
+        if not rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens[authenticated] = min(rate, self.tokens[authenticated] + (now - self.updated[authenticated]) * rate)
+            self.updated[authenticated] = now
+            if self.tokens[authenticated] >= 1:
+                self.tokens[authenticated] -= 1
+                return True
+            self.rejected += 1
+            return False
+
+
+class SyntheticBackend:
+    def __init__(self, rows, latency=0.05, offset_cost=0.0, quota=0.0, token_quota=0.0, error_rate=0.0,
+                 fail_after=0, version="1700000000"):
+        self.table = PlutoTable(rows)
+        self.fail_after = fail_after
+        self.version = version
+        self.served = 0
+        self.lock = threading.Lock()
+        self.acs = None
+        self.latency = latency
+        self.offset_cost = offset_cost
+        self.quota = Quota(quota, token_quota)
+        self.error_rate = error_rate
+        self.rng = np.random.default_rng(1)
+
+    def respond(self, path, params, headers=None):
+        if not self.quota.admit(bool(headers and headers.get("X-App-Token"))):
+            return 429, b'{"error": "too many requests"}', {"Retry-After": "1"}
+        if self.error_rate and self.rng.random() < self.error_rate:
+            time.sleep(self.latency)
+            return 503, b'{"error": "service unavailable"}'
+        if path == ACS_PATH:
+            if self.acs is None:
+                self.acs = AcsTable()
+            rows = self.acs.query(params)
+            time.sleep(self.latency)
+            return (204, b"") if rows is None else (200, json.dumps(rows).encode())
+        if path == VIEWS_PATH:
+            return 200, json.dumps({"id": "64uk-42ks", "rowsUpdatedAt": int(self.version)}).encode()
+        if path == ZIP_LIST_PATH:
+            zips = pd.read_csv(APP_DIR / "data" / "nyc_zip_list.csv", dtype=str)["zip"]
+            return 200, json.dumps([{"modzcta": z} for z in zips]).encode()
+        if path != PLUTO_PATH:
+            return 404, b"[]"
+        if self.fail_after:
+            with self.lock:
+                self.served += 1
+                if self.served > self.fail_after:
+                    return 500, b'{"error": "upstream outage"}'
+        records, offset = self.table.query(params)
+        time.sleep(self.latency + offset * self.offset_cost)
+        return 200, json.dumps(records).encode()
+
+
+class ReplayBackend:
+    def __init__(self, fixture_path):
+        with open(fixture_path) as f:
+            self.responses = json.load(f)
+
+    def respond(self, path, params, headers=None):
+        body = self.responses.get(query_key(path, params))
+        if body is None:
+            return 404, b'{"error": "no recorded response"}'
+        return 200, body.encode()
+
+
+class RecordingBackend:
+    def __init__(self, upstream, fixture_path):
+        self.upstream = upstream.rstrip("/")
+        self.fixture_path = Path(fixture_path)
+        self.responses = json.loads(self.fixture_path.read_text()) if self.fixture_path.exists() else {}
+        self.lock = threading.Lock()
+
+    def respond(self, path, params, headers=None):
+        r = requests.get(self.upstream + path, params=params, timeout=120)
+        if r.status_code == 200:
+            with self.lock:
+                self.responses[query_key(path, params)] = r.text
+                self.fixture_path.write_text(json.dumps(self.responses, indent=1))
+        return r.status_code, r.content
+
+
+def query_key(path, params):
+    return path + "?" + urlencode(sorted(params.items()))
+
+
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            status, body, *extra = backend.respond(url.path, params, self.headers)
+            etag = None
+            if status == 200:
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            for name, value in (extra[0] if extra else {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def build_backend(rows=0, latency=0.05, offset_cost=0.0, replay=None, record=None, upstream=None,
+                  quota=0.0, token_quota=0.0, error_rate=0.0, fail_after=0, version="1700000000"):
+    if replay:
+        return ReplayBackend(replay)
+    if record:
+        return RecordingBackend(upstream, record)
+    return SyntheticBackend(rows, latency, offset_cost, quota, token_quota, error_rate, fail_after, version)
+
+
+def serve(port, ready=None, **backend_options):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(build_backend(**backend_options)))
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def start_standin(rows=0, port=8765, latency=0.05, offset_cost=0.0, replay=None, **faults):
+    ready = multiprocessing.Event()
+    options = dict(rows=rows, latency=latency, offset_cost=offset_cost, replay=replay, **faults)
+    process = multiprocessing.Process(target=serve, args=(port, ready), kwargs=options, daemon=True)
+    process.start()
+    ready.wait()
+    return process, f"http://127.0.0.1:{port}{PLUTO_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Socrata stand-in serving synthetic or recorded PLUTO responses")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--offset-cost", type=float, default=0.0, help="Extra seconds per row of $offset")
+    parser.add_argument("--quota", type=float, default=0.0, help="Anonymous requests/s before 429s (0 = unlimited)")
+    parser.add_argument("--token-quota", type=float, default=0.0, help="Requests/s with X-App-Token before 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--fail-after", type=int, default=0, help="Answer PLUTO pages with 500 after this many")
+    parser.add_argument("--version", type=str, default="1700000000", help="rowsUpdatedAt reported by the views API")
+    parser.add_argument("--replay", type=str, default=None, help="Serve responses recorded in this JSON file")
+    parser.add_argument("--record", type=str, default=None, help="Proxy to --upstream and record responses here")
+    parser.add_argument("--upstream", type=str, default="https://data.cityofnewyork.us")
+    args = parser.parse_args()
+    print(f"Serving at http://127.0.0.1:{args.port}{PLUTO_PATH}")
+    serve(args.port, rows=args.rows, latency=args.latency, offset_cost=args.offset_cost,
+          replay=args.replay, record=args.record, upstream=args.upstream,
+          quota=args.quota, token_quota=args.token_quota, error_rate=args.error_rate,
+          fail_after=args.fail_after, version=args.version)
+
+
+if __name__ == "__main__":
+    main()
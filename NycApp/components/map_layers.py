@@ -1,6 +1,11 @@
+import logging
+
 import folium
 from folium import plugins
 import pandas as pd
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
 
 class MapLayerManager:
     def __init__(self, base_coords=[40.7128, -73.75], zoom_start=10):
@@ -25,37 +30,80 @@ class MapLayerManager:
         marker_cluster = plugins.MarkerCluster(name="Data Points")
         
         valid_data = data[data["zip"].notna()].copy()
+        valid_data["zip"] = valid_data["zip"].astype(str).str.zfill(5)
+        valid_data = valid_data[valid_data["zip"].isin(coords_dict.keys()) & valid_data[metric_column].notna()]
+        
+        show_buildings = building_stats is not None and data_service is not None
+        zip_stats, zip_buildings, year_note = {}, {}, ""
+        if show_buildings:
+            zip_stats, zip_buildings, year_note = self._prefetch_building_data(
+                valid_data["zip"].tolist(), building_stats, data_service
+            )
         
         for _, row in valid_data.iterrows():
-            zip_code = str(row["zip"]).zfill(5)
+            zip_code = row["zip"]
+            coords = coords_dict[zip_code]
+            metric_value = row.get(metric_column)
             
-            if zip_code in coords_dict:
-                coords = coords_dict[zip_code]
-                metric_value = row.get(metric_column)
-                
-                if pd.notna(metric_value):
-                    color = self._get_marker_color(
-                        metric_value, 
-                        metric_column,
-                        color_scheme
-                    )
-                    
-                    popup_html = self._create_popup_html(row, zip_code, building_stats, data_service)
-                    
-                    folium.CircleMarker(
-                        location=coords,
-                        radius=8,
-                        popup=folium.Popup(popup_html, max_width=450),
-                        tooltip=f"ZIP: {zip_code}",
-                        color=color,
-                        fill=True,
-                        fillColor=color,
-                        fillOpacity=opacity,
-                        weight=2
-                    ).add_to(map_obj)
+            color = self._get_marker_color(
+                metric_value, 
+                metric_column,
+                color_scheme
+            )
+            
+            popup_html = self._create_popup_html(
+                row, zip_code, show_buildings, zip_stats.get(zip_code), zip_buildings.get(zip_code), year_note
+            )
+            
+            folium.CircleMarker(
+                location=coords,
+                radius=8,
+                popup=folium.Popup(popup_html, max_width=450),
+                tooltip=f"ZIP: {zip_code}",
+                color=color,
+                fill=True,
+                fillColor=color,
+                fillOpacity=opacity,
+                weight=2
+            ).add_to(map_obj)
         
         return map_obj
     
+    def _prefetch_building_data(self, zip_codes, building_stats, data_service):
+        # Everything the popups need, read once per render: the stats rows
+        # keyed by ZIP and the top buildings of every ZIP in a single query.
+        zip_stats = {}
+        if not building_stats.empty:
+            zip_stats = {
+                str(record["zip"]).zfill(5): record
+                for record in building_stats.drop_duplicates("zip").to_dict("records")
+            }
+        
+        year_min = year_max = None
+        try:
+            import streamlit as st
+            year_min = st.session_state.get("year_filter_min")
+            year_max = st.session_state.get("year_filter_max")
+        except (ImportError, RuntimeError):
+            pass
+        if year_min is None or year_max is None:
+            year_min = year_max = None
+        
+        year_note = ""
+        if year_min is not None:
+            year_note = f"""<p style="font-size: 10px; color: #666; margin: 0 0 4px 0;">Built {year_min}-{year_max}</p>"""
+        
+        zip_buildings = {}
+        try:
+            buildings = data_service.get_top_buildings_by_zips(
+                [z for z in zip_codes if z in zip_stats], year_min, year_max, limit=5
+            )
+            zip_buildings = {z: group for z, group in buildings.groupby("zip", sort=False)}
+        except SQLAlchemyError:
+            logger.exception("Could not load popup buildings for %d ZIPs", len(zip_codes))
+        
+        return zip_stats, zip_buildings, year_note
+    
     def add_heatmap_layer(self, map_obj, data, coords_dict, metric_column):
         if data.empty or metric_column not in data.columns:
             return map_obj
@@ -151,7 +199,7 @@ class MapLayerManager:
         idx = int(normalized * (len(colors) - 1))
         return colors[idx]
     
-    def _create_popup_html(self, row, zip_code, building_stats=None, data_service=None):
+    def _create_popup_html(self, row, zip_code, show_buildings=False, stats=None, buildings=None, year_note=""):
         median_rent = pd.to_numeric(row.get('median_rent'), errors='coerce')
         median_income = pd.to_numeric(row.get('median_income'), errors='coerce')
         vacancy_rate = pd.to_numeric(row.get('vacancy_rate'), errors='coerce')
@@ -170,11 +218,8 @@ class MapLayerManager:
         building_stats_html = ""
         building_list_html = ""
         
-        if building_stats is not None and data_service is not None:
-            zip_building_stats = building_stats[building_stats['zip'] == zip_code] if not building_stats.empty else None
-            
-            if zip_building_stats is not None and not zip_building_stats.empty:
-                stats = zip_building_stats.iloc[0]
+        if show_buildings:
+            if stats is not None:
                 total_buildings = stats.get('total_buildings', 0)
                 avg_floors = stats.get('avg_floors')
                 avg_year = stats.get('avg_year_built')
@@ -188,6 +233,7 @@ class MapLayerManager:
                 
                 building_stats_html = f"""
                 <div class="tab-content" id="building-stats">
+                    {year_note}
                     <table style="width: 100%; border-collapse: collapse;">
                         <tr><td style="padding: 4px 0;"><b>Total Buildings:</b></td><td style="text-align: right;">{total_buildings:,}</td></tr>
                         <tr><td style="padding: 4px 0;"><b>Avg Floors:</b></td><td style="text-align: right;">{avg_floors_str}</td></tr>
@@ -201,48 +247,37 @@ class MapLayerManager:
                 </div>
                 """
 
-                try:
-                    import streamlit as st
-                    year_min = st.session_state.get("year_filter_min")
-                    year_max = st.session_state.get("year_filter_max")
-                    
-                    if year_min is not None and year_max is not None:
-                        buildings = data_service.get_buildings_by_zip_filtered(zip_code, year_min, year_max, limit=5)
-                    else:
-                        buildings = data_service.get_buildings_by_zip(zip_code, limit=5)
-                    if not buildings.empty:
-                        building_rows = ""
-                        for _, bldg in buildings.iterrows():
-                            addr = str(bldg.get('address', 'N/A'))[:30]
-                            year = int(bldg.get('yearbuilt')) if pd.notna(bldg.get('yearbuilt')) else 'N/A'
-                            floors = int(bldg.get('numfloors')) if pd.notna(bldg.get('numfloors')) else 'N/A'
-                            units = int(bldg.get('unitsres')) if pd.notna(bldg.get('unitsres')) else 'N/A'
-                            
-                            building_rows += f"""
-                            <tr style="border-bottom: 1px solid #eee;">
-                                <td style="padding: 4px 0; font-size: 10px;">{addr}</td>
-                                <td style="text-align: center; font-size: 10px;">{year}</td>
-                                <td style="text-align: center; font-size: 10px;">{floors}</td>
-                                <td style="text-align: center; font-size: 10px;">{units}</td>
-                            </tr>
-                            """
+                if buildings is not None and not buildings.empty:
+                    building_rows = ""
+                    for _, bldg in buildings.iterrows():
+                        addr = str(bldg.get('address', 'N/A'))[:30]
+                        year = int(bldg.get('yearbuilt')) if pd.notna(bldg.get('yearbuilt')) else 'N/A'
+                        floors = int(bldg.get('numfloors')) if pd.notna(bldg.get('numfloors')) else 'N/A'
+                        units = int(bldg.get('unitsres')) if pd.notna(bldg.get('unitsres')) else 'N/A'
                         
-                        building_list_html = f"""
-                        <div class="tab-content" id="building-list">
-                            <table style="width: 100%; border-collapse: collapse; font-size: 11px;">
-                                <tr style="background: #f5f5f5; border-bottom: 2px solid #ddd;">
-                                    <th style="padding: 4px; text-align: left;">Address</th>
-                                    <th style="padding: 4px; text-align: center;">Year</th>
-                                    <th style="padding: 4px; text-align: center;">Floors</th>
-                                    <th style="padding: 4px; text-align: center;">Units</th>
-                                </tr>
-                                {building_rows}
-                            </table>
-                            <p style="font-size: 10px; color: #666; margin-top: 5px; text-align: center;">Showing top 5 buildings</p>
-                        </div>
+                        building_rows += f"""
+                        <tr style="border-bottom: 1px solid #eee;">
+                            <td style="padding: 4px 0; font-size: 10px;">{addr}</td>
+                            <td style="text-align: center; font-size: 10px;">{year}</td>
+                            <td style="text-align: center; font-size: 10px;">{floors}</td>
+                            <td style="text-align: center; font-size: 10px;">{units}</td>
+                        </tr>
                         """
-                except:
-                    pass
+                    
+                    building_list_html = f"""
+                    <div class="tab-content" id="building-list">
+                        <table style="width: 100%; border-collapse: collapse; font-size: 11px;">
+                            <tr style="background: #f5f5f5; border-bottom: 2px solid #ddd;">
+                                <th style="padding: 4px; text-align: left;">Address</th>
+                                <th style="padding: 4px; text-align: center;">Year</th>
+                                <th style="padding: 4px; text-align: center;">Floors</th>
+                                <th style="padding: 4px; text-align: center;">Units</th>
+                            </tr>
+                            {building_rows}
+                        </table>
+                        <p style="font-size: 10px; color: #666; margin-top: 5px; text-align: center;">Showing top 5 buildings</p>
+                    </div>
+                    """
             else:
                 building_stats_html = """
                 <div class="tab-content" id="building-stats">
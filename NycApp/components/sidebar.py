@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 
 class SidebarManager:
@@ -13,6 +14,14 @@ class SidebarManager:
         }
 
         
+        self.stage_columns = {
+            "http_seconds": "HTTP",
+            "parse_seconds": "Parse",
+            "transform_seconds": "Transform",
+            "db_write_seconds": "DB write",
+            "stats_seconds": "Stats"
+        }
+        
         self.color_schemes = {
             "YlOrRd": "Yellow-Orange-Red",
             "Blues": "Blues",
@@ -172,6 +181,34 @@ class SidebarManager:
             "compare_metric": compare_metric
         }
     
+    def render_sync_telemetry(self, data_service):
+        runs = data_service.get_sync_runs()
+        if runs.empty:
+            return
+        
+        st.markdown("**Sync Telemetry**")
+        sync_type = st.selectbox("Sync Type", sorted(runs["sync_type"].unique()), key="telemetry_sync_type")
+        runs = runs[runs["sync_type"] == sync_type]
+        latest = runs.iloc[-1]
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Wall Time", f"{latest['wall_seconds']:.1f}s")
+            st.metric("Downloaded", f"{(latest['http_bytes'] or 0) / 1e6:.1f} MB")
+        with col2:
+            st.metric("Rows/s", f"{latest['rows_per_sec'] if pd.notna(latest['rows_per_sec']) else 0:,.0f}")
+            st.metric("Peak RSS", f"{latest['peak_rss_mb']:.0f} MB" if pd.notna(latest["peak_rss_mb"]) else "n/a")
+        st.caption(
+            f"{latest['status']} · {int(latest['http_requests'] or 0)} requests, "
+            f"{int(latest['cache_hits'] or 0)} cached, {int(latest['retries'] or 0)} retries"
+        )
+        
+        stages = latest[list(self.stage_columns)].fillna(0).astype(float).rename(self.stage_columns)
+        st.bar_chart(stages.rename("seconds"), height=180)
+        if len(runs) > 1:
+            trend = runs.set_index("started_at")[list(self.stage_columns)].rename(columns=self.stage_columns)
+            st.line_chart(trend, height=180)
+    
     def render_sync_controls(self, data_service, auto_sync_manager=None):
         st.divider()
         
@@ -190,6 +227,8 @@ class SidebarManager:
             if st.button("Sync All Data", type="primary", use_container_width=True, key="sync_all_btn"):
                 return "sync_all"
             
+            self.render_sync_telemetry(data_service)
+            
             st.divider()
             
             if auto_sync_manager:
@@ -239,6 +278,23 @@ class SidebarManager:
                     if sync_census != auto_sync_status["sync_census"] or sync_pluto != auto_sync_status["sync_pluto"]:
                         auto_sync_manager.update_config(sync_census=sync_census, sync_pluto=sync_pluto)
                     
+                    if sync_pluto:
+                        pluto_incremental = st.checkbox(
+                            "Incremental PLUTO (changed lots only)",
+                            value=auto_sync_status["pluto_incremental"],
+                            key="auto_sync_pluto_incremental"
+                        )
+                        if pluto_incremental != auto_sync_status["pluto_incremental"]:
+                            auto_sync_manager.update_config(pluto_incremental=pluto_incremental)
+                        
+                        pluto_stats_only = st.checkbox(
+                            "ZIP statistics only (no building list)",
+                            value=auto_sync_status["pluto_stats_only"],
+                            key="auto_sync_pluto_stats_only"
+                        )
+                        if pluto_stats_only != auto_sync_status["pluto_stats_only"]:
+                            auto_sync_manager.update_config(pluto_stats_only=pluto_stats_only)
+                    
                     if auto_sync_status["last_sync"]:
                         last_sync_dt = datetime.fromisoformat(auto_sync_status["last_sync"])
                         st.caption(f"Last Auto Sync: {last_sync_dt.strftime('%Y-%m-%d %H:%M')}")
@@ -255,6 +311,12 @@ class SidebarManager:
             if last_sync:
                 st.caption(f"Last Manual Sync: {last_sync['time'].strftime('%Y-%m-%d %H:%M')}")
                 st.caption(f"Status: {last_sync['status']} | {last_sync['records']} records")
+            
+            cache = data_service.get_cache_stats()
+            st.caption(
+                f"Result cache: {cache['hits']:,} hits, {cache['misses']:,} misses, "
+                f"{cache['entries']}/{cache['max_entries']} entries"
+            )
         
         return None
 
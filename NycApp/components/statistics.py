@@ -205,8 +205,10 @@ class StatisticsPanel:
         
         st.plotly_chart(fig, use_container_width=True)
     
-    def render_building_stats_detailed(self, building_row):
+    def render_building_stats_detailed(self, building_row, year_range=None):
         st.markdown("### Building Statistics")
+        if year_range is not None:
+            st.caption(f"Buildings built {year_range[0]}-{year_range[1]}")
         
         col1, col2, col3 = st.columns(3)
         
@@ -254,7 +256,67 @@ class StatisticsPanel:
         
         st.plotly_chart(fig, use_container_width=True)
     
-    def render_zip_rank_analysis(self, all_df, selected_zip):
+    def render_building_browser(self, data_service, zip_code, total_buildings=None, year_range=None):
+        st.markdown("### Building Browser")
+        sort_labels = {
+            "yearbuilt": "Year Built",
+            "numfloors": "Floors",
+            "unitsres": "Residential Units",
+            "address": "Address"
+        }
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            sort_by = st.selectbox("Sort By", list(sort_labels), format_func=sort_labels.get, key="browser_sort")
+        with col2:
+            descending = st.checkbox("Descending", key="browser_desc")
+        
+        year_min, year_max = year_range if year_range is not None else (None, None)
+        # Loaded pages are kept across reruns and dropped when the view or
+        # the building data changes.
+        view = (zip_code, sort_by, descending, year_min, year_max,
+                data_service.dataset_versions().get("building_info"))
+        browser = st.session_state.get("building_browser")
+        if browser is None or browser["view"] != view:
+            page = data_service.get_buildings_page(
+                zip_code, sort_by, descending, year_min=year_min, year_max=year_max
+            )
+            browser = {"view": view, "pages": [page["rows"]], "cursor": page["next_cursor"]}
+            st.session_state["building_browser"] = browser
+        
+        buildings = pd.concat(browser["pages"], ignore_index=True)
+        if buildings.empty:
+            st.info("No buildings found for this ZIP Code")
+            return
+        
+        columns = {
+            "address": "Address",
+            "yearbuilt": "Year Built",
+            "numfloors": "Floors",
+            "unitsres": "Residential Units",
+            "landuse": "Land Use",
+            "borough": "Borough",
+            "bbl": "BBL"
+        }
+        st.dataframe(
+            buildings[list(columns)].rename(columns=columns),
+            height=420,
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        total_str = f" of {total_buildings:,}" if total_buildings is not None and pd.notna(total_buildings) else ""
+        st.caption(f"Showing {len(buildings):,}{total_str} buildings")
+        
+        if browser["cursor"] and st.button("Load More", key="browser_more"):
+            page = data_service.get_buildings_page(
+                zip_code, sort_by, descending, browser["cursor"], year_min=year_min, year_max=year_max
+            )
+            browser["pages"].append(page["rows"])
+            browser["cursor"] = page["next_cursor"]
+            st.rerun()
+    
+    def render_zip_rank_analysis(self, all_df, selected_zip, citywide=False):
         st.markdown("### Ranking Analysis")
         
         metrics = ["median_rent", "median_income", "vacancy_rate"]
@@ -263,11 +325,16 @@ class StatisticsPanel:
             if metric in all_df.columns:
                 valid_df = all_df[all_df[metric].notna()].copy()
                 if not valid_df.empty:
-                    sorted_df = valid_df.sort_values(metric, ascending=False).reset_index(drop=True)
-                    rank = sorted_df[sorted_df["zip"] == selected_zip].index
+                    # Unfiltered, zip_summary's citywide ranks apply as stored;
+                    # otherwise rank within the filtered ZIPs, ties the same way.
+                    if citywide and f"{metric}_rank" in valid_df.columns:
+                        ranks = valid_df[f"{metric}_rank"]
+                    else:
+                        ranks = valid_df[metric].rank(ascending=False, method="min")
+                    rank = ranks[valid_df["zip"] == selected_zip].tolist()
                     if len(rank) > 0:
-                        rank = rank[0] + 1
-                        total = len(sorted_df)
+                        rank = int(rank[0])
+                        total = len(valid_df)
                         percentile = ((total - rank) / total) * 100
                         
                         st.markdown(f"**{self.metric_labels.get(metric, metric)}**")
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
@@ -16,9 +16,19 @@ if DB_TYPE == "postgresql":
     DB_NAME = os.getenv("DB_NAME", "nyc_housing")
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 else:
-    DB_PATH = BASE_DIR / "data" / "nyc_housing.db"
+    DB_PATH = Path(os.getenv("SQLITE_PATH", BASE_DIR / "data" / "nyc_housing.db"))
     DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# Dashboard reads get their own read-only pool so they never queue behind a sync.
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_MB", "256")) * 2**20,
+    "cache_size": -int(os.getenv("SQLITE_CACHE_MB", "64")) * 1024,
+    "temp_store": "MEMORY",
+}
+
 if DB_TYPE == "postgresql":
     engine = create_engine(
         DATABASE_URL,
@@ -27,14 +37,50 @@ if DB_TYPE == "postgresql":
         pool_size=10,
         max_overflow=20
     )
+    read_engine = create_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_pre_ping=True,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE * 2,
+        connect_args={"options": "-c default_transaction_read_only=on"}
+    )
 else:
     engine = create_engine(
         DATABASE_URL,
         echo=False,
         connect_args={"check_same_thread": False}
     )
+    read_engine = create_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE * 2,
+        connect_args={"check_same_thread": False}
+    )
+
+    def apply_sqlite_pragmas(dbapi_connection, read_only):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            # The journal mode is stored in the database file, so the writer
+            # sets it once; readers only tune their own connection.
+            if read_only and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    event.listen(engine, "connect", lambda conn, record: apply_sqlite_pragmas(conn, False))
+    event.listen(read_engine, "connect", lambda conn, record: apply_sqlite_pragmas(conn, True))
+
+# Indexes superseded by wider ones; dropped when an existing database is migrated.
+RETIRED_INDEXES = {
+    "building_info": ["ix_building_info_zipcode"],
+}
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 
@@ -46,5 +92,46 @@ def get_db():
         db.close()
 
 
+def migrate_schema():
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    )
+
+
+def migrate_indexes():
+    # create_all only builds indexes for tables it creates, so add the ones
+    # declared on the models to tables from older versions, and rebuild those
+    # whose columns have changed since.
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes(table.name)}
+            for name in RETIRED_INDEXES.get(table.name, []):
+                if name in existing_indexes:
+                    conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            for index in table.indexes:
+                columns = [c.name for c in index.columns]
+                if index.name in existing_indexes and existing_indexes[index.name] != columns:
+                    conn.exec_driver_sql(f'DROP INDEX "{index.name}"')
+                    index.create(conn)
+                elif index.name not in existing_indexes:
+                    index.create(conn)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    migrate_indexes()
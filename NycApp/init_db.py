@@ -5,6 +5,7 @@ sys.path.append(str(Path(__file__).parent))
 
 from config.database import init_db
 from services.data_sync import manual_sync, load_from_csv, DataSyncService
+from services.snapshots import snapshot_exists
 
 
 def initialize():
@@ -15,15 +16,15 @@ def initialize():
     print("\nChecking for existing CSV data...")
     data_dir = Path(__file__).parent / "data"
     csv_files_exist = all([
-        (data_dir / "nyc_zip_list.csv").exists(),
-        (data_dir / "nyc_rent.csv").exists(),
-        (data_dir / "nyc_income.csv").exists(),
-        (data_dir / "nyc_burden.csv").exists(),
-        (data_dir / "nyc_housing.csv").exists(),
-        (data_dir / "nyc_vacancy.csv").exists()
+        snapshot_exists(data_dir, "nyc_zip_list"),
+        snapshot_exists(data_dir, "nyc_rent"),
+        snapshot_exists(data_dir, "nyc_income"),
+        snapshot_exists(data_dir, "nyc_burden"),
+        snapshot_exists(data_dir, "nyc_housing"),
+        snapshot_exists(data_dir, "nyc_vacancy")
     ])
 
-    pluto_csv_exists = (data_dir / "pluto_residential.csv").exists()
+    pluto_csv_exists = snapshot_exists(data_dir, "pluto_residential")
 
     if csv_files_exist:
         print("CSV files found. Loading data from CSV...")
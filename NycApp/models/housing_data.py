@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, Boolean, Index
 from sqlalchemy.sql import func
 from config.database import Base
 
@@ -30,6 +30,16 @@ class HousingMetrics(Base):
 
 class BuildingInfo(Base):
     __tablename__ = "building_info"
+    # Popup lookups filter on one ZIP and a yearbuilt range and take the
+    # first ids in (yearbuilt, id) order; the ZIP prefix also serves the
+    # ZIP-only queries. The others back the building browser's keyset pages,
+    # one per sort column.
+    __table_args__ = (
+        Index("ix_building_info_zipcode_yearbuilt", "zipcode", "yearbuilt", "id"),
+        Index("ix_building_info_zipcode_numfloors", "zipcode", "numfloors", "id"),
+        Index("ix_building_info_zipcode_unitsres", "zipcode", "unitsres", "id"),
+        Index("ix_building_info_zipcode_address", "zipcode", "address", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     bbl = Column(String(20), unique=True, index=True, nullable=False)
@@ -38,8 +48,9 @@ class BuildingInfo(Base):
     numfloors = Column(Integer)
     unitsres = Column(Integer)
     address = Column(String(200))
-    zipcode = Column(String(5), index=True)
+    zipcode = Column(String(5))
     borough = Column(String(50))
+    content_hash = Column(String(16))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -58,6 +69,52 @@ class BuildingStats(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class BuildingYearHistogram(Base):
+    # Running totals per ZIP over yearbuilt; see services.building_stats.YearHistogram.
+    __tablename__ = "building_year_histogram"
+    __table_args__ = (Index("ix_building_year_histogram_zip_year", "zip", "year", unique=True),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    zip = Column(String(5), nullable=False)
+    year = Column(Integer, nullable=False)
+    cum_buildings = Column(Integer)
+    cum_floors = Column(Float)
+    cum_floor_lots = Column(Integer)
+    cum_units = Column(Integer)
+    cum_year_sum = Column(BigInteger)
+
+class ZipSummary(Base):
+    # Rebuilt after every sync from housing_metrics and building_stats.
+    __tablename__ = "zip_summary"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    zip = Column(String(5), unique=True, index=True, nullable=False)
+    has_housing = Column(Boolean, default=False)
+    has_buildings = Column(Boolean, default=False)
+    name = Column(String(100))
+    median_rent = Column(Float)
+    median_income = Column(Float)
+    rent_burden = Column(Float)
+    rent_burden_rate = Column(Float)
+    housing_units = Column(Integer)
+    total_units = Column(Integer)
+    occupied_units = Column(Integer)
+    vacant_units = Column(Integer)
+    vacancy_rate = Column(Float)
+    total_buildings = Column(Integer)
+    avg_floors = Column(Float)
+    avg_year_built = Column(Integer)
+    total_residential_units = Column(Integer)
+    buildings_pre_1950 = Column(Integer)
+    buildings_1950_2000 = Column(Integer)
+    buildings_post_2000 = Column(Integer)
+    median_rent_rank = Column(Integer)
+    median_income_rank = Column(Integer)
+    rent_burden_rate_rank = Column(Integer)
+    vacancy_rate_rank = Column(Integer)
+    total_buildings_rank = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class SyncLog(Base):
     __tablename__ = "sync_logs"
     
@@ -66,5 +123,58 @@ class SyncLog(Base):
     status = Column(String(20), nullable=False)
     records_processed = Column(Integer, default=0)
     error_message = Column(Text)
-    sync_time = Column(DateTime(timezone=True), server_default=func.now())
+    details = Column(Text)
+    sync_time = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class SyncCheckpoint(Base):
+    __tablename__ = "sync_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sync_type = Column(String(50), nullable=False, index=True)
+    partition_low = Column(BigInteger, nullable=False)
+    partition_high = Column(BigInteger, nullable=False)
+    last_key = Column(BigInteger)
+    pages_done = Column(Integer, default=0)
+    rows_done = Column(Integer, default=0)
+    completed = Column(Boolean, default=False)
+    dataset_version = Column(String(50))
+    params = Column(Text)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+    __table_args__ = (Index("ix_sync_runs_type_started", "sync_type", "started_at"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    log_id = Column(Integer, index=True)
+    sync_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    started_at = Column(DateTime(timezone=True), index=True)
+    runs = Column(Integer, default=1)
+    wall_seconds = Column(Float)
+    records = Column(Integer)
+    rows_per_sec = Column(Float)
+    peak_rss_mb = Column(Float)
+    http_seconds = Column(Float)
+    http_bytes = Column(BigInteger)
+    http_requests = Column(Integer)
+    cache_hits = Column(Integer)
+    retries = Column(Integer)
+    parse_seconds = Column(Float)
+    transform_seconds = Column(Float)
+    db_write_seconds = Column(Float)
+    db_rows = Column(Integer)
+    stats_seconds = Column(Float)
+
+
+class DatasetVersion(Base):
+    # One counter per table, bumped in the commit that changes it; see
+    # services.result_cache.
+    __tablename__ = "dataset_versions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset = Column(String(64), unique=True, index=True, nullable=False)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -26,7 +26,9 @@ class AutoSyncManager:
             "interval_hours": 24,
             "last_sync": None,
             "sync_census": True,
-            "sync_pluto": False
+            "sync_pluto": False,
+            "pluto_incremental": True,
+            "pluto_stats_only": False
         }
     
     def save_config(self):
@@ -34,7 +36,8 @@ class AutoSyncManager:
         with open(self.config_file, 'w') as f:
             json.dump(self.config, f, indent=2)
     
-    def update_config(self, enabled=None, interval_hours=None, sync_census=None, sync_pluto=None):
+    def update_config(self, enabled=None, interval_hours=None, sync_census=None, sync_pluto=None,
+                      pluto_incremental=None, pluto_stats_only=None):
         if enabled is not None:
             self.config["enabled"] = enabled
         if interval_hours is not None:
@@ -43,6 +46,10 @@ class AutoSyncManager:
             self.config["sync_census"] = sync_census
         if sync_pluto is not None:
             self.config["sync_pluto"] = sync_pluto
+        if pluto_incremental is not None:
+            self.config["pluto_incremental"] = pluto_incremental
+        if pluto_stats_only is not None:
+            self.config["pluto_stats_only"] = pluto_stats_only
         self.save_config()
     
     def should_sync(self):
@@ -71,7 +78,10 @@ class AutoSyncManager:
             
             if self.config["sync_pluto"]:
                 try:
-                    pluto_records = sync_service.sync_pluto_data()
+                    pluto_records = sync_service.sync_pluto_data(
+                        incremental=self.config.get("pluto_incremental", True),
+                        stats_only=self.config.get("pluto_stats_only", False)
+                    )
                     results["pluto"] = pluto_records
                 except Exception as e:
                     error_msg = f"PLUTO sync failed: {str(e)}"
@@ -135,6 +145,8 @@ class AutoSyncManager:
             "last_sync": self.config["last_sync"],
             "sync_census": self.config["sync_census"],
             "sync_pluto": self.config["sync_pluto"],
+            "pluto_incremental": self.config.get("pluto_incremental", True),
+            "pluto_stats_only": self.config.get("pluto_stats_only", False),
             "next_sync": None,
             "time_until_sync": None
         }
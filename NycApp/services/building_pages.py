@@ -0,0 +1,51 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import select
+
+from models.housing_data import BuildingInfo
+
+SORT_COLUMNS = ["yearbuilt", "numfloors", "unitsres", "address"]
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_by, descending, value, last_id):
+    payload = {"s": sort_by, "d": descending, "v": value, "i": last_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor, sort_by, descending):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, last_id = payload["v"], int(payload["i"])
+        same_order = payload["s"] == sort_by and bool(payload["d"]) == descending
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid building page cursor: {e}")
+    if not same_order:
+        raise ValueError("Building page cursor was issued for a different sort order")
+    return value, last_id
+
+
+def page_queries(columns, sort_by, descending, where, after=None):
+    # Seek past the last (value, id) seen instead of using OFFSET. The rest of
+    # the order is split into runs that are each one range on a
+    # (zipcode, <column>, id) index: the ties with the last value, the values
+    # beyond it, then the rows without a value, by id. A page takes rows from
+    # the runs in turn, so page 500 costs the same as page 1.
+    b = BuildingInfo.__table__.c
+    col = b[sort_by]
+    base = select(*columns).where(*where)
+    by_value = (col.desc(), b.id.desc()) if descending else (col, b.id)
+    nulls = base.where(col.is_(None)).order_by(b.id)
+
+    if after is None:
+        return [base.where(col.isnot(None)).order_by(*by_value), nulls]
+
+    value, last_id = after
+    if value is None:
+        return [nulls.where(b.id > last_id)]
+    ties = base.where(col == value, b.id < last_id if descending else b.id > last_id)
+    beyond = base.where(col < value if descending else col > value)
+    return [ties.order_by(b.id.desc() if descending else b.id), beyond.order_by(*by_value), nulls]
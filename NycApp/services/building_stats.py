@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, case
+from models.housing_data import BuildingInfo
+
+STATS_COLUMNS = [
+    "zip", "total_buildings", "avg_floors", "avg_year_built", "total_residential_units",
+    "buildings_pre_1950", "buildings_1950_2000", "buildings_post_2000"
+]
+SQL_AGGREGATE_DIALECTS = ("sqlite", "postgresql")
+
+
+def _era_count(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def building_stats_query(zip_codes=None):
+    b = BuildingInfo.__table__.c
+    stmt = (
+        select(
+            b.zipcode.label("zip"),
+            func.count().label("total_buildings"),
+            func.avg(b.numfloors).label("avg_floors"),
+            func.avg(b.yearbuilt).label("avg_year_built"),
+            func.coalesce(func.sum(b.unitsres), 0).label("total_residential_units"),
+            _era_count(b.yearbuilt < 1950).label("buildings_pre_1950"),
+            _era_count(b.yearbuilt.between(1950, 2000)).label("buildings_1950_2000"),
+            _era_count(b.yearbuilt > 2000).label("buildings_post_2000"),
+        )
+        .where(b.zipcode.isnot(None))
+        .group_by(b.zipcode)
+    )
+    if zip_codes is not None:
+        stmt = stmt.where(b.zipcode.in_(zip_codes))
+    return stmt
+
+
+def aggregate_building_stats(df):
+    if df.empty:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    df = df[df["zipcode"].notna()]
+    year = pd.to_numeric(df["yearbuilt"], errors="coerce")
+    work = pd.DataFrame({
+        "zip": df["zipcode"].astype(str),
+        "numfloors": pd.to_numeric(df["numfloors"], errors="coerce"),
+        "yearbuilt": year,
+        "unitsres": pd.to_numeric(df["unitsres"], errors="coerce"),
+        "pre_1950": (year < 1950).astype("int64"),
+        "y1950_2000": ((year >= 1950) & (year <= 2000)).astype("int64"),
+        "post_2000": (year > 2000).astype("int64"),
+    })
+    grouped = work.groupby("zip", sort=True).agg(
+        total_buildings=("zip", "size"),
+        avg_floors=("numfloors", "mean"),
+        avg_year_built=("yearbuilt", "mean"),
+        total_residential_units=("unitsres", "sum"),
+        buildings_pre_1950=("pre_1950", "sum"),
+        buildings_1950_2000=("y1950_2000", "sum"),
+        buildings_post_2000=("post_2000", "sum"),
+    ).reset_index()
+    return finalize_stats_frame(grouped)
+
+
+def finalize_stats_frame(df):
+    out = df[STATS_COLUMNS].copy()
+    out["zip"] = out["zip"].astype(str).astype(object)
+    out["avg_floors"] = pd.to_numeric(out["avg_floors"], errors="coerce").astype("float64")
+    # Match the historical int() truncation of the mean year.
+    out["avg_year_built"] = np.trunc(pd.to_numeric(out["avg_year_built"], errors="coerce")).astype("Int64")
+    for col in ["total_buildings", "total_residential_units", "buildings_pre_1950",
+                "buildings_1950_2000", "buildings_post_2000"]:
+        out[col] = pd.to_numeric(out[col], errors="coerce").fillna(0).astype("int64")
+    return out
+
+
+HISTOGRAM_SUMS = ["buildings", "floors", "floor_lots", "units", "year_sum"]
+HISTOGRAM_COLUMNS = ["zip", "year"] + [f"cum_{name}" for name in HISTOGRAM_SUMS]
+# Era bounds as in building_stats_query: pre-1950, 1950-2000, post-2000.
+ERAS = [("buildings_pre_1950", None, 1949), ("buildings_1950_2000", 1950, 2000), ("buildings_post_2000", 2001, None)]
+
+
+def year_histogram_query(zip_codes=None):
+    b = BuildingInfo.__table__.c
+    stmt = (
+        select(
+            b.zipcode.label("zip"),
+            b.yearbuilt.label("year"),
+            func.count().label("buildings"),
+            func.coalesce(func.sum(b.numfloors), 0).label("floors"),
+            func.count(b.numfloors).label("floor_lots"),
+            func.coalesce(func.sum(b.unitsres), 0).label("units"),
+        )
+        .where(b.zipcode.isnot(None), b.yearbuilt.isnot(None))
+        .group_by(b.zipcode, b.yearbuilt)
+    )
+    if zip_codes is not None:
+        stmt = stmt.where(b.zipcode.in_(zip_codes))
+    return stmt
+
+
+def cumulative_histogram(df):
+    # One row per ZIP and year that has buildings, holding running totals
+    # from the ZIP's oldest year up to and including that year.
+    if df.empty:
+        return pd.DataFrame(columns=HISTOGRAM_COLUMNS)
+    df = df.sort_values(["zip", "year"], ignore_index=True)
+    df["year"] = df["year"].astype("int64")
+    df["year_sum"] = df["year"] * df["buildings"]
+    out = df[["zip", "year"]].copy()
+    sums = df.groupby("zip", sort=False)[HISTOGRAM_SUMS].cumsum()
+    for name in HISTOGRAM_SUMS:
+        out[f"cum_{name}"] = sums[name]
+    out["zip"] = out["zip"].astype(str).astype(object)
+    return out
+
+
+def finalize_histogram_frame(df):
+    # Per-ZIP, per-year counts from a SoQL aggregate, as cumulative rows.
+    out = df[["zip"]].copy()
+    out["year"] = pd.to_numeric(df["year"], errors="coerce")
+    for col in ["buildings", "floors", "floor_lots", "units"]:
+        out[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    out = out[out["zip"].notna() & out["year"].notna()]
+    for col in ["buildings", "floor_lots", "units"]:
+        out[col] = out[col].astype("int64")
+    return cumulative_histogram(out)
+
+
+class YearHistogram:
+    # Dense prefix sums over every year for every ZIP, so statistics for a
+    # year range are two lookups per ZIP instead of a scan of building_info.
+    def __init__(self, df):
+        df = df[HISTOGRAM_COLUMNS] if not df.empty else pd.DataFrame(columns=HISTOGRAM_COLUMNS)
+        self.zips = sorted(df["zip"].unique())
+        self.first_year = int(df["year"].min()) if not df.empty else 0
+        n_years = int(df["year"].max()) - self.first_year + 1 if not df.empty else 0
+        # Column 0 is the total before first_year, i.e. zero.
+        self.prefix = np.zeros((len(HISTOGRAM_SUMS), len(self.zips), n_years + 1))
+        if not df.empty:
+            rows = pd.Index(self.zips).get_indexer(df["zip"])
+            cols = df["year"].to_numpy(dtype="int64") - self.first_year + 1
+            for i, name in enumerate(HISTOGRAM_SUMS):
+                self.prefix[i, rows, cols] = df[f"cum_{name}"].to_numpy(dtype="float64")
+            # Running totals never decrease, so carrying the maximum forward
+            # fills the years a ZIP has no buildings for.
+            np.maximum.accumulate(self.prefix, axis=2, out=self.prefix)
+    
+    def _through(self, year):
+        if year is None:
+            return self.prefix[:, :, -1]
+        return self.prefix[:, :, int(np.clip(year - self.first_year + 1, 0, self.prefix.shape[2] - 1))]
+    
+    def _between(self, year_min, year_max):
+        if year_min is not None and year_max is not None and year_min > year_max:
+            return np.zeros(self.prefix.shape[:2])
+        before = 0 if year_min is None else self._through(year_min - 1)
+        return self._through(year_max) - before
+    
+    def stats(self, year_min=None, year_max=None, zip_codes=None):
+        buildings, floors, floor_lots, units, year_sum = self._between(year_min, year_max)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = pd.DataFrame({
+                "zip": self.zips,
+                "total_buildings": buildings,
+                "avg_floors": np.where(floor_lots > 0, floors / floor_lots, np.nan),
+                "avg_year_built": np.where(buildings > 0, year_sum / buildings, np.nan),
+                "total_residential_units": units,
+            })
+        for col, era_min, era_max in ERAS:
+            lo = era_min if year_min is None else max(year_min, era_min or year_min)
+            hi = era_max if year_max is None else min(year_max, era_max or year_max)
+            out[col] = self._between(lo, hi)[0]
+        if zip_codes is not None:
+            # ZIPs without dated buildings come back as zero counts.
+            out = out.set_index("zip").reindex(list(zip_codes)).reset_index()
+        return finalize_stats_frame(out)
@@ -0,0 +1,194 @@
+import csv
+import io
+import os
+import pandas as pd
+from sqlalchemy import Index, Integer, MetaData, func, insert, inspect, select
+
+from services import telemetry
+from services.result_cache import mark_changed
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_MAX_MEMORY_MB = 256
+COPY_NULL = "\\N"
+SHADOW_SUFFIX = "__shadow"
+# A rebuilt table smaller than this fraction of the live one is treated as a
+# truncated download and is not swapped in.
+SHADOW_MIN_RATIO = float(os.getenv("SHADOW_MIN_RATIO", 0.5))
+
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    if df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+class ChunkBuffer:
+    # Collects pages until chunk_size rows or max_memory_mb of frames have
+    # arrived. This is a soft flush threshold, not a ceiling: it is checked
+    # after each page, so a single page larger than the budget still passes
+    # through whole.
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        self.chunk_size = chunk_size
+        self.max_bytes = max_memory_mb * 1024 * 1024
+        self.frames = []
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, df):
+        self.frames.append(df)
+        self.rows += len(df)
+        self.bytes += int(df.memory_usage(deep=True).sum())
+
+    def full(self):
+        return self.rows >= self.chunk_size or self.bytes >= self.max_bytes
+
+    def drain(self):
+        if not self.frames:
+            return pd.DataFrame()
+        df = pd.concat(self.frames, ignore_index=True)
+        self.frames = []
+        self.rows = 0
+        self.bytes = 0
+        return df
+
+
+class BulkLoader:
+    def __init__(self, session, batch_size=DEFAULT_BATCH_SIZE):
+        self.db = session
+        self.batch_size = batch_size
+        self.dialect = session.get_bind().dialect.name
+
+    def replace(self, model, data, min_ratio=None):
+        # Build the new contents next to the live table and swap them in, so
+        # readers keep seeing the previous snapshot until the commit.
+        shadow = self.create_shadow(model)
+        loaded = self.load(shadow, data)
+        self.swap(model, shadow, expected=loaded, min_ratio=min_ratio)
+        return loaded
+
+    def load(self, model, data):
+        table = getattr(model, "__table__", model)
+        records = frame_to_records(data) if isinstance(data, pd.DataFrame) else list(data)
+        if not records:
+            return 0
+
+        columns = [c.name for c in table.columns if c.name in records[0]]
+        conn = self.db.connection()
+        mark_changed(conn, table)
+
+        with telemetry.stage("db_write", rows=len(records)):
+            if self.dialect == "postgresql":
+                self._copy_load(conn, table, columns, records)
+            else:
+                stmt = insert(table)
+                for start in range(0, len(records), self.batch_size):
+                    conn.execute(stmt, records[start:start + self.batch_size])
+
+        return len(records)
+
+    def shadow_table(self, model):
+        live = model.__table__
+        shadow = live.to_metadata(MetaData(), name=live.name + SHADOW_SUFFIX)
+        # Indexes are built once the rows are in, under the live names.
+        shadow.indexes.clear()
+        return shadow
+
+    def create_shadow(self, model, resume=False):
+        shadow = self.shadow_table(model)
+        conn = self.db.connection()
+        if not resume:
+            shadow.drop(conn, checkfirst=True)
+        shadow.create(conn, checkfirst=True)
+        return shadow
+
+    def has_shadow(self, model):
+        return inspect(self.db.connection()).has_table(model.__table__.name + SHADOW_SUFFIX)
+
+    def drop_shadow(self, model):
+        self.shadow_table(model).drop(self.db.connection(), checkfirst=True)
+
+    def swap(self, model, shadow, expected=None, min_ratio=None):
+        with telemetry.stage("db_write"):
+            return self._swap(model, shadow, expected, min_ratio)
+
+    def _swap(self, model, shadow, expected, min_ratio):
+        live = model.__table__
+        conn = self.db.connection()
+        mark_changed(conn, live)
+        count = conn.scalar(select(func.count()).select_from(shadow))
+        if expected is not None and count != expected:
+            raise ValueError(f"{shadow.name} has {count} rows, expected {expected}; not swapping")
+        if min_ratio:
+            live_count = conn.scalar(select(func.count()).select_from(live))
+            if live_count and count < live_count * min_ratio:
+                raise ValueError(
+                    f"{shadow.name} has {count} rows against {live_count} live; not swapping"
+                )
+
+        if self.dialect == "postgresql":
+            # Build indexes before taking the lock on the live table, then
+            # rename them along with the table.
+            staged = []
+            for index in live.indexes:
+                temp = Index(index.name + SHADOW_SUFFIX, *[shadow.c[c.name] for c in index.columns],
+                             unique=index.unique)
+                temp.create(conn)
+                staged.append((temp.name, index.name))
+            conn.exec_driver_sql(f'DROP TABLE "{live.name}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{shadow.name}" RENAME TO "{live.name}"')
+            for temp_name, name in staged:
+                conn.exec_driver_sql(f'ALTER INDEX "{temp_name}" RENAME TO "{name}"')
+        else:
+            # pysqlite only opens a transaction on DML; open one so the drop,
+            # rename and index builds commit as a unit.
+            if not conn.connection.dbapi_connection.in_transaction:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            conn.exec_driver_sql(f'DROP TABLE "{live.name}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{shadow.name}" RENAME TO "{live.name}"')
+            self.create_indexes(live.indexes)
+        return count
+
+    def create_indexes(self, indexes):
+        conn = self.db.connection()
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+
+    def _copy_load(self, conn, table, columns, records):
+        staging = f"{table.name}_staging"
+        column_sql = ", ".join(f'"{c}"' for c in columns)
+        int_columns = {c.name for c in table.columns if isinstance(c.type, Integer)}
+
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS pg_temp."{staging}"')
+        conn.exec_driver_sql(
+            f'CREATE TEMP TABLE "{staging}" (LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP'
+        )
+
+        cursor = conn.connection.cursor()
+        try:
+            for start in range(0, len(records), self.batch_size):
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                for record in records[start:start + self.batch_size]:
+                    writer.writerow([
+                        self._copy_value(record.get(c), c in int_columns) for c in columns
+                    ])
+                buf.seek(0)
+                cursor.copy_expert(
+                    f"COPY \"{staging}\" ({column_sql}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                    buf
+                )
+        finally:
+            cursor.close()
+
+        conn.exec_driver_sql(
+            f'INSERT INTO "{table.name}" ({column_sql}) SELECT {column_sql} FROM "{staging}"'
+        )
+
+    @staticmethod
+    def _copy_value(val, is_int):
+        if val is None:
+            return COPY_NULL
+        if is_int and isinstance(val, float):
+            return int(round(val))
+        return val
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+
+import pandas as pd
+
+from services import telemetry
+from services.http_client import build_session
+
+ACS_YEAR = "2022"
+ACS_BASE = os.getenv("ACS_API_URL", f"https://api.census.gov/data/{ACS_YEAR}/acs/acs5")
+ZCTA_GEOGRAPHY = "zip code tabulation area"
+
+# The API accepts at most 50 variables per request, NAME included.
+MAX_VARIABLES_PER_REQUEST = 49
+MAX_ZCTAS_PER_REQUEST = 250
+
+ACS_TABLES = {
+    "rent": {"B25064_001E": "median_rent"},
+    "income": {"B19013_001E": "median_income"},
+    "burden": {"B25070_001E": "rent_burden"},
+    "housing": {"B25001_001E": "housing_units"},
+    "vacancy": {
+        "B25002_001E": "total_units",
+        "B25002_002E": "occupied_units",
+        "B25002_003E": "vacant_units"
+    },
+}
+ACS_VARIABLES = {var: name for table in ACS_TABLES.values() for var, name in table.items()}
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class CensusClient:
+    def __init__(self, base_url=None, session=None, max_workers=4, api_key=None, timeout=90):
+        self.base_url = base_url or ACS_BASE
+        self.max_workers = max_workers
+        self.session = session or build_session(max_workers, source="census")
+        self.api_key = api_key if api_key is not None else os.getenv("CENSUS_API_KEY")
+        self.timeout = timeout
+
+    def _get(self, variables, zips):
+        params = {
+            "get": "NAME," + ",".join(variables),
+            "for": f"{ZCTA_GEOGRAPHY}:" + (",".join(zips) if zips else "*"),
+        }
+        if self.api_key:
+            params["key"] = self.api_key
+        r = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        # 204 means no ZCTA in the list matched. Any other error, including
+        # a rejected API key or retries exhausted on 429, is raised rather
+        # than split into per-ZIP requests.
+        if zips and r.status_code == 204:
+            return None
+        r.raise_for_status()
+        with telemetry.stage("parse"):
+            data = r.json()
+            return pd.DataFrame(data[1:], columns=data[0])
+
+    def _get_scoped(self, variables, zips):
+        # A list the API returns nothing for is split until the codes without
+        # data (e.g. the MODZCTA placeholder 99999) are isolated and dropped.
+        df = self._get(variables, zips)
+        if df is not None:
+            return df
+        if len(zips) == 1:
+            return pd.DataFrame(columns=["NAME"] + list(variables) + [ZCTA_GEOGRAPHY])
+        mid = len(zips) // 2
+        return pd.concat([self._get_scoped(variables, zips[:mid]),
+                          self._get_scoped(variables, zips[mid:])], ignore_index=True)
+
+    def fetch(self, variables=None, zips=None):
+        variables = variables or ACS_VARIABLES
+        var_groups = _chunks(list(variables), MAX_VARIABLES_PER_REQUEST)
+        zip_groups = _chunks(sorted(zips), MAX_ZCTAS_PER_REQUEST) if zips else [None]
+
+        get_scoped = telemetry.bind(self._get_scoped, telemetry.current())
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                (i, j): executor.submit(get_scoped, var_group, zip_group)
+                for i, var_group in enumerate(var_groups)
+                for j, zip_group in enumerate(zip_groups)
+            }
+            results = {key: future.result() for key, future in futures.items()}
+
+        frames = []
+        for i in range(len(var_groups)):
+            frames.append(pd.concat([results[(i, j)] for j in range(len(zip_groups))], ignore_index=True))
+        df = reduce(
+            lambda left, right: left.merge(right, on=["NAME", ZCTA_GEOGRAPHY], how="outer"),
+            frames
+        )
+
+        df["zip"] = df[ZCTA_GEOGRAPHY].astype(str).str.zfill(5)
+        return df.rename(columns=variables)
@@ -1,41 +1,99 @@
+import numpy as np
 import pandas as pd
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from models.housing_data import HousingMetrics, ZipCode, SyncLog, BuildingInfo, BuildingStats
-from config.database import SessionLocal
+from models.housing_data import (
+    HousingMetrics, ZipCode, SyncLog, SyncRun, BuildingInfo, BuildingStats, ZipSummary, BuildingYearHistogram
+)
+from services.zip_summary import SUMMARY_COLUMNS, HOUSING_COLUMNS, BUILDING_COLUMNS, RANK_METRICS
+from services.building_stats import YearHistogram, HISTOGRAM_COLUMNS
+from services.summary_stats import summarize
+from services.result_cache import RESULT_CACHE, cached, read_versions
+from services.building_pages import SORT_COLUMNS, PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor, page_queries
+from config.database import ReadSessionLocal
+
+# Frame dtypes per table. Counts that can be NULL upstream are float64 in
+# housing tables (they feed charts) and nullable Int64 for buildings.
+HOUSING_SCHEMA = {
+    "zip": object, "name": object, "median_rent": "float64", "median_income": "float64",
+    "rent_burden": "float64", "rent_burden_rate": "float64", "housing_units": "float64",
+    "total_units": "float64", "occupied_units": "float64", "vacant_units": "float64", "vacancy_rate": "float64",
+}
+BUILDING_STATS_SCHEMA = {
+    "zip": object, "total_buildings": "int64", "avg_floors": "float64", "avg_year_built": "Int64",
+    "total_residential_units": "int64", "buildings_pre_1950": "int64", "buildings_1950_2000": "int64",
+    "buildings_post_2000": "int64",
+}
+BUILDING_SCHEMA = {
+    "bbl": object, "address": object, "landuse": object, "yearbuilt": "Int64", "numfloors": "float64",
+    "unitsres": "Int64", "borough": object,
+}
+TOP_BUILDINGS_SCHEMA = {"zip": object, **BUILDING_SCHEMA}
+BUILDING_PAGE_SCHEMA = {**BUILDING_SCHEMA, "id": "int64"}
+_summary_dtypes = {
+    **HOUSING_SCHEMA,
+    "has_housing": "bool", "has_buildings": "bool",
+    # Building columns are NULL for ZIPs with housing data only.
+    **{c: "float64" if BUILDING_STATS_SCHEMA[c] == "float64" else "Int64" for c in BUILDING_COLUMNS},
+    **{f"{metric}_rank": "Int64" for metric in RANK_METRICS},
+}
+ZIP_SUMMARY_SCHEMA = {c: _summary_dtypes[c] for c in SUMMARY_COLUMNS}
+HISTOGRAM_SCHEMA = {c: object if c == "zip" else "int64" for c in HISTOGRAM_COLUMNS}
+HISTOGRAM_SCHEMA["cum_floors"] = "float64"
+
+
+def typed_frame(result, schema):
+    return rows_frame(result.fetchall(), schema)
+
+
+def rows_frame(rows, schema):
+    # Columns go straight from the cursor rows into arrays of the declared
+    # dtype; no per-row dicts and no second conversion pass.
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    data = {}
+    for (name, dtype), values in zip(schema.items(), columns):
+        if dtype == "bool":
+            data[name] = np.array([bool(v) for v in values], dtype=bool)
+        elif dtype == "Int64":
+            floats = np.array(values, dtype="float64")
+            mask = np.isnan(floats)
+            data[name] = pd.arrays.IntegerArray(np.where(mask, 0, floats).astype("int64"), mask)
+        elif dtype == object:
+            data[name] = np.array(values, dtype=object)
+        else:
+            data[name] = np.array(values, dtype=dtype)
+    return pd.DataFrame(data, columns=list(schema))
+
+
+def schema_select(table, schema):
+    return select(*[table.c[c] for c in schema])
+
 
 class DataService:
     def __init__(self):
-        self.db = SessionLocal()
+        self.db = ReadSessionLocal()
+        self._versions = None
     
     def __del__(self):
         self.db.close()
     
+    def dataset_versions(self) -> dict:
+        # Read once per instance, and the app builds one per rerun, so a
+        # rerun sees one consistent set of versions.
+        if self._versions is None:
+            self._versions = read_versions(self.db)
+            RESULT_CACHE.observe(self._versions)
+        return self._versions
+    
+    def get_cache_stats(self) -> dict:
+        return RESULT_CACHE.stats()
+    
+    @cached("housing_metrics")
     def get_all_metrics(self) -> pd.DataFrame:
-        metrics = self.db.query(HousingMetrics).all()
-        data = []
-        for m in metrics:
-            data.append({
-                "zip": m.zip,
-                "name": m.name,
-                "median_rent": m.median_rent,
-                "median_income": m.median_income,
-                "rent_burden": m.rent_burden,
-                "rent_burden_rate": m.rent_burden_rate,
-                "housing_units": m.housing_units,
-                "total_units": m.total_units,
-                "occupied_units": m.occupied_units,
-                "vacant_units": m.vacant_units,
-                "vacancy_rate": m.vacancy_rate
-            })
-        df = pd.DataFrame(data)
-        
-        for col in ['median_rent', 'median_income', 'rent_burden', 'rent_burden_rate', 'housing_units', 
-                    'total_units', 'occupied_units', 'vacant_units', 'vacancy_rate']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        return df
+        stmt = schema_select(HousingMetrics.__table__, HOUSING_SCHEMA)
+        return typed_frame(self.db.execute(stmt), HOUSING_SCHEMA)
     
+    @cached("housing_metrics")
     def get_metrics_by_zip(self, zip_code: str) -> dict:
         metric = self.db.query(HousingMetrics).filter(HousingMetrics.zip == zip_code).first()
         if metric:
@@ -54,26 +112,42 @@ class DataService:
             }
         return None
     
+    @cached("housing_metrics")
     def get_summary_stats(self) -> dict:
-        metrics = self.db.query(HousingMetrics).all()
-        if not metrics:
+        stats = summarize(
+            self.db.connection(), HousingMetrics.__table__,
+            ["median_rent", "median_income", "vacancy_rate", "housing_units"]
+        )
+        if not stats["rows"]:
             return {}
         
-        df = self.get_all_metrics()
-        
-        valid_rent = pd.to_numeric(df["median_rent"], errors='coerce').dropna()
-        valid_income = pd.to_numeric(df["median_income"], errors='coerce').dropna()
-        valid_vacancy = pd.to_numeric(df["vacancy_rate"], errors='coerce').dropna()
-        valid_housing = pd.to_numeric(df["housing_units"], errors='coerce').dropna()
-        
         return {
-            "total_zips": len(df),
-            "avg_median_rent": float(valid_rent.mean()) if not valid_rent.empty else 0,
-            "avg_median_income": float(valid_income.mean()) if not valid_income.empty else 0,
-            "avg_vacancy_rate": float(valid_vacancy.mean()) if not valid_vacancy.empty else 0,
-            "total_housing_units": int(valid_housing.sum()) if not valid_housing.empty else 0
+            "total_zips": stats["rows"],
+            "avg_median_rent": stats["median_rent"]["mean"] or 0,
+            "avg_median_income": stats["median_income"]["mean"] or 0,
+            "avg_vacancy_rate": stats["vacancy_rate"]["mean"] or 0,
+            "total_housing_units": int(stats["housing_units"]["sum"] or 0),
+            "median_rent": stats["median_rent"],
+            "median_income": stats["median_income"],
+            "vacancy_rate": stats["vacancy_rate"],
+            "housing_units": stats["housing_units"]
         }
     
+    @cached("building_info")
+    def get_building_summary_stats(self, zip_code: str = None, year_min: int = None, year_max: int = None) -> dict:
+        b = BuildingInfo.__table__.c
+        where = []
+        if zip_code is not None:
+            where.append(b.zipcode == zip_code)
+        if year_min is not None:
+            where.append(b.yearbuilt >= year_min)
+        if year_max is not None:
+            where.append(b.yearbuilt <= year_max)
+        return summarize(
+            self.db.connection(), BuildingInfo.__table__, ["yearbuilt", "numfloors", "unitsres"], where=where
+        )
+    
+    @cached("sync_logs")
     def get_last_sync_info(self) -> dict:
         last_sync = self.db.query(SyncLog).order_by(SyncLog.sync_time.desc()).first()
         if last_sync:
@@ -86,6 +160,15 @@ class DataService:
             }
         return None
     
+    @cached("sync_runs")
+    def get_sync_runs(self, limit: int = 50) -> pd.DataFrame:
+        query = self.db.query(SyncRun).order_by(SyncRun.started_at.desc()).limit(limit)
+        runs = pd.read_sql(query.statement, self.db.connection())
+        if not runs.empty:
+            runs["started_at"] = pd.to_datetime(runs["started_at"])
+        return runs.iloc[::-1].reset_index(drop=True)
+    
+    @cached("building_stats")
     def get_building_stats_by_zip(self, zip_code: str) -> dict:
         stats = self.db.query(BuildingStats).filter(BuildingStats.zip == zip_code).first()
         if stats:
@@ -101,86 +184,120 @@ class DataService:
             }
         return None
     
+    @cached("building_stats")
     def get_all_building_stats(self) -> pd.DataFrame:
-        stats = self.db.query(BuildingStats).all()
-        data = []
-        for s in stats:
-            data.append({
-                "zip": s.zip,
-                "total_buildings": s.total_buildings,
-                "avg_floors": s.avg_floors,
-                "avg_year_built": s.avg_year_built,
-                "total_residential_units": s.total_residential_units,
-                "buildings_pre_1950": s.buildings_pre_1950,
-                "buildings_1950_2000": s.buildings_1950_2000,
-                "buildings_post_2000": s.buildings_post_2000
-            })
-        return pd.DataFrame(data)
+        stmt = schema_select(BuildingStats.__table__, BUILDING_STATS_SCHEMA)
+        return typed_frame(self.db.execute(stmt), BUILDING_STATS_SCHEMA)
+    
+    def get_year_histogram(self) -> YearHistogram:
+        stmt = schema_select(BuildingYearHistogram.__table__, HISTOGRAM_SCHEMA)
+        return YearHistogram(typed_frame(self.db.execute(stmt), HISTOGRAM_SCHEMA))
     
     def get_buildings_by_zip(self, zip_code: str, limit: int = 100) -> pd.DataFrame:
-        buildings = self.db.query(BuildingInfo).filter(
-            BuildingInfo.zipcode == zip_code
-        ).limit(limit).all()
-        
-        data = []
-        for b in buildings:
-            data.append({
-                "bbl": b.bbl,
-                "address": b.address,
-                "landuse": b.landuse,
-                "yearbuilt": b.yearbuilt,
-                "numfloors": b.numfloors,
-                "unitsres": b.unitsres,
-                "borough": b.borough
-            })
-        return pd.DataFrame(data)
+        return self.get_buildings_by_zip_filtered(zip_code, limit=limit)
     
+    @cached("building_info")
     def get_buildings_by_zip_filtered(self, zip_code: str, year_min: int = None, year_max: int = None, limit: int = 100) -> pd.DataFrame:
-        query = self.db.query(BuildingInfo).filter(BuildingInfo.zipcode == zip_code)
+        b = BuildingInfo.__table__.c
+        stmt = schema_select(BuildingInfo.__table__, BUILDING_SCHEMA).where(b.zipcode == zip_code)
         
         if year_min is not None:
-            query = query.filter(BuildingInfo.yearbuilt >= year_min)
+            stmt = stmt.where(b.yearbuilt >= year_min)
         if year_max is not None:
-            query = query.filter(BuildingInfo.yearbuilt <= year_max)
+            stmt = stmt.where(b.yearbuilt <= year_max)
         
-        buildings = query.limit(limit).all()
+        return typed_frame(self.db.execute(stmt.limit(limit)), BUILDING_SCHEMA)
+    
+    @cached("building_info")
+    def get_buildings_page(self, zip_code: str, sort_by: str = "yearbuilt", descending: bool = False,
+                           cursor: str = None, page_size: int = PAGE_SIZE, year_min: int = None,
+                           year_max: int = None) -> dict:
+        # Keyset pagination over (sort value, id); buildings without a value
+        # for the sort column come after all the others.
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort buildings by {sort_by}; choose from {', '.join(SORT_COLUMNS)}")
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        
+        b = BuildingInfo.__table__.c
+        where = [b.zipcode == zip_code]
+        if year_min is not None:
+            where.append(b.yearbuilt >= year_min)
+        if year_max is not None:
+            where.append(b.yearbuilt <= year_max)
+        
+        after = decode_cursor(cursor, sort_by, descending) if cursor else None
+        columns = [b[c] for c in BUILDING_PAGE_SCHEMA]
+        # One row past the page tells whether there is a next one.
+        rows = []
+        for stmt in page_queries(columns, sort_by, descending, where, after):
+            rows += self.db.execute(stmt.limit(page_size + 1 - len(rows))).fetchall()
+            if len(rows) > page_size:
+                break
         
-        data = []
-        for b in buildings:
-            data.append({
-                "bbl": b.bbl,
-                "address": b.address,
-                "landuse": b.landuse,
-                "yearbuilt": b.yearbuilt,
-                "numfloors": b.numfloors,
-                "unitsres": b.unitsres,
-                "borough": b.borough
-            })
-        return pd.DataFrame(data)
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]._mapping
+            next_cursor = encode_cursor(sort_by, descending, last[sort_by], last["id"])
+        
+        page = rows_frame(rows, BUILDING_PAGE_SCHEMA).drop(columns="id")
+        return {"rows": page, "next_cursor": next_cursor}
     
-    def get_combined_metrics(self, zip_code: str) -> dict:
-        housing_metrics = self.get_metrics_by_zip(zip_code)
-        building_stats = self.get_building_stats_by_zip(zip_code)
+    @cached("building_info", "building_stats")
+    def get_top_buildings_by_zips(self, zip_codes, year_min: int = None, year_max: int = None, limit: int = 5) -> pd.DataFrame:
+        # One query for every map popup instead of one per marker. Driven by
+        # building_stats (one row per ZIP with buildings), each ZIP's first
+        # `limit` ids come from a correlated LIMIT on the (zipcode, yearbuilt,
+        # id) index, so only those candidates reach the ROW_NUMBER window
+        # rather than the whole table.
+        zip_codes = sorted(set(zip_codes))
+        if not zip_codes:
+            return pd.DataFrame({c: pd.Series(dtype=dtype) for c, dtype in TOP_BUILDINGS_SCHEMA.items()})
         
-        result = {}
-        if housing_metrics:
-            result.update(housing_metrics)
-        if building_stats:
-            result.update({
-                "building_" + k: v for k, v in building_stats.items() if k != "zip"
-            })
+        table = BuildingInfo.__table__
+        b = table.c
+        zips = BuildingStats.__table__
+        candidate = table.alias("candidate")
+        # Buildings without a year are left out: NULLs sort first on SQLite
+        # and last on PostgreSQL, so keeping them would make the pick differ
+        # by backend.
+        candidates = select(candidate.c.id).where(candidate.c.zipcode == zips.c.zip, candidate.c.yearbuilt.isnot(None))
         
+        if year_min is not None:
+            candidates = candidates.where(candidate.c.yearbuilt >= year_min)
+        if year_max is not None:
+            candidates = candidates.where(candidate.c.yearbuilt <= year_max)
+        
+        candidates = candidates.order_by(candidate.c.yearbuilt, candidate.c.id).limit(limit).correlate(zips)
+        rank = func.row_number().over(partition_by=b.zipcode, order_by=(b.yearbuilt, b.id)).label("rank")
+        numbered = select(b.zipcode.label("zip"), *[b[c] for c in BUILDING_SCHEMA], rank).select_from(zips).join(
+            table, b.id.in_(candidates)
+        ).where(zips.c.zip.in_(zip_codes)).subquery()
+        stmt = select(*[numbered.c[c] for c in TOP_BUILDINGS_SCHEMA]).order_by(numbered.c.zip, numbered.c.rank)
+        return typed_frame(self.db.execute(stmt), TOP_BUILDINGS_SCHEMA)
+    
+    def _zip_summary_query(self):
+        table = ZipSummary.__table__
+        return schema_select(table, ZIP_SUMMARY_SCHEMA).order_by(table.c.zip)
+    
+    @cached("zip_summary")
+    def get_zip_summary(self) -> pd.DataFrame:
+        return typed_frame(self.db.execute(self._zip_summary_query()), ZIP_SUMMARY_SCHEMA)
+    
+    @cached("zip_summary")
+    def get_combined_metrics(self, zip_code: str) -> dict:
+        table = ZipSummary.__table__
+        row = self.db.execute(self._zip_summary_query().where(table.c.zip == zip_code)).first()
+        if row is None:
+            return None
+        row = row._mapping
+        result = {}
+        if row["has_housing"]:
+            result.update({c: row[c] for c in ["zip"] + HOUSING_COLUMNS})
+        if row["has_buildings"]:
+            result.update({"building_" + c: row[c] for c in BUILDING_COLUMNS})
         return result if result else None
     
     def get_all_combined_metrics(self) -> pd.DataFrame:
-        housing_df = self.get_all_metrics()
-        building_df = self.get_all_building_stats()
-        
-        if housing_df.empty:
-            return building_df
-        if building_df.empty:
-            return housing_df
-        
-        combined = housing_df.merge(building_df, on="zip", how="outer")
-        return combined
-
+        summary = self.get_zip_summary()
+        return summary.drop(columns=["has_housing", "has_buildings"])
@@ -1,188 +1,333 @@
-import requests
 import pandas as pd
 import numpy as np
 import os
-import time
-import math
+import json
 from pathlib import Path
-from sqlalchemy.orm import Session
-from models.housing_data import ZipCode, HousingMetrics, SyncLog, BuildingInfo, BuildingStats
+from sqlalchemy import select, update, bindparam, func
+from models.housing_data import (
+    ZipCode, HousingMetrics, SyncLog, BuildingInfo, BuildingStats, SyncCheckpoint, SyncRun, ZipSummary,
+    BuildingYearHistogram
+)
 from config.database import SessionLocal
-from datetime import datetime
+from services.bulk_loader import BulkLoader, ChunkBuffer, frame_to_records, SHADOW_MIN_RATIO
+from services.pluto_fetcher import PlutoFetcher, bbl_key, PLUTO_FIELDS
+from services.snapshots import read_snapshot, snapshot_exists
+from services.pipeline import SyncPipeline, SnapshotSink
+from services import telemetry
+from services.telemetry import tracked
+from services.building_stats import (
+    building_stats_query, aggregate_building_stats, finalize_stats_frame, year_histogram_query,
+    cumulative_histogram, finalize_histogram_frame, STATS_COLUMNS, SQL_AGGREGATE_DIALECTS
+)
+from services.zip_summary import build_zip_summary, HOUSING_COLUMNS
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
-ACS_YEAR = "2022"
-ACS_BASE = f"https://api.census.gov/data/{ACS_YEAR}/acs/acs5"
-NYC_ZIP_URL = "https://data.cityofnewyork.us/resource/pri4-ifjk.json?$select=modzcta&$limit=300"
-PLUTO_API = "https://data.cityofnewyork.us/resource/64uk-42ks.json"
+PLUTO_CHUNK_SIZE = int(os.getenv("PLUTO_CHUNK_SIZE", 50000))
+PLUTO_MAX_MEMORY_MB = int(os.getenv("PLUTO_MAX_MEMORY_MB", 256))
+PLUTO_HASH_COLUMNS = ["landuse", "yearbuilt", "numfloors", "unitsres", "address", "zipcode", "borough"]
+DELETE_BATCH_SIZE = 500
+PLUTO_CHECKPOINT = "pluto_stream"
+# When set ("csv" or "parquet"), syncs also refresh the snapshot files from the same fetch.
+SYNC_SNAPSHOT_FORMAT = os.getenv("SYNC_SNAPSHOT_FORMAT", "")
+# Run telemetry older than the compaction age is merged into one row per
+# sync type, status and day; rows past the retention age are dropped.
+SYNC_RUN_COMPACT_DAYS = int(os.getenv("SYNC_RUN_COMPACT_DAYS", 14))
+SYNC_RUN_RETENTION_DAYS = int(os.getenv("SYNC_RUN_RETENTION_DAYS", 180))
 
-def convert_to_native_type(val):
-    if pd.isna(val) or val is None:
-        return None
-    if isinstance(val, (np.integer, np.int64, np.int32)):
-        return int(val)
-    if isinstance(val, (np.floating, np.float64, np.float32)):
-        return float(val)
-    if isinstance(val, np.bool_):
-        return bool(val)
-    return val
+CENSUS_SENTINEL_COLUMNS = ["median_rent", "median_income", "rent_burden", "housing_units"]
+CENSUS_COUNT_COLUMNS = ["housing_units", "total_units", "occupied_units", "vacant_units"]
+CENSUS_NUMERIC_COLUMNS = [
+    "median_rent", "median_income", "rent_burden", "housing_units",
+    "total_units", "occupied_units", "vacant_units", "vacancy_rate"
+]
+
+def _text_column(series):
+    return series.astype(str).astype(object).where(series.notna(), None)
+
+def _zipcode_column(series):
+    numeric = pd.to_numeric(series, errors="coerce")
+    text = _text_column(series.astype(str).str.zfill(5).where(series.notna()))
+    as_int = numeric.fillna(0).astype("int64").astype(str).str.zfill(5)
+    return text.where(numeric.isna(), as_int)
+
+def normalize_pluto_frame(df):
+    out = pd.DataFrame(index=df.index)
+    out["bbl"] = df["bbl"].astype(str)
+    out["landuse"] = _text_column(df["landuse"])
+    for col in ["yearbuilt", "numfloors", "unitsres"]:
+        out[col] = pd.to_numeric(df[col], errors="coerce")
+    out["address"] = _text_column(df["address"])
+    out["zipcode"] = _zipcode_column(df["zipcode"])
+    out["borough"] = _text_column(df["borough"])
+    out = out.drop_duplicates(subset="bbl", keep="first")
+    out["content_hash"] = pluto_content_hash(out)
+    return out
+
+def pluto_content_hash(df):
+    canonical = pd.DataFrame(index=df.index)
+    for col in PLUTO_HASH_COLUMNS:
+        if col in ["yearbuilt", "numfloors", "unitsres"]:
+            canonical[col] = df[col].astype("float64")
+        else:
+            canonical[col] = df[col].fillna("").astype(str)
+    hashes = pd.util.hash_pandas_object(canonical, index=False)
+    return hashes.map("{:016x}".format).astype(object)
+
+def normalize_census_frame(df):
+    numeric = df.reindex(columns=CENSUS_NUMERIC_COLUMNS).apply(pd.to_numeric, errors="coerce")
+    numeric[CENSUS_SENTINEL_COLUMNS] = numeric[CENSUS_SENTINEL_COLUMNS].mask(
+        numeric[CENSUS_SENTINEL_COLUMNS] < 0
+    )
+    numeric["median_income"] = numeric["median_income"] / 12
+
+    rent = numeric["median_rent"].to_numpy(dtype="float64")
+    income = numeric["median_income"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(income > 0, rent / income * 100, np.nan)
+
+    out = pd.DataFrame(index=df.index)
+    out["zip"] = df["zip"].astype(str).astype(object)
+    out["name"] = _text_column(df["NAME"]) if "NAME" in df.columns else None
+    out["median_rent"] = numeric["median_rent"]
+    out["median_income"] = numeric["median_income"]
+    out["rent_burden"] = numeric["rent_burden"]
+    out["rent_burden_rate"] = rate
+    for col in CENSUS_COUNT_COLUMNS:
+        out[col] = numeric[col].round().astype("Int64")
+    out["vacancy_rate"] = numeric["vacancy_rate"]
+    return out
+
+def pluto_checkpoint_params(year_min, year_max, limit):
+    return json.dumps({"year_min": year_min, "year_max": year_max, "limit": limit})
+
+class DatabaseSink:
+    def __init__(self, service, chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB,
+                 min_ratio=SHADOW_MIN_RATIO, checkpoint=None):
+        self.service = service
+        self.db = service.db
+        self.loader = service.loader
+        self.chunk_size = chunk_size
+        self.max_memory_mb = max_memory_mb
+        # Row-count guard for the PLUTO swap; None for capped fetches.
+        self.min_ratio = min_ratio
+        # (dataset version, params) stamped on PLUTO checkpoints; None to skip them.
+        self.checkpoint = checkpoint
+        self.checkpoints = {}
+        self.progress = {}
+        self.shadow = None
+        self.buffer = None
+        self.rows = 0
+    
+    def begin(self, dataset, partitions=None):
+        if dataset == "pluto":
+            # Interrupted loads are finished by stream_pluto_data before a
+            # pipeline is built; never throw one away here.
+            if self.service.has_checkpoint(PLUTO_CHECKPOINT):
+                raise RuntimeError("An interrupted PLUTO sync is pending; resume it with sync_pluto_data()")
+            self.shadow = self.loader.create_shadow(BuildingInfo)
+            # Disjoint BBL ranges, each fetched in key order, are checkpointed
+            # as stream_pluto_data does, so a failed load resumes there.
+            self.checkpoints = {}
+            if partitions and self.checkpoint is not None:
+                self.checkpoints = self.service.start_checkpoints(PLUTO_CHECKPOINT, partitions, *self.checkpoint)
+            self.db.commit()
+            self.buffer = ChunkBuffer(self.chunk_size, self.max_memory_mb / 2)
+            self.progress = {}
+            self.rows = 0
+    
+    def track(self, df):
+        # Each page comes from one range in key order, so the highest BBL
+        # buffered for a range is where a resumed fetch continues.
+        if not self.checkpoints or df.empty:
+            return
+        bounds = sorted(self.checkpoints)
+        keys = pd.to_numeric(df["bbl"], errors="coerce").to_numpy()
+        owner = np.searchsorted([low for low, _ in bounds], keys, side="right") - 1
+        for i, part in pd.Series(keys).groupby(owner):
+            if i < 0:
+                continue
+            last_key, pages, rows = self.progress.get(bounds[i], (self.checkpoints[bounds[i]].last_key, 0, 0))
+            self.progress[bounds[i]] = (max(last_key, int(part.max())), pages + 1, rows + len(part))
+    
+    def flush(self):
+        # Rows and the checkpoints that cover them commit together.
+        self.rows += self.loader.load(self.shadow, self.buffer.drain())
+        for bounds, (last_key, pages, rows) in self.progress.items():
+            cp = self.checkpoints[bounds]
+            cp.last_key = last_key
+            cp.pages_done += pages
+            cp.rows_done += rows
+        self.progress.clear()
+        self.db.commit()
+    
+    def write(self, dataset, df):
+        if dataset == "zip_list":
+            self.loader.replace(ZipCode, df[["zip"]])
+        elif dataset == "census":
+            with telemetry.stage("transform"):
+                records = normalize_census_frame(df)
+            self.loader.replace(HousingMetrics, records, min_ratio=SHADOW_MIN_RATIO)
+        else:
+            self.buffer.add(df)
+            self.track(df)
+            if self.buffer.full():
+                self.flush()
+    
+    def commit(self, dataset):
+        if dataset == "pluto":
+            self.flush()
+            try:
+                self.loader.swap(BuildingInfo, self.shadow, expected=self.rows, min_ratio=self.min_ratio)
+            except ValueError:
+                # The download finished but was rejected; do not resume into it.
+                self.db.rollback()
+                self.checkpoints = {}
+                self.service.clear_checkpoints(PLUTO_CHECKPOINT)
+                self.loader.drop_shadow(BuildingInfo)
+                self.db.commit()
+                raise
+            self.service.clear_checkpoints(PLUTO_CHECKPOINT)
+        self.db.commit()
+        if dataset == "census":
+            self.service.rebuild_zip_summary()
+        elif dataset == "pluto":
+            self.service.calculate_building_stats()
+    
+    def abort(self, dataset):
+        self.db.rollback()
+        # Checkpointed pages stay in the shadow table for the resume.
+        if dataset == "pluto" and not self.checkpoints:
+            self.loader.drop_shadow(BuildingInfo)
+            self.db.commit()
 
 class DataSyncService:
-    def __init__(self):
+    def __init__(self, snapshot_format=SYNC_SNAPSHOT_FORMAT, snapshot_dir=DATA_DIR):
         self.db = SessionLocal()
+        telemetry.instrument_session(self.db)
+        self.loader = BulkLoader(self.db)
+        self.snapshot_format = snapshot_format
+        self.snapshot_dir = snapshot_dir
     
     def __del__(self):
         self.db.close()
     
-    def log_sync(self, sync_type: str, status: str, records: int = 0, error: str = None):
+    def log_sync(self, sync_type: str, status: str, records: int = 0, error: str = None, details: dict = None):
         log = SyncLog(
             sync_type=sync_type,
             status=status,
             records_processed=records,
-            error_message=error
+            error_message=error,
+            details=json.dumps(details) if details else None
         )
         self.db.add(log)
+        metrics = telemetry.current()
+        if metrics is not None:
+            self.db.flush()
+            self.db.add(SyncRun(log_id=log.id, sync_type=sync_type, status=status, **metrics.summary(records)))
         self.db.commit()
+        if metrics is not None:
+            self.prune_sync_runs()
+    
+    def prune_sync_runs(self):
+        now = datetime.now(timezone.utc)
+        self.db.query(SyncRun).filter(
+            SyncRun.started_at < now - timedelta(days=SYNC_RUN_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        
+        groups = defaultdict(list)
+        old_runs = self.db.query(SyncRun).filter(
+            SyncRun.started_at < now - timedelta(days=SYNC_RUN_COMPACT_DAYS), SyncRun.runs == 1
+        )
+        for run in old_runs:
+            groups[(run.sync_type, run.status, run.started_at.date())].append(run)
+        for (sync_type, status, _), runs in groups.items():
+            if len(runs) < 2:
+                continue
+            metrics = telemetry.average_runs([{m: getattr(r, m) for m in telemetry.RUN_METRICS} for r in runs])
+            self.db.add(SyncRun(
+                sync_type=sync_type, status=status, started_at=min(r.started_at for r in runs),
+                runs=len(runs), **metrics
+            ))
+            for run in runs:
+                self.db.delete(run)
+        self.db.commit()
+    
+    def pipeline(self, min_ratio=SHADOW_MIN_RATIO, chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB,
+                 on_progress=None, checkpoint=None):
+        sinks = [DatabaseSink(self, chunk_size, max_memory_mb, min_ratio, checkpoint)]
+        if self.snapshot_format:
+            sinks.append(SnapshotSink(self.snapshot_dir, self.snapshot_format))
+        return SyncPipeline(sinks, transform=normalize_pluto_frame, on_progress=on_progress)
     
+    @tracked
     def fetch_nyc_zip_list(self):
         try:
-            r = requests.get(NYC_ZIP_URL, timeout=30)
-            r.raise_for_status()
-            df = pd.DataFrame(r.json())
-            df["zip"] = df["modzcta"].astype(str).str.zfill(5)
-            df = df[["zip"]].drop_duplicates().sort_values("zip")
-            
-            self.db.query(ZipCode).delete()
-            for _, row in df.iterrows():
-                zip_code = ZipCode(zip=row["zip"])
-                self.db.add(zip_code)
-            
-            self.db.commit()
-            self.log_sync("nyc_zip_list", "success", len(df))
-            return set(df["zip"].tolist())
+            zips = self.pipeline().zip_list()
+            self.log_sync("nyc_zip_list", "success", len(zips))
+            return zips
         except Exception as e:
+            self.db.rollback()
             self.log_sync("nyc_zip_list", "failed", 0, str(e))
             raise
     
-    def census_fetch(self, vars_, rename_map):
-        params = {
-            "get": "NAME," + ",".join(vars_),
-            "for": "zip code tabulation area:*",
-        }
-        r = requests.get(ACS_BASE, params=params, timeout=90)
-        r.raise_for_status()
-        data = r.json()
-        df = pd.DataFrame(data[1:], columns=data[0])
-        df["zip"] = df["zip code tabulation area"].astype(str).str.zfill(5)
-        df = df.rename(columns=rename_map)
-        df = df.drop(columns=["zip code tabulation area"], errors="ignore")
-        return df
-    
+    @tracked
     def sync_all_data(self):
         try:
             nyc_zips = self.fetch_nyc_zip_list()
-            
-            rent = self.census_fetch(["B25064_001E"], {"B25064_001E": "median_rent"})
-            income = self.census_fetch(["B19013_001E"], {"B19013_001E": "median_income"})
-            burden = self.census_fetch(["B25070_001E"], {"B25070_001E": "rent_burden"})
-            housing = self.census_fetch(["B25001_001E"], {"B25001_001E": "housing_units"})
-            vacancy = self.census_fetch(
-                ["B25002_001E","B25002_002E","B25002_003E"],
-                {
-                    "B25002_001E":"total_units",
-                    "B25002_002E":"occupied_units",
-                    "B25002_003E":"vacant_units"
-                }
-            )
-            
-            for c in ["total_units","occupied_units","vacant_units"]:
-                vacancy[c] = pd.to_numeric(vacancy[c], errors="coerce")
-            vacancy["vacancy_rate"] = (vacancy["vacant_units"]/vacancy["total_units"]).round(4)
-            
-            merged = rent.merge(income, on=["zip", "NAME"], how="outer")
-            merged = merged.merge(burden, on=["zip", "NAME"], how="outer")
-            merged = merged.merge(housing, on=["zip", "NAME"], how="outer")
-            merged = merged.merge(vacancy, on=["zip", "NAME"], how="outer")
-            
-            nyc_data = merged[merged["zip"].isin(nyc_zips)].copy()
-            
-            self.db.query(HousingMetrics).delete()
-            
-            for _, row in nyc_data.iterrows():
-                median_rent = pd.to_numeric(row.get("median_rent"), errors="coerce")
-                median_income = pd.to_numeric(row.get("median_income"), errors="coerce")
-                rent_burden = pd.to_numeric(row.get("rent_burden"), errors="coerce")
-                housing_units = pd.to_numeric(row.get("housing_units"), errors="coerce")
-                
-                if pd.notna(median_rent) and median_rent < 0:
-                    median_rent = None
-                if pd.notna(median_income) and median_income < 0:
-                    median_income = None
-                else:
-                    if pd.notna(median_income):
-                        median_income = median_income / 12
-                if pd.notna(rent_burden) and rent_burden < 0:
-                    rent_burden = None
-                if pd.notna(housing_units) and housing_units < 0:
-                    housing_units = None
-                
-                rent_burden_rate = None
-                if pd.notna(median_rent) and pd.notna(median_income) and median_income > 0:
-                    rent_burden_rate = (median_rent / median_income) * 100
-                
-                metric = HousingMetrics(
-                    zip=str(row["zip"]),
-                    name=str(row.get("NAME")) if pd.notna(row.get("NAME")) else None,
-                    median_rent=convert_to_native_type(median_rent),
-                    median_income=convert_to_native_type(median_income),
-                    rent_burden=convert_to_native_type(rent_burden),
-                    rent_burden_rate=convert_to_native_type(rent_burden_rate),
-                    housing_units=convert_to_native_type(housing_units),
-                    total_units=convert_to_native_type(pd.to_numeric(row.get("total_units"), errors="coerce")),
-                    occupied_units=convert_to_native_type(pd.to_numeric(row.get("occupied_units"), errors="coerce")),
-                    vacant_units=convert_to_native_type(pd.to_numeric(row.get("vacant_units"), errors="coerce")),
-                    vacancy_rate=convert_to_native_type(pd.to_numeric(row.get("vacancy_rate"), errors="coerce"))
-                )
-                self.db.add(metric)
-            
-            self.db.commit()
-            self.log_sync("full_sync", "success", len(nyc_data))
-            return len(nyc_data)
+            records = self.pipeline().census(nyc_zips)
+            self.log_sync("full_sync", "success", records)
+            return records
         except Exception as e:
             self.db.rollback()
             self.log_sync("full_sync", "failed", 0, str(e))
             raise
+    
+    @tracked
+    def refresh(self, year_min=1900, year_max=2025, limit=None, sharded=False, year_splits=1, skip_pluto=False):
+        # ZIP list, Census and PLUTO in one pass; each dataset is fetched once
+        # and fed to the database and, if configured, the snapshot files. An
+        # interrupted PLUTO load is resumed from its checkpoints instead,
+        # which feeds only the database.
+        resume_pluto = not skip_pluto and self.has_checkpoint(PLUTO_CHECKPOINT)
+        checkpoint = None
+        if not (skip_pluto or resume_pluto):
+            checkpoint = (PlutoFetcher().dataset_version(), pluto_checkpoint_params(year_min, year_max, limit))
+        pipeline = self.pipeline(min_ratio=SHADOW_MIN_RATIO if limit is None else None, checkpoint=checkpoint)
+        try:
+            results = pipeline.run(year_min, year_max, limit, sharded=sharded, year_splits=year_splits,
+                                   skip_pluto=skip_pluto or resume_pluto)
+            if resume_pluto:
+                results["pluto"] = self.stream_pluto_data(year_min, year_max, limit)
+            self.log_sync("refresh", "success", sum(results.values()), details=results)
+            return results
+        except Exception as e:
+            self.db.rollback()
+            self.log_sync("refresh", "failed", 0, str(e))
+            raise
 
+    @tracked
     def load_from_csv(self):
         try:
-            zip_list_path = DATA_DIR / "nyc_zip_list.csv"
-            rent_path = DATA_DIR / "nyc_rent.csv"
-            income_path = DATA_DIR / "nyc_income.csv"
-            burden_path = DATA_DIR / "nyc_burden.csv"
-            housing_path = DATA_DIR / "nyc_housing.csv"
-            vacancy_path = DATA_DIR / "nyc_vacancy.csv"
+            datasets = ["nyc_zip_list", "nyc_rent", "nyc_income", "nyc_burden", "nyc_housing", "nyc_vacancy"]
+            if not all(snapshot_exists(DATA_DIR, name) for name in datasets):
+                raise FileNotFoundError("One or more snapshot files not found in data directory")
             
-            if not all([p.exists() for p in [zip_list_path, rent_path, income_path, burden_path, housing_path, vacancy_path]]):
-                raise FileNotFoundError("One or more CSV files not found in data directory")
+            zip_list_df = read_snapshot(DATA_DIR, "nyc_zip_list", columns=["zip"])
+            nyc_zips = set(zip_list_df["zip"].dropna().tolist())
             
-            zip_list_df = pd.read_csv(zip_list_path)
-            nyc_zips = set(zip_list_df["zip"].astype(str).str.zfill(5).tolist())
-            
-            self.db.query(ZipCode).delete()
-            for zip_code in sorted(nyc_zips):
-                zip_obj = ZipCode(zip=zip_code)
-                self.db.add(zip_obj)
+            self.loader.replace(ZipCode, [{"zip": zip_code} for zip_code in sorted(nyc_zips)])
             self.db.commit()
             
-            rent = pd.read_csv(rent_path)
-            income = pd.read_csv(income_path)
-            burden = pd.read_csv(burden_path)
-            housing = pd.read_csv(housing_path)
-            vacancy = pd.read_csv(vacancy_path)
-            
-            for df in [rent, income, burden, housing, vacancy]:
-                df["zip"] = df["zip"].astype(str).str.zfill(5)
-                df.drop(columns=["zip code tabulation area"], errors="ignore", inplace=True)
+            rent = read_snapshot(DATA_DIR, "nyc_rent", columns=["zip", "NAME", "median_rent"])
+            income = read_snapshot(DATA_DIR, "nyc_income", columns=["zip", "median_income"])
+            burden = read_snapshot(DATA_DIR, "nyc_burden", columns=["zip", "rent_burden"])
+            housing = read_snapshot(DATA_DIR, "nyc_housing", columns=["zip", "housing_units"])
+            vacancy = read_snapshot(
+                DATA_DIR, "nyc_vacancy",
+                columns=["zip", "total_units", "occupied_units", "vacant_units", "vacancy_rate"]
+            )
             
             merged = rent[["zip", "NAME", "median_rent"]].merge(
                 income[["zip", "median_income"]], on="zip", how="outer"
@@ -194,46 +339,11 @@ class DataSyncService:
                 on="zip", how="outer"
             )
             
-            self.db.query(HousingMetrics).delete()
-            
-            for _, row in merged.iterrows():
-                median_rent = pd.to_numeric(row.get("median_rent"), errors="coerce")
-                median_income = pd.to_numeric(row.get("median_income"), errors="coerce")
-                rent_burden = pd.to_numeric(row.get("rent_burden"), errors="coerce")
-                housing_units = pd.to_numeric(row.get("housing_units"), errors="coerce")
-                
-                if pd.notna(median_rent) and median_rent < 0:
-                    median_rent = None
-                if pd.notna(median_income) and median_income < 0:
-                    median_income = None
-                else:
-                    if pd.notna(median_income):
-                        median_income = median_income / 12
-                if pd.notna(rent_burden) and rent_burden < 0:
-                    rent_burden = None
-                if pd.notna(housing_units) and housing_units < 0:
-                    housing_units = None
-                
-                rent_burden_rate = None
-                if pd.notna(median_rent) and pd.notna(median_income) and median_income > 0:
-                    rent_burden_rate = (median_rent / median_income) * 100
-                
-                metric = HousingMetrics(
-                    zip=str(row["zip"]),
-                    name=str(row.get("NAME")) if pd.notna(row.get("NAME")) else None,
-                    median_rent=convert_to_native_type(median_rent),
-                    median_income=convert_to_native_type(median_income),
-                    rent_burden=convert_to_native_type(rent_burden),
-                    rent_burden_rate=convert_to_native_type(rent_burden_rate),
-                    housing_units=convert_to_native_type(housing_units),
-                    total_units=convert_to_native_type(pd.to_numeric(row.get("total_units"), errors="coerce")),
-                    occupied_units=convert_to_native_type(pd.to_numeric(row.get("occupied_units"), errors="coerce")),
-                    vacant_units=convert_to_native_type(pd.to_numeric(row.get("vacant_units"), errors="coerce")),
-                    vacancy_rate=convert_to_native_type(pd.to_numeric(row.get("vacancy_rate"), errors="coerce"))
-                )
-                self.db.add(metric)
-            
+            with telemetry.stage("transform"):
+                records = normalize_census_frame(merged)
+            self.loader.replace(HousingMetrics, records)
             self.db.commit()
+            self.rebuild_zip_summary()
             self.log_sync("csv_load", "success", len(merged))
             return len(merged)
         except Exception as e:
@@ -241,140 +351,280 @@ class DataSyncService:
             self.log_sync("csv_load", "failed", 0, str(e))
             raise
     
-    def fetch_pluto_residential(self, year_min=None, year_max=None, borough=None,
-                                limit=100000, page_size=5000, sleep=0.15):
+    def sync_pluto_data(self, year_min=1900, year_max=2025, limit=None, stream=True,
+                        chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB, incremental=False,
+                        stats_only=False, sharded=False, year_splits=1, on_progress=None):
+        if stats_only:
+            return self.sync_building_stats_soql(year_min, year_max)
+        # An interrupted full load leaves a checkpoint; finish it before
+        # switching to incremental updates.
+        resuming = self.has_checkpoint(PLUTO_CHECKPOINT)
+        if incremental and not resuming:
+            return self.sync_pluto_incremental(year_min, year_max, limit, chunk_size, max_memory_mb)
+        # The checkpointed stream can resume but only feeds the database.
+        if resuming or (stream and not sharded and not self.snapshot_format):
+            return self.stream_pluto_data(year_min, year_max, limit, chunk_size, max_memory_mb)
+        return self.sync_pluto_pipeline(year_min, year_max, limit, sharded, year_splits, chunk_size, max_memory_mb,
+                                        on_progress)
+    
+    @tracked
+    def stream_pluto_data(self, year_min=1900, year_max=2025, limit=None,
+                          chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB):
         try:
-            app_token = os.getenv("SOCRATA_APP_TOKEN")
+            # The write buffer flushes at half of the memory budget; the
+            # fetcher keeps at most four parsed pages queued on top of that.
+            fetcher = PlutoFetcher(year_min=year_min, year_max=year_max, limit=limit, max_pending_pages=4)
+            buffer = ChunkBuffer(chunk_size, max_memory_mb / 2)
+            version = fetcher.dataset_version()
+            params = pluto_checkpoint_params(year_min, year_max, limit)
+            
+            # Pages land in a shadow table; the live one keeps serving the
+            # dashboard until the swap at the end.
+            checkpoints = self.load_checkpoints(PLUTO_CHECKPOINT, version, params)
+            resumed = bool(checkpoints) and self.loader.has_shadow(BuildingInfo)
+            if not resumed:
+                checkpoints = self.start_checkpoints(PLUTO_CHECKPOINT, fetcher.partitions(), version, params)
+            shadow = self.loader.create_shadow(BuildingInfo, resume=resumed)
+            self.db.commit()
             
-            where_clauses = ["landuse in('01','02','03')"]
-            if year_min is not None:
-                where_clauses.append(f"yearbuilt >= {int(year_min)}")
-            if year_max is not None:
-                where_clauses.append(f"yearbuilt <= {int(year_max)}")
-            if borough:
-                where_clauses.append(f"upper(borough) = '{borough.upper()}'")
-            where_sql = " AND ".join(where_clauses)
+            pending = [bounds for bounds, cp in checkpoints.items() if not cp.completed]
+            fetcher.ranges = pending
+            fetcher.resume_keys = {bounds: checkpoints[bounds].last_key for bounds in pending}
+            if limit is not None:
+                fetcher.limit = max(0, limit - sum(cp.rows_done for cp in checkpoints.values()))
+            
+            progress = {}
+            
+            def flush():
+                # Rows and the checkpoint that covers them commit together, so a
+                # restart never reloads or skips a page.
+                self.loader.load(shadow, buffer.drain())
+                for bounds, (last_key, pages, rows, finished) in progress.items():
+                    cp = checkpoints[bounds]
+                    cp.last_key = last_key
+                    cp.pages_done += pages
+                    cp.rows_done += rows
+                    cp.completed = finished
+                progress.clear()
+                self.db.commit()
+            
+            if pending and fetcher.limit != 0:
+                for bounds, page, finished in fetcher.iter_partition_pages():
+                    last_key, pages, rows, _ = progress.get(bounds, (checkpoints[bounds].last_key, 0, 0, False))
+                    if not page.empty:
+                        with telemetry.stage("transform"):
+                            buffer.add(normalize_pluto_frame(page))
+                        last_key = bbl_key(page["bbl"].iloc[-1])
+                    progress[bounds] = (last_key, pages + 1, rows + len(page), finished)
+                    if buffer.full():
+                        flush()
+            flush()
+            
+            pages_done = sum(cp.pages_done for cp in checkpoints.values())
+            expected = sum(cp.rows_done for cp in checkpoints.values())
+            try:
+                total = self.loader.swap(BuildingInfo, shadow, expected=expected,
+                                         min_ratio=SHADOW_MIN_RATIO if limit is None else None)
+            except ValueError:
+                # The download finished but was rejected; do not resume into it.
+                self.db.rollback()
+                self.loader.drop_shadow(BuildingInfo)
+                self.clear_checkpoints(PLUTO_CHECKPOINT)
+                self.db.commit()
+                raise
+            self.clear_checkpoints(PLUTO_CHECKPOINT)
+            self.db.commit()
             
-            select_fields = [
-                "bbl", "landuse", "yearbuilt", "numfloors", "unitsres",
-                "address", "zipcode", "borough"
-            ]
-            select_sql = ",".join(select_fields)
+            self.calculate_building_stats()
             
-            frames = []
-            pages = math.ceil(limit / page_size)
-            for i in range(pages):
-                offset = i * page_size
-                params = {
-                    "$select": select_sql,
-                    "$where": where_sql,
-                    "$order": "yearbuilt DESC",
-                    "$limit": page_size,
-                    "$offset": offset
-                }
-                
-                headers = {}
-                if app_token:
-                    headers["X-App-Token"] = app_token
+            self.log_sync("pluto_sync", "success", total, details={"resumed": resumed, "pages": pages_done})
+            return total
+        except Exception as e:
+            self.db.rollback()
+            self.log_sync("pluto_sync", "failed", 0, str(e))
+            raise
+    
+    @tracked
+    def sync_pluto_pipeline(self, year_min=1900, year_max=2025, limit=None, sharded=False, year_splits=1,
+                            chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB, on_progress=None):
+        sync_type = "pluto_sharded" if sharded else "pluto_sync"
+        
+        def report(*_):
+            if on_progress is not None and sharded:
+                on_progress(pipeline.fetcher.progress)
+        
+        pipeline = self.pipeline(
+            min_ratio=SHADOW_MIN_RATIO if limit is None else None,
+            chunk_size=chunk_size, max_memory_mb=max_memory_mb, on_progress=report,
+            checkpoint=(PlutoFetcher().dataset_version(), pluto_checkpoint_params(year_min, year_max, limit))
+        )
+        try:
+            total = pipeline.pluto(year_min, year_max, limit, sharded=sharded, year_splits=year_splits)
+            report()
+            details = {"shards": pipeline.fetcher.progress} if sharded else None
+            self.log_sync(sync_type, "success", total, details=details)
+            return total
+        except Exception as e:
+            self.db.rollback()
+            details = {"shards": pipeline.fetcher.progress} if sharded and pipeline.fetcher else None
+            if details:
+                report()
+            self.log_sync(sync_type, "failed", 0, str(e), details=details)
+            raise
+    
+    def has_checkpoint(self, sync_type):
+        return self.db.query(SyncCheckpoint.id).filter(SyncCheckpoint.sync_type == sync_type).first() is not None
+    
+    def load_checkpoints(self, sync_type, version, params):
+        rows = (
+            self.db.query(SyncCheckpoint)
+            .filter(SyncCheckpoint.sync_type == sync_type)
+            .order_by(SyncCheckpoint.partition_low)
+            .all()
+        )
+        if not rows:
+            return {}
+        if any(cp.dataset_version != version or cp.params != params for cp in rows):
+            # The upstream dataset or the requested slice changed; start over.
+            self.clear_checkpoints(sync_type)
+            return {}
+        return {(cp.partition_low, cp.partition_high): cp for cp in rows}
+    
+    def start_checkpoints(self, sync_type, partitions, version, params):
+        self.clear_checkpoints(sync_type)
+        checkpoints = {}
+        for low, high in partitions:
+            cp = SyncCheckpoint(
+                sync_type=sync_type,
+                partition_low=low,
+                partition_high=high,
+                last_key=low - 1,
+                pages_done=0,
+                rows_done=0,
+                completed=False,
+                dataset_version=version,
+                params=params
+            )
+            self.db.add(cp)
+            checkpoints[(low, high)] = cp
+        return checkpoints
+    
+    def clear_checkpoints(self, sync_type):
+        self.db.query(SyncCheckpoint).filter(SyncCheckpoint.sync_type == sync_type).delete(synchronize_session="fetch")
+    
+    @tracked
+    def sync_pluto_incremental(self, year_min=1900, year_max=2025, limit=None,
+                               chunk_size=PLUTO_CHUNK_SIZE, max_memory_mb=PLUTO_MAX_MEMORY_MB):
+        table = BuildingInfo.__table__
+        try:
+            stored = pd.read_sql(
+                select(table.c.bbl, table.c.content_hash, table.c.zipcode), self.db.connection()
+            ).set_index("bbl")
+            seen = pd.Series(False, index=stored.index)
+            counts = {"unchanged": 0, "changed": 0, "new": 0, "removed": 0}
+            affected_zips = set()
+            
+            fetcher = PlutoFetcher(year_min=year_min, year_max=year_max, limit=limit, max_pending_pages=4)
+            buffer = ChunkBuffer(chunk_size, max_memory_mb / 2)
+            
+            def apply(chunk):
+                if chunk.empty:
+                    return
+                known = chunk["bbl"].isin(stored.index)
+                new_rows = chunk[~known]
+                existing = chunk[known]
+                previous = stored.loc[existing["bbl"]]
+                changed_mask = previous["content_hash"].to_numpy() != existing["content_hash"].to_numpy()
+                changed_rows = existing[changed_mask]
                 
-                r = requests.get(PLUTO_API, params=params, headers=headers, timeout=60)
-                r.raise_for_status()
-                data = r.json()
+                seen.loc[existing["bbl"]] = True
+                counts["new"] += len(new_rows)
+                counts["changed"] += len(changed_rows)
+                counts["unchanged"] += len(existing) - len(changed_rows)
+                affected_zips.update(new_rows["zipcode"].dropna())
+                affected_zips.update(changed_rows["zipcode"].dropna())
+                affected_zips.update(previous["zipcode"][changed_mask].dropna())
                 
-                if not data:
-                    break
-                frames.append(pd.DataFrame(data))
-                if len(data) < page_size:
-                    break
-                time.sleep(sleep)
-            
-            if not frames:
-                return pd.DataFrame(columns=select_fields)
-            
-            df = pd.concat(frames, ignore_index=True)
-            
-            for col in ["yearbuilt", "numfloors", "unitsres", "zipcode"]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors="coerce")
-            if "bbl" in df.columns:
-                df["bbl"] = df["bbl"].astype(str)
-            
-            return df[select_fields]
+                self.loader.load(BuildingInfo, new_rows)
+                with telemetry.stage("db_write", rows=len(changed_rows)):
+                    self._update_buildings(changed_rows)
+                self.db.commit()
+            
+            for page in fetcher.iter_pages():
+                with telemetry.stage("transform"):
+                    buffer.add(normalize_pluto_frame(page))
+                if buffer.full():
+                    apply(buffer.drain())
+            apply(buffer.drain())
+            
+            # A capped fetch does not see every lot, so only a full pass may delete.
+            if limit is None:
+                removed = stored[~seen]
+                counts["removed"] = len(removed)
+                affected_zips.update(removed["zipcode"].dropna())
+                bbls = removed.index.tolist()
+                for start in range(0, len(bbls), DELETE_BATCH_SIZE):
+                    self.db.execute(table.delete().where(table.c.bbl.in_(bbls[start:start + DELETE_BATCH_SIZE])))
+                self.db.commit()
+            
+            if affected_zips:
+                self.calculate_building_stats(zip_codes=sorted(affected_zips))
+            
+            total = counts["new"] + counts["changed"] + counts["removed"]
+            self.log_sync("pluto_incremental", "success", total, details=counts)
+            return total
         except Exception as e:
-            raise Exception(f"Failed to fetch PLUTO data: {str(e)}")
+            self.db.rollback()
+            self.log_sync("pluto_incremental", "failed", 0, str(e))
+            raise
     
-    def sync_pluto_data(self, year_min=1900, year_max=2025, limit=100000):
+    @tracked
+    def sync_building_stats_soql(self, year_min=1900, year_max=2025):
         try:
-            df = self.fetch_pluto_residential(year_min=year_min, year_max=year_max, limit=limit)
-            
-            self.db.query(BuildingInfo).delete()
-            
-            for _, row in df.iterrows():
-                zipcode_val = row.get("zipcode")
-                if pd.notna(zipcode_val):
-                    try:
-                        zipcode_str = str(int(float(zipcode_val))).zfill(5)
-                    except:
-                        zipcode_str = str(zipcode_val).zfill(5)
-                else:
-                    zipcode_str = None
-                
-                building = BuildingInfo(
-                    bbl=str(row.get("bbl")),
-                    landuse=str(row.get("landuse")) if pd.notna(row.get("landuse")) else None,
-                    yearbuilt=convert_to_native_type(row.get("yearbuilt")),
-                    numfloors=convert_to_native_type(row.get("numfloors")),
-                    unitsres=convert_to_native_type(row.get("unitsres")),
-                    address=str(row.get("address")) if pd.notna(row.get("address")) else None,
-                    zipcode=zipcode_str,
-                    borough=str(row.get("borough")) if pd.notna(row.get("borough")) else None
-                )
-                self.db.add(building)
-            
+            fetcher = PlutoFetcher(year_min=year_min, year_max=year_max)
+            aggregates = fetcher.fetch_zip_aggregates()
+            aggregates["zip"] = _zipcode_column(aggregates["zipcode"])
+            stats = finalize_stats_frame(aggregates[aggregates["zip"].notna()])
+            # The year filter reads the histogram, so it comes from the same
+            # server-side aggregates rather than the lots left in building_info.
+            counts = fetcher.fetch_year_histogram()
+            counts["zip"] = _zipcode_column(counts["zipcode"])
+            histogram = finalize_histogram_frame(counts.rename(columns={"yearbuilt": "year"}))
+            
+            self.loader.replace(BuildingStats, stats)
+            self.loader.replace(BuildingYearHistogram, histogram)
             self.db.commit()
+            self.rebuild_zip_summary()
             
-            self.calculate_building_stats()
-            
-            self.log_sync("pluto_sync", "success", len(df))
-            return len(df)
+            self.log_sync("pluto_stats_soql", "success", len(stats))
+            return len(stats)
         except Exception as e:
             self.db.rollback()
-            self.log_sync("pluto_sync", "failed", 0, str(e))
+            self.log_sync("pluto_stats_soql", "failed", 0, str(e))
             raise
     
+    def _update_buildings(self, df):
+        if df.empty:
+            return
+        table = BuildingInfo.__table__
+        values = {c: bindparam(f"b_{c}") for c in df.columns if c != "bbl"}
+        values["updated_at"] = func.now()
+        records = frame_to_records(df.add_prefix("b_"))
+        stmt = update(table).where(table.c.bbl == bindparam("b_bbl")).values(values)
+        self.db.connection().execute(stmt, records)
+    
+    @tracked
     def load_pluto_from_csv(self):
         try:
-            pluto_path = DATA_DIR / "pluto_residential.csv"
-            
-            if not pluto_path.exists():
-                raise FileNotFoundError(f"PLUTO CSV file not found: {pluto_path}")
-            
-            df = pd.read_csv(pluto_path)
-            
-            self.db.query(BuildingInfo).delete()
+            if not snapshot_exists(DATA_DIR, "pluto_residential"):
+                raise FileNotFoundError(f"PLUTO snapshot not found in {DATA_DIR}")
             
-            for _, row in df.iterrows():
-                zipcode_val = row.get("zipcode")
-                if pd.notna(zipcode_val):
-                    try:
-                        zipcode_str = str(int(float(zipcode_val))).zfill(5)
-                    except:
-                        zipcode_str = str(zipcode_val).zfill(5)
-                else:
-                    zipcode_str = None
-                
-                building = BuildingInfo(
-                    bbl=str(row.get("bbl")),
-                    landuse=str(row.get("landuse")) if pd.notna(row.get("landuse")) else None,
-                    yearbuilt=convert_to_native_type(row.get("yearbuilt")),
-                    numfloors=convert_to_native_type(row.get("numfloors")),
-                    unitsres=convert_to_native_type(row.get("unitsres")),
-                    address=str(row.get("address")) if pd.notna(row.get("address")) else None,
-                    zipcode=zipcode_str,
-                    borough=str(row.get("borough")) if pd.notna(row.get("borough")) else None
-                )
-                self.db.add(building)
+            df = read_snapshot(DATA_DIR, "pluto_residential", columns=PLUTO_FIELDS)
             
+            with telemetry.stage("transform"):
+                df = normalize_pluto_frame(df)
+            self.loader.replace(BuildingInfo, df)
+            self.clear_checkpoints(PLUTO_CHECKPOINT)
             self.db.commit()
             
             self.calculate_building_stats()
@@ -386,52 +636,55 @@ class DataSyncService:
             self.log_sync("pluto_csv_load", "failed", 0, str(e))
             raise
     
-    def calculate_building_stats(self):
+    @tracked
+    def calculate_building_stats(self, zip_codes=None):
         try:
-            buildings_query = self.db.query(BuildingInfo).filter(BuildingInfo.zipcode.isnot(None))
-            df = pd.read_sql(buildings_query.statement, self.db.bind)
-            
-            if df.empty:
-                return
-            
-            self.db.query(BuildingStats).delete()
-            
-            for zip_code in df['zipcode'].unique():
-                zip_df = df[df['zipcode'] == zip_code]
-                
-                total_buildings = len(zip_df)
-                
-                valid_floors = zip_df[zip_df['numfloors'].notna()]['numfloors']
-                avg_floors = float(valid_floors.mean()) if not valid_floors.empty else None
-                
-                valid_years = zip_df[zip_df['yearbuilt'].notna()]['yearbuilt']
-                avg_year_built = int(valid_years.mean()) if not valid_years.empty else None
-                
-                total_units = zip_df['unitsres'].sum() if 'unitsres' in zip_df.columns else 0
-                
-                pre_1950 = len(zip_df[(zip_df['yearbuilt'].notna()) & (zip_df['yearbuilt'] < 1950)])
-                y1950_2000 = len(zip_df[(zip_df['yearbuilt'].notna()) & 
-                                       (zip_df['yearbuilt'] >= 1950) & 
-                                       (zip_df['yearbuilt'] <= 2000)])
-                post_2000 = len(zip_df[(zip_df['yearbuilt'].notna()) & (zip_df['yearbuilt'] > 2000)])
-                
-                stats = BuildingStats(
-                    zip=str(zip_code),
-                    total_buildings=convert_to_native_type(total_buildings),
-                    avg_floors=convert_to_native_type(avg_floors),
-                    avg_year_built=convert_to_native_type(avg_year_built),
-                    total_residential_units=convert_to_native_type(total_units) if pd.notna(total_units) else 0,
-                    buildings_pre_1950=convert_to_native_type(pre_1950),
-                    buildings_1950_2000=convert_to_native_type(y1950_2000),
-                    buildings_post_2000=convert_to_native_type(post_2000)
+            with telemetry.stage("stats"):
+                if self.loader.dialect in SQL_AGGREGATE_DIALECTS:
+                    result = self.db.execute(building_stats_query(zip_codes))
+                    stats = finalize_stats_frame(pd.DataFrame(result.fetchall(), columns=STATS_COLUMNS))
+                else:
+                    buildings_query = self.db.query(BuildingInfo).filter(BuildingInfo.zipcode.isnot(None))
+                    if zip_codes is not None:
+                        buildings_query = buildings_query.filter(BuildingInfo.zipcode.in_(zip_codes))
+                    stats = aggregate_building_stats(pd.read_sql(buildings_query.statement, self.db.connection()))
+                histogram = self.db.execute(year_histogram_query(zip_codes)).fetchall()
+                histogram = cumulative_histogram(
+                    pd.DataFrame(histogram, columns=["zip", "year", "buildings", "floors", "floor_lots", "units"])
                 )
-                self.db.add(stats)
+            
+            if zip_codes is None:
+                self.loader.replace(BuildingStats, stats)
+                self.loader.replace(BuildingYearHistogram, histogram)
+            else:
+                for model in [BuildingStats, BuildingYearHistogram]:
+                    self.db.query(model).filter(model.zip.in_(zip_codes)).delete(synchronize_session=False)
+                self.loader.load(BuildingStats, stats)
+                self.loader.load(BuildingYearHistogram, histogram)
             
             self.db.commit()
+            self.rebuild_zip_summary()
+            self.log_sync("building_stats", "success", len(stats),
+                          details={"zips": len(zip_codes)} if zip_codes is not None else None)
+            return len(stats)
         except Exception as e:
             self.db.rollback()
+            self.log_sync("building_stats", "failed", 0, str(e))
             raise Exception(f"Failed to calculate building stats: {str(e)}")
 
+    def rebuild_zip_summary(self):
+        # One row per ZIP for the dashboard, so a page load is a single read
+        # instead of two tables merged in pandas.
+        with telemetry.stage("stats"):
+            housing = pd.read_sql(
+                select(*[HousingMetrics.__table__.c[c] for c in ["zip"] + HOUSING_COLUMNS]), self.db.connection()
+            )
+            stats = pd.read_sql(select(BuildingStats.__table__), self.db.connection())
+            summary = build_zip_summary(housing, stats)
+        self.loader.replace(ZipSummary, summary)
+        self.db.commit()
+        return len(summary)
+
 def manual_sync():
     service = DataSyncService()
     return service.sync_all_data()
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from services import telemetry
+
+HTTP_CACHE_DIR = Path(os.getenv("HTTP_CACHE_DIR", Path(__file__).resolve().parent.parent / "data" / "http_cache"))
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", 512))
+
+# Seconds a cached response is served without asking the server. After that
+# the entry is revalidated with If-None-Match / If-Modified-Since.
+SOURCE_TTLS = {
+    "census": 30 * 24 * 3600,
+    "zip_list": 7 * 24 * 3600,
+    "pluto": 12 * 3600,
+}
+CACHED_HEADERS = ["Content-Type", "ETag", "Last-Modified"]
+
+# Requests per second per host. Socrata grants app tokens a much higher quota
+# than anonymous clients, so requests carrying X-App-Token get their own bucket.
+RATE_LIMIT_ANONYMOUS = float(os.getenv("RATE_LIMIT_ANONYMOUS", 5))
+RATE_LIMIT_APP_TOKEN = float(os.getenv("RATE_LIMIT_APP_TOKEN", 40))
+RATE_LIMIT_FLOOR = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 5))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+THROTTLE_COOLDOWN = 1.0
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, ceiling, floor=RATE_LIMIT_FLOOR):
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.rate = ceiling
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.last_throttled = float("-inf")
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        # Reserve a token now and sleep off any deficit outside the lock, so
+        # waiting threads are released in arrival order at the current rate.
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling / 50)
+
+    def throttled(self, retry_after=None):
+        # Multiplicative decrease, once per burst of 429s from concurrent
+        # callers; a Retry-After pauses every caller of this host.
+        with self.lock:
+            self._refill()
+            now = time.monotonic()
+            if now - self.last_throttled >= THROTTLE_COOLDOWN:
+                self.rate = max(self.floor, self.rate / 2)
+                self.last_throttled = now
+            self.tokens = min(self.tokens, -(retry_after or 0) * self.rate)
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(url, authenticated=False):
+    key = (urlparse(url).netloc, authenticated)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveRateLimiter(RATE_LIMIT_APP_TOKEN if authenticated else RATE_LIMIT_ANONYMOUS)
+        return _limiters[key]
+
+
+class CacheEntry:
+    def __init__(self, url, headers, stored_at, body_path):
+        self.url = url
+        self.headers = headers
+        self.stored_at = stored_at
+        self.body_path = body_path
+
+    def age(self):
+        return time.time() - self.stored_at
+
+    def response(self):
+        r = requests.Response()
+        r.status_code = 200
+        r.url = self.url
+        r.headers = CaseInsensitiveDict(self.headers)
+        r._content = self.body_path.read_bytes()
+        r.encoding = "utf-8"
+        r.from_cache = True
+        return r
+
+
+class ResponseCache:
+    def __init__(self, directory=HTTP_CACHE_DIR, max_mb=HTTP_CACHE_MAX_MB):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.size = sum(p.stat().st_size for p in self.directory.glob("*.body"))
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{digest}.json", self.directory / f"{digest}.body"
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not body_path.exists():
+            return None
+        # Body mtime doubles as the LRU clock.
+        os.utime(body_path)
+        return CacheEntry(url, meta["headers"], meta["stored_at"], body_path)
+
+    def put(self, url, response):
+        meta_path, body_path = self._paths(url)
+        body = response.content
+        meta = {
+            "url": url,
+            "headers": {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+            "stored_at": time.time(),
+        }
+        with self.lock:
+            old_size = body_path.stat().st_size if body_path.exists() else 0
+            tmp = body_path.with_suffix(f".tmp{threading.get_ident()}")
+            tmp.write_bytes(body)
+            os.replace(tmp, body_path)
+            meta_path.write_text(json.dumps(meta))
+            self.size += len(body) - old_size
+            self._evict()
+
+    def refresh(self, entry):
+        meta_path, _ = self._paths(entry.url)
+        entry.stored_at = time.time()
+        meta_path.write_text(json.dumps({"url": entry.url, "headers": entry.headers, "stored_at": entry.stored_at}))
+
+    def clear(self):
+        with self.lock:
+            for path in self.directory.glob("*"):
+                path.unlink(missing_ok=True)
+            self.size = 0
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        bodies = sorted(self.directory.glob("*.body"), key=lambda p: p.stat().st_mtime)
+        for body_path in bodies:
+            if self.size <= self.max_bytes:
+                break
+            self.size -= body_path.stat().st_size
+            body_path.unlink(missing_ok=True)
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+
+
+class ApiSession(requests.Session):
+    def __init__(self, max_retries=MAX_RETRIES):
+        super().__init__()
+        self.max_retries = max_retries
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        limiter = rate_limiter(url, authenticated=bool(headers and headers.get("X-App-Token")))
+        attempt = 0
+        while True:
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                r = super().request(method, url, params=params, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                telemetry.record("http", time.perf_counter() - start, requests=1)
+                if attempt >= self.max_retries:
+                    raise
+                telemetry.record("http", retries=1)
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            received = 0 if kwargs.get("stream") else len(r.content)
+            telemetry.record("http", time.perf_counter() - start, requests=1, bytes=received)
+
+            if r.status_code not in RETRY_STATUSES:
+                if r.headers.get("X-RateLimit-Remaining") == "0":
+                    limiter.throttled(retry_after_seconds(r))
+                else:
+                    limiter.succeeded()
+                return r
+
+            retry_after = retry_after_seconds(r)
+            if r.status_code == 429:
+                limiter.throttled(retry_after)
+            if attempt >= self.max_retries:
+                return r
+            telemetry.record("http", retries=1)
+            time.sleep(backoff_delay(attempt, retry_after))
+            attempt += 1
+
+
+class CachedSession(ApiSession):
+    def __init__(self, cache, ttl):
+        super().__init__()
+        self.cache = cache
+        self.ttl = ttl
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != "GET" or kwargs.get("stream"):
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        key = requests.Request("GET", url, params=params).prepare().url
+        entry = self.cache.get(key)
+        if entry is not None and entry.age() < self.ttl:
+            telemetry.record("http", cache_hits=1)
+            return entry.response()
+
+        headers = dict(headers or {})
+        if entry is not None:
+            if "ETag" in entry.headers:
+                headers["If-None-Match"] = entry.headers["ETag"]
+            if "Last-Modified" in entry.headers:
+                headers["If-Modified-Since"] = entry.headers["Last-Modified"]
+
+        r = super().request(method, url, params=params, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            self.cache.refresh(entry)
+            return entry.response()
+        if r.status_code == 200:
+            self.cache.put(key, r)
+        return r
+
+
+@lru_cache(maxsize=None)
+def shared_cache(directory=None):
+    return ResponseCache(directory or HTTP_CACHE_DIR)
+
+
+def build_session(pool_size=8, source=None):
+    if source is not None and HTTP_CACHE_MAX_MB > 0:
+        session = CachedSession(shared_cache(), SOURCE_TTLS.get(source, 0))
+    else:
+        session = ApiSession()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,127 @@
+import os
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from services import telemetry
+from services.census_client import CensusClient, ACS_TABLES
+from services.http_client import build_session
+from services.pluto_fetcher import PlutoFetcher, ShardedPlutoFetcher
+from services.snapshots import SnapshotWriter, write_snapshot
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+NYC_ZIP_URL = os.getenv("NYC_ZIP_URL", "https://data.cityofnewyork.us/resource/pri4-ifjk.json?$select=modzcta&$limit=300")
+CENSUS_SNAPSHOTS = [("rent", []), ("income", []), ("burden", []), ("housing", []), ("vacancy", ["vacancy_rate"])]
+
+
+class SnapshotSink:
+    def __init__(self, data_dir=DATA_DIR, fmt="csv", pluto_name="pluto_residential"):
+        self.data_dir = Path(data_dir)
+        self.fmt = fmt
+        self.pluto_name = pluto_name
+        self.writer = None
+        self.paths = []
+
+    def begin(self, dataset, partitions=None):
+        if dataset == "pluto":
+            self.writer = SnapshotWriter(self.data_dir, self.pluto_name, self.fmt, dataset="pluto_residential")
+
+    def write(self, dataset, df):
+        if dataset == "zip_list":
+            self.paths.append(write_snapshot(self.data_dir, "nyc_zip_list", df, self.fmt))
+        elif dataset == "census":
+            for table, extra in CENSUS_SNAPSHOTS:
+                columns = ["NAME"] + list(ACS_TABLES[table].values()) + ["zip code tabulation area", "zip"] + extra
+                self.paths.append(write_snapshot(self.data_dir, f"nyc_{table}", df[columns], self.fmt))
+        else:
+            self.writer.write(df)
+
+    def commit(self, dataset):
+        if dataset == "pluto":
+            self.paths.append(self.writer.close())
+            self.writer = None
+
+    def abort(self, dataset):
+        if dataset == "pluto" and self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+
+
+class SyncPipeline:
+    # One fetch per dataset, fanned out to every sink. Each sink sees
+    # begin/write.../commit, or abort if the fetch or any sink fails; begin
+    # gets the fetcher's disjoint BBL ranges for PLUTO, if it has them.
+    def __init__(self, sinks, transform=None, on_progress=None):
+        self.sinks = list(sinks)
+        self.transform = telemetry.timed("transform", transform)
+        self.on_progress = on_progress
+        self.fetcher = None
+
+    def deliver(self, dataset, frames, partitions=None):
+        rows = 0
+        for sink in self.sinks:
+            sink.begin(dataset, partitions)
+        try:
+            for df in frames:
+                for sink in self.sinks:
+                    sink.write(dataset, df)
+                rows += len(df)
+                if self.on_progress is not None:
+                    self.on_progress(dataset, rows)
+            for sink in self.sinks:
+                sink.commit(dataset)
+        except Exception:
+            for sink in self.sinks:
+                sink.abort(dataset)
+            raise
+        return rows
+
+    def zip_list(self):
+        r = build_session(source="zip_list").get(NYC_ZIP_URL, timeout=30)
+        r.raise_for_status()
+        with telemetry.stage("parse"):
+            df = pd.DataFrame(r.json())
+        df["zip"] = df["modzcta"].astype(str).str.zfill(5)
+        df = df[["zip"]].drop_duplicates().sort_values("zip")
+        self.deliver("zip_list", [df])
+        return set(df["zip"].tolist())
+
+    def census(self, zips):
+        df = CensusClient().fetch(zips=zips)
+        for c in ["total_units", "occupied_units", "vacant_units"]:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        df["vacancy_rate"] = (df["vacant_units"] / df["total_units"]).round(4)
+        df = df[df["zip"].isin(zips)].copy()
+        self.deliver("census", [df])
+        return len(df)
+
+    def pluto(self, year_min=1900, year_max=2025, limit=None, borough=None, sharded=False, year_splits=1,
+              page_size=5000, max_workers=4):
+        if sharded:
+            self.fetcher = ShardedPlutoFetcher(
+                year_min=year_min, year_max=year_max, year_splits=year_splits, limit=limit,
+                page_size=page_size, transform=self.transform, max_pending_pages=5
+            )
+        else:
+            self.fetcher = PlutoFetcher(
+                year_min=year_min, year_max=year_max, borough=borough, limit=limit,
+                page_size=page_size, max_workers=max_workers, max_pending_pages=4
+            )
+        source = self.fetcher.iter_pages()
+        with closing(source):
+            if sharded:
+                # Shard workers already applied the transform.
+                pages = (page for _, page in source)
+            elif self.transform is not None:
+                pages = (self.transform(page) for page in source)
+            else:
+                pages = source
+            return self.deliver("pluto", pages, self.fetcher.partitions())
+
+    def run(self, year_min=1900, year_max=2025, limit=None, sharded=False, year_splits=1, skip_pluto=False):
+        zips = self.zip_list()
+        results = {"zip_list": len(zips), "census": self.census(zips)}
+        if not skip_pluto:
+            results["pluto"] = self.pluto(year_min, year_max, limit, sharded=sharded, year_splits=year_splits)
+        return results
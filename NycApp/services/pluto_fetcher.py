@@ -0,0 +1,399 @@
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import reduce
+
+import pandas as pd
+import requests
+
+from services import telemetry
+from services.http_client import build_session
+
+PLUTO_API = os.getenv("PLUTO_API_URL", "https://data.cityofnewyork.us/resource/64uk-42ks.json")
+PLUTO_FIELDS = [
+    "bbl", "landuse", "yearbuilt", "numfloors", "unitsres",
+    "address", "zipcode", "borough"
+]
+RESIDENTIAL_LANDUSE = "landuse in('01','02','03')"
+
+# BBL = borough digit + 5-digit block + 4-digit lot, so each borough owns one
+# contiguous key range that can be split further by block.
+BOROUGH_CODES = {
+    "MANHATTAN": 1, "MN": 1,
+    "BRONX": 2, "BX": 2,
+    "BROOKLYN": 3, "BK": 3,
+    "QUEENS": 4, "QN": 4,
+    "STATEN ISLAND": 5, "SI": 5,
+}
+BOROUGH_LABELS = {1: "MN", 2: "BX", 3: "BK", 4: "QN", 5: "SI"}
+ERA_FILTERS = {
+    "buildings_pre_1950": "yearbuilt < 1950",
+    "buildings_1950_2000": "yearbuilt >= 1950 AND yearbuilt <= 2000",
+    "buildings_post_2000": "yearbuilt > 2000",
+}
+ZIP_AGGREGATE_SELECT = (
+    "zipcode, count(*) AS total_buildings, avg(numfloors) AS avg_floors, "
+    "avg(yearbuilt) AS avg_year_built, sum(unitsres) AS total_residential_units"
+)
+YEAR_HISTOGRAM_SELECT = (
+    "zipcode, yearbuilt, count(*) AS buildings, sum(numfloors) AS floors, "
+    "count(numfloors) AS floor_lots, sum(unitsres) AS units"
+)
+# About 180 ZIPs times the distinct build years in each.
+YEAR_HISTOGRAM_LIMIT = 50000
+BBL_BOROUGH_SPAN = 10**9
+BBL_BLOCK_SPAN = 10**4
+# Approximate highest tax block in use per borough; used only to split each
+# borough into key ranges of similar size.
+BOROUGH_MAX_BLOCK = {1: 2300, 2: 6000, 3: 9000, 4: 16400, 5: 8100}
+
+
+def bbl_key(value):
+    return int(float(value))
+
+
+def borough_bbl_range(borough):
+    code = BOROUGH_CODES[borough.upper()] if isinstance(borough, str) else int(borough)
+    return code * BBL_BOROUGH_SPAN, (code + 1) * BBL_BOROUGH_SPAN
+
+
+def split_bbl_ranges(boroughs=None, splits_per_borough=1):
+    codes = sorted({borough_bbl_range(b)[0] // BBL_BOROUGH_SPAN for b in boroughs}) if boroughs else range(1, 6)
+    ranges = []
+    for code in codes:
+        low = code * BBL_BOROUGH_SPAN
+        step = -(-BOROUGH_MAX_BLOCK[code] // splits_per_borough) * BBL_BLOCK_SPAN
+        for i in range(splits_per_borough):
+            upper = low + step if i < splits_per_borough - 1 else (code + 1) * BBL_BOROUGH_SPAN
+            ranges.append((low, upper))
+            low = upper
+    return ranges
+
+
+def clean_pluto_page(data):
+    df = pd.DataFrame(data)
+    for col in PLUTO_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    for col in ["yearbuilt", "numfloors", "unitsres", "zipcode"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["bbl"] = df["bbl"].astype(str)
+    return df[PLUTO_FIELDS]
+
+
+def put_page(pages, item, stop):
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def iter_produced(items, produce, max_workers, max_pending):
+    # Runs produce(item, pages, stop) for every item on a thread pool and
+    # yields whatever the producers queue, at most max_pending ahead of the
+    # consumer. The first producer error stops the others and is re-raised.
+    pages = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    errors = []
+
+    def run(item):
+        try:
+            produce(item, pages, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    parent = telemetry.current()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(telemetry.bind(run, parent), item) for item in items]
+    try:
+        while not errors:
+            try:
+                value = pages.get(timeout=0.2)
+            except queue.Empty:
+                if all(f.done() for f in futures) and pages.empty():
+                    break
+                continue
+            yield value
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if errors:
+        raise errors[0]
+
+
+class PlutoFetcher:
+    def __init__(self, year_min=None, year_max=None, borough=None, limit=None,
+                 page_size=5000, max_workers=4, splits_per_borough=4,
+                 max_pending_pages=None, app_token=None, session=None, api_url=None, timeout=60,
+                 ranges=None, resume_keys=None):
+        self.year_min = year_min
+        self.year_max = year_max
+        self.borough = borough
+        self.limit = limit
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.splits_per_borough = splits_per_borough
+        self.max_pending_pages = max_pending_pages or max_workers * 2
+        self.app_token = app_token if app_token is not None else os.getenv("SOCRATA_APP_TOKEN")
+        self.session = session or build_session(max_workers, source="pluto")
+        self.api_url = api_url or PLUTO_API
+        self.timeout = timeout
+        self.ranges = ranges
+        self.resume_keys = resume_keys or {}
+
+    def partitions(self):
+        if self.ranges is not None:
+            return list(self.ranges)
+        boroughs = [self.borough] if self.borough else None
+        return split_bbl_ranges(boroughs, self.splits_per_borough)
+
+    def where_clause(self, lower_key, upper_key):
+        clauses = [RESIDENTIAL_LANDUSE]
+        if self.year_min is not None:
+            clauses.append(f"yearbuilt >= {int(self.year_min)}")
+        if self.year_max is not None:
+            clauses.append(f"yearbuilt <= {int(self.year_max)}")
+        clauses.append(f"bbl > {int(lower_key)}")
+        clauses.append(f"bbl < {int(upper_key)}")
+        return " AND ".join(clauses)
+
+    def fetch_page(self, lower_key, upper_key):
+        params = {
+            "$select": ",".join(PLUTO_FIELDS),
+            "$where": self.where_clause(lower_key, upper_key),
+            "$order": "bbl",
+            "$limit": self.page_size,
+        }
+        headers = {}
+        if self.app_token:
+            headers["X-App-Token"] = self.app_token
+        r = self.session.get(self.api_url, params=params, headers=headers, timeout=self.timeout)
+        r.raise_for_status()
+        with telemetry.stage("parse"):
+            return r.json()
+
+    def _fetch_partition(self, bounds, pages, stop):
+        # Keyset pagination: each page starts strictly after the last BBL seen,
+        # so deep pages cost the same as the first and rows are never skipped.
+        last_key, upper_key = self.resume_keys.get(bounds, bounds[0] - 1), bounds[1]
+        while not stop.is_set():
+            data = self.fetch_page(last_key, upper_key)
+            finished = len(data) < self.page_size
+            with telemetry.stage("parse"):
+                page = clean_pluto_page(data) if data else pd.DataFrame(columns=PLUTO_FIELDS)
+            if data:
+                last_key = bbl_key(page["bbl"].iloc[-1])
+            if data or finished:
+                put_page(pages, (bounds, page, finished), stop)
+            if finished:
+                return
+
+    def iter_pages(self):
+        for _, page, _ in self.iter_partition_pages():
+            if not page.empty:
+                yield page
+
+    def iter_partition_pages(self):
+        # Yields (bounds, page, finished); the last item for each partition has
+        # finished=True and may carry an empty page. A capped fetch walks the
+        # partitions one at a time, so it returns the lowest `limit` BBLs
+        # rather than whichever partitions answer first.
+        fetched = 0
+        workers = 1 if self.limit is not None else self.max_workers
+        items = iter_produced(self.partitions(), self._fetch_partition, workers, self.max_pending_pages)
+        with closing(items):
+            for bounds, page, finished in items:
+                if self.limit is not None and fetched + len(page) > self.limit:
+                    page = page.iloc[:self.limit - fetched]
+                fetched += len(page)
+                yield bounds, page, finished
+                if self.limit is not None and fetched >= self.limit:
+                    break
+
+    def fetch(self):
+        frames = list(self.iter_pages())
+        if not frames:
+            return pd.DataFrame(columns=PLUTO_FIELDS)
+        return pd.concat(frames, ignore_index=True)
+
+    def dataset_version(self):
+        # Socrata's view metadata bumps rowsUpdatedAt whenever the dataset is
+        # republished; None when the endpoint has no metadata to offer.
+        views_url = re.sub(r"/resource/([\w-]+)\.json$", r"/api/views/\1.json", self.api_url)
+        if views_url == self.api_url:
+            return None
+        try:
+            r = self.session.get(views_url, timeout=self.timeout)
+            r.raise_for_status()
+            version = r.json().get("rowsUpdatedAt")
+        except (requests.RequestException, ValueError):
+            return None
+        return str(version) if version is not None else None
+
+    def base_where(self):
+        clauses = [RESIDENTIAL_LANDUSE, "zipcode IS NOT NULL"]
+        if self.year_min is not None:
+            clauses.append(f"yearbuilt >= {int(self.year_min)}")
+        if self.year_max is not None:
+            clauses.append(f"yearbuilt <= {int(self.year_max)}")
+        if self.borough:
+            low, high = borough_bbl_range(self.borough)
+            clauses.append(f"bbl >= {low} AND bbl < {high}")
+        return " AND ".join(clauses)
+
+    def query(self, select_sql, where_sql, group_by=None, limit=50000):
+        params = {"$select": select_sql, "$where": where_sql, "$limit": limit}
+        if group_by:
+            params["$group"] = group_by
+        headers = {}
+        if self.app_token:
+            headers["X-App-Token"] = self.app_token
+        r = self.session.get(self.api_url, params=params, headers=headers, timeout=self.timeout)
+        r.raise_for_status()
+        with telemetry.stage("parse"):
+            return pd.DataFrame(r.json())
+
+    def fetch_zip_aggregates(self):
+        # One grouped query for counts/averages plus one per era bucket, run
+        # concurrently; Socrata returns about one row per ZIP for each.
+        base_where = self.base_where()
+        queries = {"base": (ZIP_AGGREGATE_SELECT, base_where)}
+        for column, era_where in ERA_FILTERS.items():
+            queries[column] = (f"zipcode, count(*) AS {column}", f"{base_where} AND {era_where}")
+
+        query = telemetry.bind(self.query, telemetry.current())
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as executor:
+            futures = {
+                name: executor.submit(query, select_sql, where_sql, "zipcode")
+                for name, (select_sql, where_sql) in queries.items()
+            }
+            frames = {name: future.result() for name, future in futures.items()}
+
+        frames = [
+            frame if not frame.empty else pd.DataFrame(columns=["zipcode"])
+            for frame in [frames["base"]] + [frames[c] for c in ERA_FILTERS]
+        ]
+        merged = reduce(lambda left, right: left.merge(right, on="zipcode", how="left"), frames)
+        for column in ERA_FILTERS:
+            if column not in merged.columns:
+                merged[column] = 0
+        return merged
+
+
+    def fetch_year_histogram(self):
+        # Building counts and sums per ZIP and year, grouped server-side, so
+        # a stats-only sync can refresh the year histogram without lots.
+        where_sql = f"{self.base_where()} AND yearbuilt IS NOT NULL"
+        df = self.query(YEAR_HISTOGRAM_SELECT, where_sql, "zipcode, yearbuilt", limit=YEAR_HISTOGRAM_LIMIT)
+        if len(df) >= YEAR_HISTOGRAM_LIMIT:
+            raise ValueError(f"Year histogram query hit the {YEAR_HISTOGRAM_LIMIT} row limit")
+        return df.reindex(columns=["zipcode", "yearbuilt", "buildings", "floors", "floor_lots", "units"])
+
+
+class PlutoShard:
+    def __init__(self, borough, year_min=None, year_max=None, label=None):
+        self.borough = borough
+        self.year_min = year_min
+        self.year_max = year_max
+        self.bounds = borough_bbl_range(borough)
+        self.name = label or BOROUGH_LABELS[borough]
+
+
+def plan_shards(year_min=None, year_max=None, boroughs=None, year_splits=1):
+    codes = sorted({borough_bbl_range(b)[0] // BBL_BOROUGH_SPAN for b in boroughs}) if boroughs else range(1, 6)
+    if year_splits <= 1 or year_min is None or year_max is None:
+        return [PlutoShard(code, year_min, year_max) for code in codes]
+
+    step = -(-(year_max - year_min + 1) // year_splits)
+    year_ranges = [(low, min(low + step - 1, year_max)) for low in range(year_min, year_max + 1, step)]
+    return [
+        PlutoShard(code, low, high, f"{BOROUGH_LABELS[code]} {low}-{high}")
+        for code in codes
+        for low, high in year_ranges
+    ]
+
+
+class ShardedPlutoFetcher:
+    def __init__(self, year_min=None, year_max=None, boroughs=None, year_splits=1, limit=None,
+                 page_size=5000, max_workers=5, shard_retries=2, transform=None,
+                 max_pending_pages=None, app_token=None, session=None, api_url=None, timeout=60):
+        self.shards = plan_shards(year_min, year_max, boroughs, year_splits)
+        self.limit = limit
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.shard_retries = shard_retries
+        self.transform = transform
+        self.max_pending_pages = max_pending_pages or max_workers * 2
+        self.app_token = app_token
+        self.session = session or build_session(max_workers, source="pluto")
+        self.api_url = api_url
+        self.timeout = timeout
+        self.progress = {
+            shard.name: {"status": "pending", "pages": 0, "rows": 0, "attempts": 0, "seconds": 0.0}
+            for shard in self.shards
+        }
+
+    def partitions(self):
+        # Shard key ranges, or None when year splits make them overlap.
+        bounds = [shard.bounds for shard in self.shards]
+        return bounds if len(set(bounds)) == len(bounds) else None
+
+    def _fetch_shard(self, shard, pages, stop):
+        # Each shard pages through its own BBL range serially and normalizes in
+        # its worker. A failure retries only this shard, continuing after the
+        # last key already handed to the writer.
+        fetcher = PlutoFetcher(
+            year_min=shard.year_min, year_max=shard.year_max, page_size=self.page_size,
+            max_workers=1, app_token=self.app_token, session=self.session,
+            api_url=self.api_url, timeout=self.timeout
+        )
+        progress = self.progress[shard.name]
+        last_key, upper_key = shard.bounds[0] - 1, shard.bounds[1]
+        start = time.perf_counter()
+        progress["status"] = "running"
+        while True:
+            progress["attempts"] += 1
+            try:
+                while not stop.is_set():
+                    data = fetcher.fetch_page(last_key, upper_key)
+                    if data:
+                        with telemetry.stage("parse"):
+                            page = clean_pluto_page(data)
+                        last_key = bbl_key(page["bbl"].iloc[-1])
+                        put_page(pages, (shard.name, self.transform(page) if self.transform else page), stop)
+                        progress["pages"] += 1
+                        progress["rows"] += len(page)
+                    if len(data) < self.page_size:
+                        break
+                progress["status"] = "done"
+                return
+            except Exception:
+                if stop.is_set() or progress["attempts"] > self.shard_retries:
+                    progress["status"] = "failed"
+                    raise
+                progress["status"] = "retrying"
+            finally:
+                progress["seconds"] = round(time.perf_counter() - start, 2)
+
+    def iter_pages(self):
+        # Yields (shard name, frame) in arrival order; in shard order when
+        # capped, as in PlutoFetcher.
+        fetched = 0
+        workers = 1 if self.limit is not None else self.max_workers
+        items = iter_produced(self.shards, self._fetch_shard, workers, self.max_pending_pages)
+        with closing(items):
+            for name, frame in items:
+                if self.limit is not None and fetched + len(frame) > self.limit:
+                    frame = frame.iloc[:self.limit - fetched]
+                fetched += len(frame)
+                yield name, frame
+                if self.limit is not None and fetched >= self.limit:
+                    break
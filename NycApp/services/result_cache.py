@@ -0,0 +1,180 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+from sqlalchemy import event, select, update, insert, func
+
+from config.database import Base, engine, SessionLocal
+from models.housing_data import DatasetVersion
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 128))
+CHANGED_TABLES = "changed_tables"
+COMMITTED_TABLES = "committed_tables"
+
+
+class ResultCache:
+    # Process-wide LRU of DataService results. Each entry remembers the
+    # tables it was read from and their versions at the time.
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, stamp):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == stamp:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, tables, stamp, value):
+        with self.lock:
+            self.entries[key] = (tables, stamp, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        tables = set(tables)
+        with self.lock:
+            stale = [key for key, entry in self.entries.items() if tables.intersection(entry[0])]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def observe(self, versions):
+        # Versions as read from dataset_versions; a bump made by another
+        # process shows up here rather than through after_commit.
+        with self.lock:
+            changed = {t for t, v in versions.items() if t in self.versions and v > self.versions[t]}
+            for t, v in versions.items():
+                self.versions[t] = max(v, self.versions.get(t, v))
+        if changed:
+            self.invalidate(changed)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.versions.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+RESULT_CACHE = ResultCache()
+
+
+def read_versions(connection):
+    table = DatasetVersion.__table__
+    return dict(connection.execute(select(table.c.dataset, table.c.version)).all())
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set, frozenset, pd.Series, pd.Index)):
+        items = tuple(_freeze(v) for v in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+
+def _copy(value):
+    # Callers add and overwrite columns on what they get back.
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def cached(*tables):
+    # Cache a DataService method under its arguments and the versions of the
+    # tables it reads; a commit to any of them retires the entry.
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                key = (method.__name__, _freeze(args), _freeze(kwargs))
+            except TypeError:
+                return method(self, *args, **kwargs)
+            versions = self.dataset_versions()
+            stamp = tuple(versions.get(t, 0) for t in tables)
+            found, value = RESULT_CACHE.get(key, stamp)
+            if not found:
+                value = method(self, *args, **kwargs)
+                RESULT_CACHE.put(key, tables, stamp, value)
+            return _copy(value)
+        return wrapper
+    return decorator
+
+
+def mark_changed(connection, table):
+    # Also called for writes the DML hook below cannot see: COPY loads and
+    # the shadow table swap.
+    name = getattr(table, "name", None)
+    if name in Base.metadata.tables and name != DatasetVersion.__tablename__:
+        connection.info.setdefault(CHANGED_TABLES, set()).add(name)
+
+
+def bump_versions(connection, tables):
+    table = DatasetVersion.__table__
+    for name in sorted(tables):
+        bumped = connection.execute(
+            update(table).where(table.c.dataset == name).values(version=table.c.version + 1, updated_at=func.now())
+        ).rowcount
+        if not bumped:
+            connection.execute(insert(table).values(dataset=name, version=1))
+
+
+def _record_write(conn, clauseelement, multiparams, params, execution_options):
+    if not getattr(clauseelement, "is_dml", False):
+        return
+    mark_changed(conn, clauseelement.table)
+
+
+def _bump_on_commit(session):
+    if not session.in_transaction():
+        return
+    session.flush()
+    conn = session.connection()
+    tables = conn.info.pop(CHANGED_TABLES, set())
+    if tables:
+        bump_versions(conn, tables)
+    session.info[COMMITTED_TABLES] = tables
+
+
+def _invalidate_on_commit(session):
+    tables = session.info.pop(COMMITTED_TABLES, None)
+    if tables:
+        RESULT_CACHE.invalidate(tables)
+
+
+# Writes through the sync engine are recorded per connection; the session
+# commit bumps dataset_versions in the same transaction, and this process
+# drops the affected entries once the commit lands.
+event.listen(engine, "before_execute", _record_write)
+event.listen(engine, "rollback", lambda conn: conn.info.pop(CHANGED_TABLES, None))
+event.listen(engine, "commit", lambda conn: conn.info.pop(CHANGED_TABLES, None))
+event.listen(SessionLocal, "before_commit", _bump_on_commit)
+event.listen(SessionLocal, "after_commit", _invalidate_on_commit)
+event.listen(SessionLocal, "after_rollback", lambda session: session.info.pop(COMMITTED_TABLES, None))
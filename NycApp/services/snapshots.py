@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import pandas as pd
+
+from services import telemetry
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+SNAPSHOT_FORMATS = ("csv", "parquet")
+SNAPSHOT_SUFFIX = {"csv": ".csv", "parquet": ".parquet"}
+PARQUET_COMPRESSION = "zstd"
+
+# Column types for every snapshot dataset. "zip" columns are five-character
+# strings so leading zeros survive the round trip.
+ACS_COLUMNS = [("NAME", "string")]
+ZCTA_COLUMNS = [("zip code tabulation area", "zip"), ("zip", "zip")]
+SNAPSHOT_SCHEMAS = {
+    "nyc_zip_list": [("zip", "zip")],
+    "nyc_rent": ACS_COLUMNS + [("median_rent", "int64")] + ZCTA_COLUMNS,
+    "nyc_income": ACS_COLUMNS + [("median_income", "int64")] + ZCTA_COLUMNS,
+    "nyc_burden": ACS_COLUMNS + [("rent_burden", "int64")] + ZCTA_COLUMNS,
+    "nyc_housing": ACS_COLUMNS + [("housing_units", "int64")] + ZCTA_COLUMNS,
+    "nyc_vacancy": ACS_COLUMNS + [
+        ("total_units", "int64"), ("occupied_units", "int64"), ("vacant_units", "int64")
+    ] + ZCTA_COLUMNS + [("vacancy_rate", "float64")],
+    "pluto_residential": [
+        ("bbl", "string"), ("landuse", "string"), ("yearbuilt", "int32"), ("numfloors", "float64"),
+        ("unitsres", "int32"), ("address", "string"), ("zipcode", "zip"), ("borough", "string"),
+    ],
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for parquet snapshots (pip install pyarrow)")
+
+
+def _arrow_type(kind):
+    if kind in ("string", "zip"):
+        return pa.string()
+    return {"int32": pa.int32(), "int64": pa.int64(), "float64": pa.float64()}[kind]
+
+
+def arrow_schema(name):
+    _require_pyarrow()
+    return pa.schema([(column, _arrow_type(kind)) for column, kind in SNAPSHOT_SCHEMAS[name]])
+
+
+def conform(df, name):
+    out = pd.DataFrame(index=df.index)
+    for column, kind in SNAPSHOT_SCHEMAS[name]:
+        series = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if kind in ("int32", "int64"):
+            out[column] = pd.to_numeric(series, errors="coerce").round().astype("Int64" if kind == "int64" else "Int32")
+        elif kind == "float64":
+            out[column] = pd.to_numeric(series, errors="coerce").astype("float64")
+        elif kind == "zip":
+            numeric = pd.to_numeric(series, errors="coerce")
+            text = series.astype(str).str.zfill(5)
+            text = text.where(numeric.isna(), numeric.fillna(0).astype("int64").astype(str).str.zfill(5))
+            out[column] = text.where(series.notna(), None).astype(object)
+        else:
+            out[column] = series.astype(str).where(series.notna(), None).astype(object)
+    return out.reset_index(drop=True)
+
+
+def snapshot_path(data_dir, name, fmt):
+    return Path(data_dir) / f"{name}{SNAPSHOT_SUFFIX[fmt]}"
+
+
+def find_snapshot(data_dir, name):
+    # Prefer the most recently written format when both exist.
+    candidates = [snapshot_path(data_dir, name, fmt) for fmt in SNAPSHOT_FORMATS]
+    candidates = [p for p in candidates if p.exists() and (p.suffix != ".parquet" or pa is not None)]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def snapshot_exists(data_dir, name):
+    return find_snapshot(data_dir, name) is not None
+
+
+def read_snapshot(data_dir, name, columns=None):
+    path = find_snapshot(data_dir, name)
+    if path is None:
+        raise FileNotFoundError(f"No snapshot for {name} in {data_dir}")
+    with telemetry.stage("parse"):
+        if path.suffix == ".parquet":
+            table = pq.read_table(path, columns=columns, memory_map=True)
+            return table.to_pandas()
+        kinds = dict(SNAPSHOT_SCHEMAS[name])
+        text_columns = {c: str for c, kind in kinds.items() if kind in ("string", "zip")}
+        df = pd.read_csv(path, usecols=columns, dtype=text_columns)
+        return conform(df, name)[columns] if columns else conform(df, name)
+
+
+class SnapshotWriter:
+    def __init__(self, data_dir, name, fmt="csv", dataset=None):
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {fmt}")
+        if fmt == "parquet":
+            _require_pyarrow()
+        self.dataset = dataset or name
+        self.fmt = fmt
+        self.path = snapshot_path(data_dir, name, fmt)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.rows = 0
+        self.writer = None
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(self.tmp_path, arrow_schema(self.dataset), compression=PARQUET_COMPRESSION)
+        else:
+            pd.DataFrame(columns=[c for c, _ in SNAPSHOT_SCHEMAS[self.dataset]]).to_csv(self.tmp_path, index=False)
+
+    def write(self, df):
+        frame = conform(df, self.dataset)
+        if self.writer is not None:
+            self.writer.write_table(pa.Table.from_pandas(frame, schema=self.writer.schema, preserve_index=False))
+        else:
+            frame.to_csv(self.tmp_path, mode="a", header=False, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.tmp_path.replace(self.path)
+        return self.path
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def write_snapshot(data_dir, name, df, fmt="csv", dataset=None):
+    writer = SnapshotWriter(data_dir, name, fmt, dataset)
+    writer.write(df)
+    return writer.close()
@@ -0,0 +1,89 @@
+from sqlalchemy import select, func, case, cast, true, Float, Integer
+
+PERCENTILES = (0.25, 0.5, 0.75)
+STAT_NAMES = ["count", "mean", "sum", "min", "max"]
+
+
+def percentile_name(p):
+    return "median" if p == 0.5 else f"p{round(p * 100):g}"
+
+
+def _label(column, stat):
+    return f"{column}__{stat}"
+
+
+def _postgres_query(table, columns, percentiles, where):
+    aggregates = [func.count().label("rows")]
+    for name in columns:
+        col = table.c[name]
+        aggregates += [
+            func.count(col).label(_label(name, "count")),
+            func.avg(col).label(_label(name, "mean")),
+            func.sum(col).label(_label(name, "sum")),
+            func.min(col).label(_label(name, "min")),
+            func.max(col).label(_label(name, "max")),
+        ]
+        aggregates += [
+            func.percentile_cont(p).within_group(col).label(_label(name, percentile_name(p)))
+            for p in percentiles
+        ]
+    return select(*aggregates).select_from(table).where(*where)
+
+
+def _column_stats(table, name, percentiles, where):
+    # Group the column by value, turn running counts into the rank range
+    # each value covers, and interpolate between the ranks around
+    # (n - 1) * p as percentile_cont does. The window then runs over
+    # distinct values rather than every row.
+    col = table.c[name]
+    grouped = select(col.label("v"), func.count().label("c")).where(col.isnot(None), *where).group_by(col).subquery()
+    running = func.sum(grouped.c.c).over(order_by=grouped.c.v)
+    ranked = select(
+        grouped.c.v, grouped.c.c,
+        (running - grouped.c.c + 1).label("first_rank"),
+        running.label("last_rank"),
+        func.sum(grouped.c.c).over().label("n"),
+    ).subquery()
+    v, c, n = ranked.c.v, ranked.c.c, ranked.c.n
+    aggregates = [
+        func.coalesce(func.sum(c), 0).label(_label(name, "count")),
+        (cast(func.sum(v * c), Float) / func.sum(c)).label(_label(name, "mean")),
+        func.sum(v * c).label(_label(name, "sum")),
+        func.min(v).label(_label(name, "min")),
+        func.max(v).label(_label(name, "max")),
+    ]
+    for p in percentiles:
+        position = (n - 1) * float(p)
+        below = cast(position, Integer)
+        fraction = position - below
+        lower = func.sum(case(((below + 1).between(ranked.c.first_rank, ranked.c.last_rank), v * (1 - fraction))))
+        upper = func.sum(case(((below + 2).between(ranked.c.first_rank, ranked.c.last_rank), v * fraction)))
+        aggregates.append((lower + func.coalesce(upper, 0)).label(_label(name, percentile_name(p))))
+    return select(*aggregates).select_from(ranked).subquery()
+
+
+def _ranked_query(table, columns, percentiles, where):
+    # No percentile_cont outside PostgreSQL; every column reduces to one row
+    # and the rows are joined into a single result.
+    parts = select(func.count().label("rows")).select_from(table).where(*where).subquery()
+    for name in columns:
+        parts = parts.join(_column_stats(table, name, percentiles, where), true())
+    return select(parts)
+
+
+def summary_query(table, columns, percentiles=PERCENTILES, where=(), dialect="sqlite"):
+    if dialect == "postgresql":
+        return _postgres_query(table, columns, percentiles, where)
+    return _ranked_query(table, columns, percentiles, where)
+
+
+def summarize(connection, table, columns, percentiles=PERCENTILES, where=()):
+    # One aggregate query; only the result row comes back to Python.
+    stmt = summary_query(table, columns, percentiles, where, connection.dialect.name)
+    row = connection.execute(stmt).one()._mapping
+    stats = {"rows": row["rows"]}
+    for name in columns:
+        values = {stat: row[_label(name, stat)] for stat in STAT_NAMES + [percentile_name(p) for p in percentiles]}
+        stats[name] = {stat: float(value) if value is not None else None for stat, value in values.items()}
+        stats[name]["count"] = int(values["count"])
+    return stats
@@ -0,0 +1,198 @@
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STAGES = ["http", "parse", "transform", "db_write", "stats"]
+RUN_METRICS = [
+    "wall_seconds", "records", "rows_per_sec", "peak_rss_mb", "http_seconds", "http_bytes", "http_requests",
+    "cache_hits", "retries", "parse_seconds", "transform_seconds", "db_write_seconds", "db_rows", "stats_seconds",
+]
+COUNT_METRICS = {"records", "http_bytes", "http_requests", "cache_hits", "retries", "db_rows"}
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # ru_maxrss is the process peak: kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return None
+
+
+class RunMetrics:
+    # Stage seconds are summed over every thread that worked on the stage, so
+    # with parallel fetch workers "http" can exceed the run's wall time.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.stages = defaultdict(lambda: defaultdict(float))
+        self.peak_rss = current_rss()
+
+    def sample_rss(self):
+        rss = current_rss()
+        if rss is not None:
+            with self.lock:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def record(self, stage, seconds=0.0, **counts):
+        with self.lock:
+            values = self.stages[stage]
+            values["seconds"] += seconds
+            for name, value in counts.items():
+                values[name] += value
+        self.sample_rss()
+
+    def value(self, stage, name="seconds"):
+        with self.lock:
+            return self.stages[stage].get(name, 0) if stage in self.stages else 0
+
+    def merge(self, other):
+        with self.lock:
+            for stage, values in other.stages.items():
+                for name, value in values.items():
+                    self.stages[stage][name] += value
+            if other.peak_rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, other.peak_rss)
+
+    def summary(self, records=0):
+        self.sample_rss()
+        wall = time.perf_counter() - self.started
+        value = self.value
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 3),
+            "records": records,
+            "rows_per_sec": round(records / wall, 1) if wall > 0 else None,
+            "peak_rss_mb": round(self.peak_rss / 2**20, 1) if self.peak_rss else None,
+            "http_seconds": round(value("http"), 3),
+            "http_bytes": int(value("http", "bytes")),
+            "http_requests": int(value("http", "requests")),
+            "cache_hits": int(value("http", "cache_hits")),
+            "retries": int(value("http", "retries")),
+            "parse_seconds": round(value("parse"), 3),
+            "transform_seconds": round(value("transform"), 3),
+            "db_write_seconds": round(value("db_write"), 3),
+            "db_rows": int(value("db_write", "rows")),
+            "stats_seconds": round(value("stats"), 3),
+        }
+
+
+# The active runs of this thread (or task), innermost last. Each thread has
+# its own stack, so the auto-sync thread and a manual sync in another
+# session never record into each other's runs.
+_runs = contextvars.ContextVar("telemetry_runs", default=())
+
+
+def current():
+    runs = _runs.get()
+    return runs[-1] if runs else None
+
+
+@contextmanager
+def run():
+    # Runs nest: an inner run (e.g. the stats rebuild inside a PLUTO sync)
+    # gets its own metrics and adds them to the outer run when it ends.
+    metrics = RunMetrics()
+    outer = _runs.get()
+    token = _runs.set(outer + (metrics,))
+    try:
+        yield metrics
+    finally:
+        _runs.reset(token)
+        if outer:
+            outer[-1].merge(metrics)
+
+
+def bind(func, metrics):
+    # Worker threads start with no runs; the caller hands them its run so
+    # their stages are recorded there.
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _runs.set((metrics,) if metrics is not None else ())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _runs.reset(token)
+    return wrapper
+
+
+def tracked(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with run():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def record(stage, seconds=0.0, **counts):
+    metrics = current()
+    if metrics is not None:
+        metrics.record(stage, seconds, **counts)
+
+
+@contextmanager
+def stage(name, **counts):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, **counts)
+
+
+def timed(name, func):
+    if func is None:
+        return None
+
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument_session(session):
+    # Commits flush pending rows and wait for the disk, so they count as
+    # database writes too.
+    def started(session):
+        session.info["commit_started"] = time.perf_counter()
+
+    def finished(session):
+        start = session.info.pop("commit_started", None)
+        if start is not None:
+            record("db_write", time.perf_counter() - start)
+
+    event.listen(session, "before_commit", started)
+    event.listen(session, "after_commit", finished)
+
+
+def average_runs(rows):
+    # Collapses several runs into one row: means per run, the highest peak RSS.
+    out = {}
+    for name in RUN_METRICS:
+        values = [row[name] for row in rows if row.get(name) is not None]
+        if not values:
+            out[name] = None
+        elif name == "peak_rss_mb":
+            out[name] = max(values)
+        elif name in COUNT_METRICS:
+            out[name] = int(round(sum(values) / len(values)))
+        else:
+            out[name] = round(sum(values) / len(values), 3)
+    return out
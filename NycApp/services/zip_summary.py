@@ -0,0 +1,40 @@
+import pandas as pd
+from services.building_stats import STATS_COLUMNS
+
+HOUSING_COLUMNS = [
+    "name", "median_rent", "median_income", "rent_burden", "rent_burden_rate", "housing_units",
+    "total_units", "occupied_units", "vacant_units", "vacancy_rate"
+]
+BUILDING_COLUMNS = [c for c in STATS_COLUMNS if c != "zip"]
+BUILDING_COUNT_COLUMNS = [
+    "total_buildings", "avg_year_built", "total_residential_units",
+    "buildings_pre_1950", "buildings_1950_2000", "buildings_post_2000"
+]
+# Citywide rank of each ZIP, 1 = highest value.
+RANK_METRICS = ["median_rent", "median_income", "rent_burden_rate", "vacancy_rate", "total_buildings"]
+SUMMARY_COLUMNS = (
+    ["zip", "has_housing", "has_buildings"] + HOUSING_COLUMNS + BUILDING_COLUMNS
+    + [f"{metric}_rank" for metric in RANK_METRICS]
+)
+
+
+def _by_zip(df, columns):
+    df = df[df["zip"].notna()].copy()
+    df["zip"] = df["zip"].astype(str).str.zfill(5)
+    return df.drop_duplicates("zip")[["zip"] + columns]
+
+
+def build_zip_summary(housing, stats):
+    housing = _by_zip(housing, HOUSING_COLUMNS).assign(has_housing=True)
+    stats = _by_zip(stats, BUILDING_COLUMNS).assign(has_buildings=True)
+    summary = housing.merge(stats, on="zip", how="outer").sort_values("zip", ignore_index=True)
+    for flag in ["has_housing", "has_buildings"]:
+        summary[flag] = summary[flag].fillna(False).astype(bool)
+    for col in HOUSING_COLUMNS[1:] + BUILDING_COLUMNS:
+        summary[col] = pd.to_numeric(summary[col], errors="coerce")
+    for col in ["housing_units", "total_units", "occupied_units", "vacant_units"] + BUILDING_COUNT_COLUMNS:
+        summary[col] = summary[col].round().astype("Int64")
+    for metric in RANK_METRICS:
+        summary[f"{metric}_rank"] = summary[metric].rank(ascending=False, method="min").astype("Int64")
+    summary["name"] = summary["name"].astype(object).where(summary["name"].notna(), None)
+    return summary[SUMMARY_COLUMNS]